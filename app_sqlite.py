@@ -1,172 +1,201 @@
-import sqlite3
 import os
-import json
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from litellm import completion
 import re
-import random
-from math import radians, cos, sin, asin, sqrt
+import numpy as np
+from math import floor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from geo import haversine
+from menu_catalog import MenuCatalog
+from keyword_matcher import KeywordMatcher
+from term_corrector import TermCorrector
+from numeric_ranges import extract_ranges, ranges_key
+from opening_hours import minute_of_week
+from metrics import MetricsRegistry, StageTimer, SamplingProfiler
+from ranking import merge_weights, ranking_seed, keyword_strength, score_items, select_top_k
+import serialization
+from query_cache import LRUCache
+from menu_features import (
+    SPICY_KEYWORDS, VEGETARIAN_KEYWORDS, VEGAN_KEYWORDS, DRINK_KEYWORDS,
+    INGREDIENT_TAG_MAP, MEAT_WORDS, NON_VEGAN_WORDS, requirement_masks, keyword_table
+)
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-DB_PATH = "restaurants.db"
+# Paths are made absolute once, so nothing depends on the CWD later on
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.abspath(os.getenv("OPENMENU_DB_PATH", os.path.join(APP_DIR, "restaurants.db")))
+# Catalog snapshot built by build_snapshot.py; used instead of the database while it matches it
+SNAPSHOT_PATH = os.path.abspath(os.getenv("OPENMENU_SNAPSHOT_PATH", os.path.join(APP_DIR, "restaurants.snapshot")))
 
 app = Flask(__name__)
 CORS(app)
 
-# Define comprehensive keyword mappings
-SPICY_KEYWORDS = {
-    "spicy", "hot", "jalapeno", "sriracha", "chili", "chipotle", 
-    "buffalo", "cayenne", "habanero", "ghost", "pepper", "fiery",
-    "zesty", "piquant", "wasabi", "horseradish", "gochujang",
-    "harissa", "tabasco", "scotch bonnet", "thai chili"
-}
+# Menus are read (or mapped) once at startup and reloaded only when their source changes
+menu_catalog = MenuCatalog(DB_PATH, SNAPSHOT_PATH)
+if os.path.exists(SNAPSHOT_PATH) or os.path.exists(DB_PATH):
+    menu_catalog.refresh()
 
-VEGETARIAN_KEYWORDS = {
-    "vegetarian", "veggie", "veg", "meatless", "plant-based",
-    "paneer", "tofu", "tempeh", "seitan", "mushroom", "eggplant",
-    "broccoli", "cauliflower", "spinach", "kale", "beans", "lentil",
-    "chickpea", "quinoa", "falafel", "hummus", "vegetable", "salad"
-}
+# Per-request sampling profiles are only honoured when explicitly enabled
+PROFILING_ENABLED = os.getenv("OPENMENU_PROFILING", "").lower() in ("1", "true", "yes")
 
-VEGAN_KEYWORDS = {
-    "vegan", "plant-based", "dairy-free", "non-dairy", "animal-free"
-}
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter("openmenu_recommend_requests_total", "Requests served by /recommend")
+REQUEST_LATENCY = metrics.histogram("openmenu_recommend_latency_seconds", "Time spent handling /recommend")
+# Stages of /recommend: parse_query, match_items (the cached cell candidates),
+# nearby_restaurants (distance and opening-hours filter) and select. /recommend/batch
+# reports parse_query, nearby_restaurants, menu_fetch and evaluate_queries in its
+# debug timings only.
+STAGE_LATENCY = metrics.histogram("openmenu_recommend_stage_seconds",
+                                  "Time spent in each stage of /recommend", ["stage"])
+ITEMS_SCANNED = metrics.counter("openmenu_items_scanned_total", "Menu items checked against query requirements")
+BATCH_REQUESTS = metrics.counter("openmenu_recommend_batch_requests_total", "Requests served by /recommend/batch")
+BATCH_QUERIES = metrics.counter("openmenu_recommend_batch_queries_total", "Queries answered by /recommend/batch")
+BATCH_LATENCY = metrics.histogram("openmenu_recommend_batch_latency_seconds", "Time spent handling /recommend/batch")
 
-DRINK_KEYWORDS = {
+def menu_cache_metrics():
+    """Expose the menu catalog counters at scrape time"""
+    stats = menu_catalog.stats()
+    lines = []
+    for key, help_text in (("hits", "Menu catalog lookups served from memory"),
+                           ("misses", "Menu catalog lookups that found the source changed"),
+                           ("reloads", "Times the menu catalog was reloaded from the database")):
+        name = f"openmenu_menu_cache_{key}_total"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {stats[key]}"]
+    # Requests read menus from the catalog, so its checks and reloads are all the SQLite traffic
+    lines += ["# HELP openmenu_sqlite_queries_total SQLite statements run by the menu catalog",
+              "# TYPE openmenu_sqlite_queries_total counter",
+              f"openmenu_sqlite_queries_total {stats['db_queries']}"]
+    lines += ["# HELP openmenu_catalog_restaurants Restaurants in the loaded menu catalog",
+              "# TYPE openmenu_catalog_restaurants gauge",
+              f"openmenu_catalog_restaurants {stats['restaurants']}"]
+    if stats["version"] is not None:
+        lines += ["# HELP openmenu_catalog_version Change-log version of the loaded menu catalog",
+                  "# TYPE openmenu_catalog_version gauge",
+                  f"openmenu_catalog_version {stats['version']}"]
+    lines += ["# HELP openmenu_catalog_reload_seconds Duration of the last menu catalog reload",
+              "# TYPE openmenu_catalog_reload_seconds gauge",
+              f"openmenu_catalog_reload_seconds {stats['load_ms'] / 1000}"]
+    return lines
+
+metrics.add_collector(menu_cache_metrics)
+
+# Query words that ask for drinks (misspellings are fixed by the term corrector first)
+DRINK_QUERY_PATTERNS = [
     "drink", "beverage", "juice", "soda", "tea", "coffee", 
     "smoothie", "cocktail", "milkshake", "beer", "wine", 
     "alcohol", "lemonade", "water", "cola", "pepsi", "coke",
     "latte", "cappuccino", "espresso", "frappe", "mocktail",
-    "refreshment", "thirst", "liquid"
+    "refreshment", "thirst", "liquid",
+    "refresh", "refreshing",
+    "hydrat", "quench"  # Related concepts
+]
+
+QUERY_MATCHER = KeywordMatcher(keyword_table(
+    (SPICY_KEYWORDS, ["spicy"]),
+    (VEGETARIAN_KEYWORDS, ["vegetarian"]),
+    (VEGAN_KEYWORDS, ["vegan"]),
+    (DRINK_QUERY_PATTERNS, ["drinks"])
+))
+DRINK_PATTERN_MATCHER = KeywordMatcher(keyword_table((DRINK_QUERY_PATTERNS, ["drinks"])))
+# Every substring of a drink pattern, for the "word in drink_word" check
+DRINK_PATTERN_SUBSTRINGS = {
+    pattern[i:j]
+    for pattern in DRINK_QUERY_PATTERNS
+    for i in range(len(pattern))
+    for j in range(i + 1, len(pattern) + 1)
 }
 
-# Mapping of ingredients/descriptions to tags
-INGREDIENT_TAG_MAP = {
-    # Spicy mappings
-    "jalapeno": ["spicy"],
-    "sriracha": ["spicy"],
-    "chili": ["spicy"],
-    "chipotle": ["spicy"],
-    "buffalo": ["spicy"],
-    "cayenne": ["spicy"],
-    "habanero": ["spicy"],
-    "ghost pepper": ["spicy"],
-    "hot sauce": ["spicy"],
-    "wasabi": ["spicy"],
-    "gochujang": ["spicy"],
-    
-    # Vegetarian mappings
-    "paneer": ["vegetarian"],
-    "tofu": ["vegetarian", "vegan"],
-    "tempeh": ["vegetarian", "vegan"],
-    "mushroom": ["vegetarian"],
-    "eggplant": ["vegetarian"],
-    "broccoli": ["vegetarian"],
-    "cauliflower": ["vegetarian"],
-    "cheese": ["vegetarian"],
-    "beans": ["vegetarian"],
-    "lentil": ["vegetarian"],
-    "chickpea": ["vegetarian"],
-    "quinoa": ["vegetarian"],
-    "falafel": ["vegetarian"],
-    
-    # Vegan mappings
-    "plant-based": ["vegan", "vegetarian"],
-    "dairy-free": ["vegan"],
-    "almond milk": ["vegan"],
-    "oat milk": ["vegan"],
-    "soy milk": ["vegan"],
+COMMON_QUERY_WORDS = {
+    "and", "with", "the", "for", "something", "food", "dish", 
+    "meal", "item", "want", "need", "like", "get", "find", "give",
+    "looking", "would", "could", "please", "thanks", "can"
 }
+ALL_SPECIAL_KEYWORDS = SPICY_KEYWORDS | VEGETARIAN_KEYWORDS | VEGAN_KEYWORDS | DRINK_KEYWORDS
 
-def haversine(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points on Earth in km"""
-    R = 6371.0  # Earth radius in km
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
-
-def get_restaurants_nearby(lat=33.7770706, lng=-84.3902668, radius_km=10):
-    """Get restaurants within radius of given coordinates"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = '''SELECT id, name, address, rating, user_ratings_count, 
-               opening_hours, phone, website, photo_url, price_level, 
-               business_status, google_maps_url, lat, lng FROM restaurants'''
-    c.execute(query)
-    
-    results = []
-    for row in c.fetchall():
-        (rid, name, address, rating, user_ratings_count, opening_hours, 
-         phone, website, photo_url, price_level, business_status, 
-         google_maps_url, rlat, rlng) = row
-        
-        dist = haversine(lat, lng, rlat, rlng)
-        if dist <= radius_km:
-            results.append({
-                "id": rid,
-                "name": name,
-                "address": address,
-                "rating": rating,
-                "user_ratings_count": user_ratings_count,
-                "opening_hours": json.loads(opening_hours) if opening_hours else [],
-                "phone": phone,
-                "website": website,
-                "photo_url": json.loads(photo_url) if photo_url else [],
-                "price_level": price_level,
-                "business_status": business_status,
-                "google_maps_url": google_maps_url,
-                "lat": rlat,
-                "lng": rlng
-            })
-    conn.close()
-    return results
-
-def get_menu_items_for_restaurant(restaurant_id):
-    """Get menu items for a specific restaurant"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT name, description, price, calories, tags FROM menu_items WHERE restaurant_id=?', 
-              (restaurant_id,))
-    items = []
-    for row in c.fetchall():
-        name, description, price, calories, tags = row
-        items.append({
-            "name": name,
-            "description": description,
-            "price": price,
-            "calories": calories,
-            "tags": json.loads(tags) if tags else []
-        })
-    conn.close()
-    return items
+def phrase_words(*tables):
+    """Every word of the phrases in some keyword tables"""
+    return {word for table in tables for phrase in table for word in re.findall(r'\w+', phrase)}
 
-def expand_tags_from_content(name, description, existing_tags):
-    """Expand tags based on item name and description"""
-    content_lower = f"{name} {description}".lower()
-    expanded_tags = set([tag.lower() for tag in existing_tags])
-    
-    # Check for ingredient matches and add corresponding tags
-    for ingredient, tags in INGREDIENT_TAG_MAP.items():
-        if ingredient in content_lower:
-            for tag in tags:
-                expanded_tags.add(tag)
-    
-    # Also check if drink-related words are in the content
-    for drink_word in DRINK_KEYWORDS:
-        if drink_word in content_lower:
-            expanded_tags.add("drink")
-            break
-    
-    return expanded_tags
+# Words that turn on a spicy/vegetarian/vegan/drinks filter
+CATEGORY_TERMS = phrase_words(ALL_SPECIAL_KEYWORDS, DRINK_QUERY_PATTERNS)
+# Words a query word may be corrected to besides the catalog vocabulary; they win ties against catalog words
+QUERY_TERMS = CATEGORY_TERMS | COMMON_QUERY_WORDS
+QUERY_TERM_BOOST = 1000000
+# Correctly spelled food words from the feature tables, kept even when no menu has them
+# ("lobster" is not "oyster"); they only win ties they would win by catalog frequency
+FOOD_TERMS = phrase_words(INGREDIENT_TAG_MAP, MEAT_WORDS, NON_VEGAN_WORDS)
+
+DEFAULT_RADIUS_KM = 10
+MAX_RECOMMENDATIONS = 20
+MAX_ITEMS_PER_RESTAURANT = 5
+# "nested" embeds the restaurant in every item; "normalized" sends each restaurant once
+RESPONSE_FORMATS = ("nested", "normalized")
+# "keyword" requires every free-text keyword; "semantic" ranks by vector similarity to the whole query
+RECOMMEND_MODES = ("keyword", "semantic")
+# Most similar items that go on to the full scoring in semantic mode
+SEMANTIC_POOL = 200
+MAX_BATCH_QUERIES = 20
+# Opening hours are local times; open_now and open_at without an offset are read in this zone
+LOCAL_TIMEZONE = ZoneInfo(os.getenv("OPENMENU_TIMEZONE", "America/New_York"))
+
+# Parsed queries, and the matching items around each location cell, are cached
+QUERY_CACHE_SIZE = int(os.getenv("OPENMENU_QUERY_CACHE_SIZE", "256"))  # 0 disables
+QUERY_CACHE_TTL = float(os.getenv("OPENMENU_QUERY_CACHE_TTL", "300"))  # seconds
+CACHE_CELL_DEGREES = float(os.getenv("OPENMENU_CACHE_CELL_DEGREES", "0.01"))
+requirements_cache = LRUCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+result_cache = LRUCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+
+def query_cache_metrics():
+    """Expose the query cache counters at scrape time"""
+    lines = []
+    caches = (("requirements", requirements_cache), ("results", result_cache))
+    for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        name = f"openmenu_query_cache_{key}_total"
+        lines += [f"# HELP {name} Query cache {key}", f"# TYPE {name} counter"]
+        lines += [f'{name}{{cache="{label}"}} {getattr(cache, key)}' for label, cache in caches]
+    return lines
+
+metrics.add_collector(query_cache_metrics)
+
+def query_corrector(catalog):
+    """Get the spelling corrector for a catalog version's vocabulary, building it on first use"""
+    corrector = catalog.term_corrector
+    if corrector is None:
+        terms = catalog.keyword_index.document_frequencies()
+        for term in QUERY_TERMS:
+            terms[term] = terms.get(term, 0) + QUERY_TERM_BOOST
+        for term in FOOD_TERMS:
+            terms.setdefault(term, 0)
+        # Words a keyword search would already find are never corrected
+        corrector = catalog.term_corrector = TermCorrector(terms, known=catalog.keyword_index.contains)
+    return corrector
+
+def warm_catalog(catalog, previous):
+    """Build a reloaded catalog's per-version state in the reload thread, before it is swapped in"""
+    query_corrector(catalog)
+    if previous.has_semantic_index():
+        catalog.semantic_index()
+
+# Built once at startup; reloads build their own before any request sees them
+if os.path.exists(SNAPSHOT_PATH) or os.path.exists(DB_PATH):
+    query_corrector(menu_catalog.snapshot())
+menu_catalog.warmers.append(warm_catalog)
+
+def parse_query_requirements(query, corrector=None):
+    """Parse the query to extract requirements
 
-def parse_query_requirements(query):
-    """Parse the query to extract requirements"""
-    query_lower = query.lower()
+    Numeric constraints ("under $10", "less than 800 calories", "4+ stars")
+    are taken out first and returned under "ranges". With a corrector,
+    misspelled words are then replaced by the catalog or keyword term they
+    were meant to be.
+    """
+    ranges, query_lower = extract_ranges(query.lower())
+    corrections = {}
+    if corrector is not None:
+        query_lower, corrections = corrector.correct_text(query_lower)
     
     requirements = {
         "spicy": False,
@@ -176,126 +205,276 @@ def parse_query_requirements(query):
         "other_keywords": []
     }
     
-    # Check for spicy requirement
-    if any(keyword in query_lower for keyword in SPICY_KEYWORDS):
-        requirements["spicy"] = True
-    
-    # Check for vegetarian requirement
-    if any(keyword in query_lower for keyword in VEGETARIAN_KEYWORDS):
-        requirements["vegetarian"] = True
-    
-    # Check for vegan requirement (vegan implies vegetarian)
-    if any(keyword in query_lower for keyword in VEGAN_KEYWORDS):
+    # One pass over the query finds the spicy, vegetarian, vegan and drink keywords
+    categories = QUERY_MATCHER.find(query_lower)
+    requirements["spicy"] = "spicy" in categories
+    requirements["vegetarian"] = "vegetarian" in categories
+    # Vegan implies vegetarian
+    if "vegan" in categories:
         requirements["vegan"] = True
-        requirements["vegetarian"] = True  # Vegan is also vegetarian
-    
-    # Check if specifically asking for drinks (with fuzzy matching for typos)
-    drink_patterns = [
-        "drink", "beverage", "juice", "soda", "tea", "coffee", 
-        "smoothie", "cocktail", "milkshake", "beer", "wine", 
-        "alcohol", "lemonade", "water", "cola", "pepsi", "coke",
-        "latte", "cappuccino", "espresso", "frappe", "mocktail",
-        "refreshment", "thirst", "liquid",
-        "refresh", "refreshing", "refresing", "refreshin",  # Common typos for refreshing
-        "hydrat", "quench"  # Related concepts
-    ]
-    
-    if any(pattern in query_lower for pattern in drink_patterns):
-        requirements["drinks"] = True
+        requirements["vegetarian"] = True
+    requirements["drinks"] = "drinks" in categories
     
     # Extract other significant keywords (3+ characters, not common words)
-    common_words = {
-        "and", "with", "the", "for", "something", "food", "dish", 
-        "meal", "item", "want", "need", "like", "get", "find", "give",
-        "looking", "would", "could", "please", "thanks", "can"
-    }
-    all_special_keywords = SPICY_KEYWORDS | VEGETARIAN_KEYWORDS | VEGAN_KEYWORDS | DRINK_KEYWORDS
-    
     words = re.findall(r'\b\w{3,}\b', query_lower)
     for word in words:
         # Skip if it's a common word or already categorized
-        if word not in common_words and word not in all_special_keywords:
+        if word not in COMMON_QUERY_WORDS and word not in ALL_SPECIAL_KEYWORDS:
             # Also skip words that are drink-related variations
-            if not any(drink_word in word or word in drink_word for drink_word in drink_patterns):
+            if word not in DRINK_PATTERN_SUBSTRINGS and not DRINK_PATTERN_MATCHER.contains_any(word):
                 requirements["other_keywords"].append(word)
     
+    if ranges:
+        requirements["ranges"] = ranges
+    if corrections:
+        requirements["corrections"] = corrections
     return requirements
 
-def item_matches_requirements(item, requirements):
-    """Check if a menu item matches all requirements"""
-    name = item.get('name', '').lower()
-    description = item.get('description', '').lower()
-    existing_tags = item.get('tags', [])
+def cached_query_requirements(query, catalog):
+    """parse_query_requirements through the requirements cache; returns a fresh copy
+
+    Corrections depend on the catalog vocabulary, so the cache is bound to
+    the catalog version.
+    """
+    requirements_cache.bind_version(catalog.version)
+    key = query.lower()
+    requirements = requirements_cache.get(key)
+    if requirements is None:
+        requirements = parse_query_requirements(query, query_corrector(catalog))
+        requirements_cache.put(key, requirements)
+    return dict(requirements, other_keywords=list(requirements["other_keywords"]))
+
+def cache_cell(lat, lng):
+    return floor(lat / CACHE_CELL_DEGREES), floor(lng / CACHE_CELL_DEGREES)
+
+def cell_circle(cell):
+    """Get the center of a cache cell and a distance covering every point of the cell"""
+    min_lat = max(cell[0] * CACHE_CELL_DEGREES, -90.0)
+    max_lat = min((cell[0] + 1) * CACHE_CELL_DEGREES, 90.0)
+    min_lng = cell[1] * CACHE_CELL_DEGREES
+    max_lng = (cell[1] + 1) * CACHE_CELL_DEGREES
+    center_lat = (min_lat + max_lat) / 2
+    center_lng = (min_lng + max_lng) / 2
+    reach = max(haversine(center_lat, center_lng, corner_lat, corner_lng)
+                for corner_lat in (min_lat, max_lat) for corner_lng in (min_lng, max_lng))
+    return center_lat, center_lng, reach * 1.01
+
+def cell_matches(catalog, requirements, lat, lng):
+    """Get (rows, matched item indices, items scanned) covering every location in (lat, lng)'s cell
+
+    Any restaurant within the radius of a point in the cell is within the
+    radius plus the cell's reach of its center, so the items matching the
+    requirements there can be cached per (cell, requirements) and narrowed
+    to the exact location on each request.
+    """
+    required, forbidden = requirement_masks(requirements)
+    keywords = sorted(set(requirements["other_keywords"]))
+    ranges = requirements.get("ranges")
+    if result_cache.maxsize <= 0:
+        rows, _ = catalog.nearby(lat, lng, DEFAULT_RADIUS_KM)
+        candidates = catalog.candidates(rows, keywords, ranges)
+        return rows, catalog.filter_features(candidates, required, forbidden), len(candidates)
+
+    result_cache.bind_version(catalog.version)
+    cell = cache_cell(lat, lng)
+    # The version is part of the key so a request still holding an older snapshot cannot mix row numbers
+    key = (catalog.version, cell, required, forbidden, tuple(keywords), ranges_key(ranges))
+    entry = result_cache.get(key)
+    if entry is not None:
+        return entry[0], entry[1], 0
+    center_lat, center_lng, reach = cell_circle(cell)
+    rows, _ = catalog.nearby(center_lat, center_lng, DEFAULT_RADIUS_KM + reach)
+    candidates = catalog.candidates(rows, keywords, ranges)
+    matched = catalog.filter_features(candidates, required, forbidden).astype(np.int32)
+    result_cache.put(key, (rows, matched))
+    return rows, matched, len(candidates)
+
+@app.route('/recommend', methods=['POST'])
+def recommend():
+    """Main recommendation endpoint"""
+    timer = StageTimer()
+    data = request.json
+    user_query = data.get('query', '')
+    profiler = SamplingProfiler().start() if data.get('profile') and PROFILING_ENABLED else None
     
-    # Expand tags based on content
-    expanded_tags = expand_tags_from_content(item['name'], item['description'], existing_tags)
+    # Ranking options: weight overrides and a seed for the optional random term
+    try:
+        weights = merge_weights(data.get('weights'))
+        seed = ranking_seed(data.get('seed'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response_format = data.get('format', 'nested')
+    if response_format not in RESPONSE_FORMATS:
+        return jsonify({"error": f"unknown response format: {response_format}"}), 400
+    mode = data.get('mode', 'keyword')
+    if mode not in RECOMMEND_MODES:
+        return jsonify({"error": f"unknown recommend mode: {mode}"}), 400
+    try:
+        open_at = request_open_at(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Check if item is a drink
-    is_drink = "drink" in expanded_tags or any(
-        drink_word in name or drink_word in description 
-        for drink_word in DRINK_KEYWORDS
-    )
+    # Parse requirements from query
+    catalog = menu_catalog.snapshot()
+    requirements = cached_query_requirements(user_query, catalog)
+    timer.mark("parse_query")
     
-    # Rule 1: Exclude drinks unless specifically requested
-    if is_drink and not requirements["drinks"]:
-        return False
+    # Get location (default to Tech Square)
+    lat, lng = request_location(data)
     
-    # Rule 2: If asking for drinks, only return drinks
-    if requirements["drinks"] and not is_drink:
-        return False
+    # Items matching the requirements anywhere near the location's cache cell,
+    # found with the inverted index, the feature bits and the in-memory catalog.
+    # In semantic mode only the dietary and drink flags filter; keywords just rank.
+    hard_requirements = dict(requirements, other_keywords=[]) if mode == "semantic" else requirements
+    cell_rows, cell_matched, items_scanned = cell_matches(catalog, hard_requirements, lat, lng)
+    timer.mark("match_items")
     
-    # Rule 3: Check spicy requirement (AND condition)
-    if requirements["spicy"]:
-        has_spicy = "spicy" in expanded_tags or any(
-            spicy_word in name or spicy_word in description 
-            for spicy_word in SPICY_KEYWORDS
-        )
-        if not has_spicy:
-            return False
+    # Narrow them to the restaurants within the radius of this exact location
+    # (and open at the requested time)
+    rows, distances = catalog.within(cell_rows, lat, lng, DEFAULT_RADIUS_KM)
+    rows, distances = open_restaurants(catalog, rows, distances, open_at)
+    matched = catalog.items_at(cell_matched, rows)
+    timer.mark("nearby_restaurants")
     
-    # Rule 4: Check vegetarian requirement (AND condition)
-    if requirements["vegetarian"]:
-        has_vegetarian = "vegetarian" in expanded_tags or any(
-            veg_word in name or veg_word in description 
-            for veg_word in VEGETARIAN_KEYWORDS
-        )
-        # Also check if it explicitly contains meat words (exclude if found)
-        meat_words = {"chicken", "beef", "pork", "lamb", "fish", "shrimp", "salmon", "tuna", "bacon", "ham", "turkey", "duck", "crab", "lobster", "meat", "steak"}
-        has_meat = any(meat in name or meat in description for meat in meat_words)
-        
-        if not has_vegetarian or has_meat:
-            return False
+    # Score the matches and keep the best 20, allowing up to 5 items per restaurant
+    distance_by_row = distances_by_row(catalog, rows, distances)
+    if mode == "semantic":
+        query_text, _ = query_corrector(catalog).correct_text(user_query.lower())
+        selected = rank_semantic(catalog, matched, query_text, distance_by_row, weights, seed)
+    else:
+        selected = rank_matches(catalog, matched, requirements["other_keywords"], distance_by_row, weights, seed)
+    # Only the selected items (and their restaurants) are materialized
+    if response_format == "normalized":
+        restaurants, recommendations = normalized_results(catalog, selected, lat, lng)
+    else:
+        recommendations = nested_results(catalog, selected, lat, lng)
+    timer.mark("select")
     
-    # Rule 5: Check vegan requirement if specified
-    if requirements["vegan"]:
-        has_vegan = "vegan" in expanded_tags or any(
-            vegan_word in name or vegan_word in description 
-            for vegan_word in VEGAN_KEYWORDS
-        )
-        # Check for dairy/egg words that would disqualify vegan items
-        non_vegan_words = {"cheese", "milk", "cream", "butter", "egg", "yogurt", "mayo", "mayonnaise", "honey"}
-        has_non_vegan = any(word in name or word in description for word in non_vegan_words)
-        
-        if not has_vegan or has_non_vegan:
-            return False
+    debug_info = {
+        "parsed_requirements": requirements,
+        "total_items_checked": catalog.count_items(rows),
+        "items_matching_criteria": len(matched),
+        "unique_restaurants": len(recommendations),
+        "menu_cache": menu_catalog.stats(),
+        "query_cache": {"requirements": requirements_cache.stats(), "results": result_cache.stats()}
+    }
+    if mode != "keyword":
+        debug_info["mode"] = mode
+    if open_at is not None:
+        debug_info["open_at"] = open_at.isoformat(timespec="minutes")
+    if data.get('timings'):
+        debug_info["timings_ms"] = timer.as_ms()
+    if profiler:
+        profiler.stop()
+        debug_info["profile"] = profiler.report()
     
-    # Rule 6: Check other keywords (AND condition for all)
-    for keyword in requirements["other_keywords"]:
-        if not (keyword in name or keyword in description or keyword in str(expanded_tags).lower()):
-            return False
+    STAGE_LATENCY.observe_many(((stage,), seconds) for stage, seconds in timer.stages.items())
+    REQUEST_LATENCY.observe(timer.total())
+    REQUESTS.inc()
+    ITEMS_SCANNED.inc(items_scanned)
     
-    return True
+    if response_format == "normalized":
+        # Debug output changes on every request, so it is only sent when asked for
+        include_debug = data.get('debug') or data.get('timings') or profiler
+        body = serialization.encode_normalized(restaurants, recommendations, debug_info if include_debug else None)
+        return compact_response(body)
+    return jsonify({
+        "recommendations": recommendations,
+        "debug_info": debug_info
+    })
 
-@app.route('/recommend', methods=['POST'])
-def recommend():
-    """Main recommendation endpoint"""
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    """Answer several queries for one location from a single nearby scan
+
+    Each entry of "results" holds the recommendations and query-level
+    debug info that /recommend would return for that query alone.
+    """
+    timer = StageTimer()
     data = request.json
-    user_query = data.get('query', '')
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return jsonify({"error": "queries must be a list of strings"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"at most {MAX_BATCH_QUERIES} queries per batch"}), 400
+    try:
+        weights = merge_weights(data.get('weights'))
+        seed = ranking_seed(data.get('seed'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        open_at = request_open_at(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Parse requirements from query
-    requirements = parse_query_requirements(user_query)
+    catalog = menu_catalog.snapshot()
+    requirement_sets = [cached_query_requirements(query, catalog) for query in queries]
+    timer.mark("parse_query")
     
-    # Get location (default to Tech Square)
+    lat, lng = request_location(data)
+    rows, distances = catalog.nearby(lat, lng, DEFAULT_RADIUS_KM)
+    rows, distances = open_restaurants(catalog, rows, distances, open_at)
+    distance_by_row = distances_by_row(catalog, rows, distances)
+    timer.mark("nearby_restaurants")
+    
+    # Every item of the nearby menus, with its feature bits, gathered once for all queries
+    nearby_items = catalog.candidates(rows, [])
+    nearby_features = catalog.item_features[nearby_items]
+    timer.mark("menu_fetch")
+    
+    results = []
+    matched_by_masks = {}
+    items_scanned = 0
+    for query, requirements in zip(queries, requirement_sets):
+        required, forbidden = requirement_masks(requirements)
+        keywords = requirements["other_keywords"]
+        ranges = requirements.get("ranges")
+        if keywords or ranges:
+            candidates = catalog.candidates(rows, keywords, ranges)
+            matched = catalog.filter_features(candidates, required, forbidden)
+            items_scanned += len(candidates)
+        else:
+            # Queries with the same dietary flags share one pass over the nearby items
+            matched = matched_by_masks.get((required, forbidden))
+            if matched is None:
+                matched = nearby_items[(nearby_features & (required | forbidden)) == required]
+                matched_by_masks[(required, forbidden)] = matched
+                items_scanned += len(nearby_items)
+        recommendations = nested_results(catalog, rank_matches(catalog, matched, keywords, distance_by_row,
+                                                               weights, seed), lat, lng)
+        results.append({
+            "query": query,
+            "recommendations": recommendations,
+            "debug_info": {
+                "parsed_requirements": requirements,
+                "total_items_checked": len(nearby_items),
+                "items_matching_criteria": len(matched),
+                "unique_restaurants": len(recommendations)
+            }
+        })
+    timer.mark("evaluate_queries")
+    
+    BATCH_LATENCY.observe(timer.total())
+    BATCH_REQUESTS.inc()
+    BATCH_QUERIES.inc(len(queries))
+    ITEMS_SCANNED.inc(items_scanned)
+    
+    debug_info = {
+        "queries": len(queries),
+        "nearby_restaurants": len(rows),
+        "total_items_checked": len(nearby_items),
+        "menu_cache": menu_catalog.stats(),
+        "timings_ms": timer.as_ms()
+    }
+    if open_at is not None:
+        debug_info["open_at"] = open_at.isoformat(timespec="minutes")
+    return jsonify({
+        "results": results,
+        "debug_info": debug_info
+    })
+
+def request_location(data):
+    """Get the (lat, lng) of a request, defaulting to Tech Square"""
     location = data.get('location', None)
     default_lat = 33.7770706
     default_lng = -84.3902668
@@ -304,46 +483,127 @@ def recommend():
     if location:
         lat = location.get('lat', default_lat)
         lng = location.get('lng', default_lng)
-    
-    # Get nearby restaurants
-    nearby_restaurants = get_restaurants_nearby(lat, lng)
-    
-    # Get all menu items with restaurant info
-    all_menu_items = []
-    for rest in nearby_restaurants:
-        menu_items = get_menu_items_for_restaurant(rest['id'])
-        for item in menu_items:
-            item['restaurant'] = rest
-            all_menu_items.append(item)
-    
-    # Filter items based on requirements
-    filtered_items = []
-    for item in all_menu_items:
-        if item_matches_requirements(item, requirements):
-            filtered_items.append(item)
-    
-    # Shuffle and allow up to 5 items per restaurant
-    random.shuffle(filtered_items)
+    return lat, lng
+
+def request_open_at(data):
+    """Get the local time results must be open at, from "open_at" or "open_now", or None
+
+    open_at is an ISO 8601 date and time; one with an offset is converted
+    to LOCAL_TIMEZONE. Raises ValueError when it cannot be read.
+    """
+    open_at = data.get('open_at')
+    if open_at is None:
+        return datetime.now(LOCAL_TIMEZONE) if data.get('open_now') else None
+    try:
+        when = datetime.fromisoformat(open_at)
+    except (TypeError, ValueError):
+        raise ValueError(f"open_at must be an ISO 8601 date and time, got {open_at!r}")
+    return when.astimezone(LOCAL_TIMEZONE) if when.tzinfo is not None else when
+
+def open_restaurants(catalog, rows, distances, open_at):
+    """Keep the (rows, distances) of restaurants open at open_at (all of them when it is None)"""
+    if open_at is None:
+        return rows, distances
+    is_open = catalog.open_at(rows, minute_of_week(open_at))
+    return rows[is_open], distances[is_open]
+
+def distances_by_row(catalog, rows, distances):
+    """Spread nearby distances over every catalog row (NaN for rows out of range)"""
+    distance_by_row = np.full(len(catalog.restaurants), np.nan)
+    distance_by_row[rows] = distances
+    return distance_by_row
+
+def rank_matches(catalog, matched, keywords, distance_by_row, weights, seed=None):
+    """Score matched item indices and pick the best, as (item index, restaurant row, score) tuples"""
+    if keywords:
+        keyword = np.array([keyword_strength(catalog.item_names[index], keywords) for index in matched], dtype=float)
+    else:
+        keyword = np.zeros(len(matched))
+    return select_matches(catalog, matched, keyword, distance_by_row, weights, seed)
+
+def rank_semantic(catalog, matched, query_text, distance_by_row, weights, seed=None):
+    """rank_matches with the keyword signal replaced by the items' similarity to query_text
+
+    One matvec scores every matched item against the query vector, and only
+    the SEMANTIC_POOL most similar are scored in full. A query with no
+    words known to the catalog ranks the matches as a keyword-less query.
+    """
+    index = catalog.semantic_index()
+    query = index.embed(query_text)
+    if not query.any():
+        return select_matches(catalog, matched, np.zeros(len(matched)), distance_by_row, weights, seed)
+    similarity = index.similarities(matched, query)
+    if len(matched) > SEMANTIC_POOL:
+        pool = np.sort(np.argpartition(-similarity, SEMANTIC_POOL - 1)[:SEMANTIC_POOL])
+        matched, similarity = matched[pool], similarity[pool]
+    related = similarity > 0
+    return select_matches(catalog, matched[related], similarity[related].astype(float), distance_by_row, weights, seed)
+
+def select_matches(catalog, matched, keyword, distance_by_row, weights, seed=None):
+    """Score matched items given their keyword signal and keep the best per restaurant"""
+    rng = np.random.default_rng(seed) if weights["random"] else None
+    matched_rows = catalog.item_row[matched]
+    scores = score_items(
+        keyword=keyword,
+        rating=catalog.rest_rating[matched_rows],
+        ratings_count=catalog.rest_ratings_count[matched_rows],
+        distance_km=distance_by_row[matched_rows],
+        price=catalog.item_price[matched],
+        radius_km=DEFAULT_RADIUS_KM,
+        weights=weights,
+        rng=rng
+    )
+    top = select_top_k(scores, matched_rows, k=MAX_RECOMMENDATIONS, per_group_cap=MAX_ITEMS_PER_RESTAURANT)
+    return [(int(matched[index]), int(matched_rows[index]), round(float(scores[index]), 4)) for index in top]
+
+def nested_results(catalog, selected, lat, lng):
+    """Recommendations that each embed a full copy of their restaurant"""
+    restaurant_dicts = {}
     recommendations = []
-    restaurant_item_counts = {}
-    for item in filtered_items:
-        rest_id = item['restaurant']['id']
-        count = restaurant_item_counts.get(rest_id, 0)
-        if count < 5:
-            recommendations.append(item)
-            restaurant_item_counts[rest_id] = count + 1
-        if len(recommendations) >= 20:
-            break
-    
-    return jsonify({
-        "recommendations": recommendations,
-        "debug_info": {
-            "parsed_requirements": requirements,
-            "total_items_checked": len(all_menu_items),
-            "items_matching_criteria": len(filtered_items),
-            "unique_restaurants": len(recommendations)
-        }
-    })
+    for index, row, score in selected:
+        restaurant = restaurant_dicts.get(row)
+        if restaurant is None:
+            record = catalog.restaurants[row]
+            # Report the scalar distance so responses match the per-row SQL lookup exactly
+            restaurant = restaurant_dicts[row] = record.to_dict(haversine(lat, lng, record.lat, record.lng))
+        recommendations.append(dict(catalog.item_dict(index), restaurant=restaurant, score=score))
+    return recommendations
+
+def normalized_results(catalog, selected, lat, lng):
+    """Serialized restaurants (once each) and recommendations that refer to them by id"""
+    restaurants = []
+    seen = set()
+    recommendations = []
+    for index, row, score in selected:
+        record = catalog.restaurants[row]
+        if row not in seen:
+            seen.add(row)
+            fragment = catalog.restaurant_fragments.get(row)
+            if fragment is None:
+                fragment = catalog.restaurant_fragments[row] = serialization.restaurant_fragment(record)
+            distance = haversine(lat, lng, record.lat, record.lng)
+            restaurants.append((record.id, serialization.with_distance(fragment, distance)))
+        recommendations.append(dict(catalog.item_dict(index), restaurant_id=record.id, score=score))
+    return restaurants, recommendations
+
+def compact_response(body):
+    """JSON response with a weak ETag, answering If-None-Match and gzip-encoding when accepted"""
+    tag = serialization.etag(body)
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if len(body) >= serialization.GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+            response.set_data(serialization.gzip_body(body))
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(tag, weak=True)
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of the service metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
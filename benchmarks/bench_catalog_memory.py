@@ -0,0 +1,105 @@
+# Memory footprint of the in-memory catalog: the columnar CatalogSnapshot
+# against the earlier dict-per-item layout, measured with tracemalloc.
+#
+#   python benchmarks/bench_catalog_memory.py --restaurants 2000 --items 40
+#
+# The dict layout is rebuilt here the way menu_catalog.py used to hold it:
+# one (restaurant_id, item dict, features, search_text) tuple per menu item
+# plus a keyword index, with every nearby restaurant turned into a dict on
+# each request.
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic_data
+from keyword_index import KeywordIndex
+from menu_catalog import MenuCatalog, RESTAURANT_FIELDS
+from menu_features import classify_item, expand_tags_from_content, item_search_text
+
+def measure(build):
+    """Get (result, bytes still allocated, peak bytes) of build()"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - before, peak - before
+
+def dict_catalog(db_path):
+    """The dict-per-item catalog plus a dict for every restaurant"""
+    conn = sqlite3.connect(db_path)
+    restaurant_rows = conn.execute(
+        'SELECT %s FROM restaurants ORDER BY id' % ', '.join(RESTAURANT_FIELDS)).fetchall()
+    item_rows = conn.execute('SELECT restaurant_id, name, description, price, calories, tags, features '
+                             'FROM menu_items ORDER BY restaurant_id, id').fetchall()
+    conn.close()
+    restaurants = []
+    for row in restaurant_rows:
+        rest = dict(zip(RESTAURANT_FIELDS, row))
+        rest["opening_hours"] = json.loads(rest["opening_hours"]) if rest["opening_hours"] else []
+        rest["photo_url"] = json.loads(rest["photo_url"]) if rest["photo_url"] else []
+        restaurants.append(rest)
+    entries = []
+    for restaurant_id, name, description, price, calories, tags, features in item_rows:
+        item = {"name": name, "description": description, "price": price, "calories": calories,
+                "tags": json.loads(tags) if tags else []}
+        if features is None:
+            features = classify_item(name, description, item["tags"])
+        search_text = item_search_text(name, description, expand_tags_from_content(name, description, item["tags"]))
+        entries.append((restaurant_id, item, features, search_text))
+    return restaurants, entries, KeywordIndex(entry[3] for entry in entries)
+
+def columnar_catalog(db_path):
+    catalog = MenuCatalog(db_path)
+    catalog.refresh()
+    return catalog
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare catalog memory footprints")
+    parser.add_argument("--restaurants", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=40, help="menu items per restaurant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", "data"))
+    args = parser.parse_args(argv)
+
+    print(f"Building synthetic catalog: {args.restaurants} restaurants x {args.items} items")
+    _, db_path, _, _ = synthetic_data.write_catalog(args.data_dir, args.restaurants, args.items, seed=args.seed)
+
+    dict_layout, dict_bytes, dict_peak = measure(lambda: dict_catalog(db_path))
+    search_texts = [entry[3] for entry in dict_layout[1]]
+    items = len(search_texts)
+    # Only the search texts are kept, to size the keyword index on its own
+    dict_layout = None
+    catalog, columnar_bytes, columnar_peak = measure(lambda: columnar_catalog(db_path))
+    index_bytes = measure(lambda: KeywordIndex(search_texts))[1]
+
+    print(f"{'layout':<10} {'retained MiB':>13} {'excl. index':>12} {'bytes/item':>11} {'load peak MiB':>14}")
+    for label, retained, peak in (("dicts", dict_bytes, dict_peak), ("columnar", columnar_bytes, columnar_peak)):
+        print(f"{label:<10} {retained / 2 ** 20:13.1f} {(retained - index_bytes) / 2 ** 20:12.1f} "
+              f"{retained / max(items, 1):11.0f} {peak / 2 ** 20:14.1f}")
+    print(f"columnar / dicts: {columnar_bytes / dict_bytes:.2f}x retained, "
+          f"{(columnar_bytes - index_bytes) / (dict_bytes - index_bytes):.2f}x excluding the keyword index")
+
+    # Transient allocation of one broad request against the columnar catalog
+    os.environ["OPENMENU_DB_PATH"] = db_path
+    import app_sqlite
+    app_sqlite.menu_catalog = catalog
+
+    def request():
+        with app_sqlite.app.test_request_context('/recommend', method='POST', json={"query": "spicy"}):
+            return app_sqlite.recommend()
+
+    request()
+    _, _, request_peak = measure(request)
+    print(f"peak allocation of one 'spicy' request: {request_peak / 2 ** 10:.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Ingestion benchmark: peak memory and time of loading restaurant dumps of
+# growing size into a fresh restaurants.db, for
+#   previous   - json.load of the whole dump, then one upsert pass over all of it
+#   streaming  - setup_db.py: records parsed, deduplicated and upserted in batches
+#   ndjson     - the same, reading an NDJSON copy of the dump
+#
+#   python benchmarks/bench_ingest.py --sizes 1000 4000 16000 --items 40
+#
+# Each load runs in its own process so ru_maxrss is the peak of that load alone.
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic_data
+from restaurant_stream import write_records
+
+WORKER = r'''
+import sys, json, time, resource
+import setup_db
+mode, json_path, db_path = sys.argv[1:4]
+start = time.perf_counter()
+if mode == "previous":
+    conn = setup_db.connect(db_path)
+    with conn:
+        c = conn.cursor()
+        setup_db.create_tables(c)
+        with open(json_path, encoding="utf-8") as f:
+            restaurants = json.load(f)
+        setup_db.load_restaurants(c, restaurants, batch_size=len(restaurants) or 1)
+    conn.close()
+else:
+    setup_db.main(["--db", db_path, "--json", json_path])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+'''
+
+def run_load(mode, json_path, db_path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    out = subprocess.run([sys.executable, "-c", WORKER, mode, json_path, db_path], cwd=ROOT,
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare peak memory of whole-file and streaming ingestion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000], help="restaurants per dump")
+    parser.add_argument("--items", type=int, default=40, help="menu items per restaurant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", "data"))
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    db_path = os.path.join(args.data_dir, "ingest.db")
+    results = []
+    for n in args.sizes:
+        stem = os.path.join(args.data_dir, f"ingest_{n}x{args.items}")
+        json_path, ndjson_path = stem + ".json", stem + ".ndjson"
+        for path in (json_path, ndjson_path):
+            write_records(path, synthetic_data.iter_restaurants(n, args.items, seed=args.seed))
+        size_mib = os.path.getsize(json_path) / 2 ** 20
+        for mode, path in (("previous", json_path), ("streaming", json_path), ("ndjson", ndjson_path)):
+            result = run_load(mode, path, db_path)
+            result.update(mode=mode, restaurants=n, input_mib=size_mib)
+            results.append(result)
+            print(f"{n:6d} restaurants ({size_mib:7.1f} MiB)  {mode:<9}  {result['seconds']:7.2f}s  "
+                  f"peak rss {result['max_rss_kib'] / 1024:7.1f} MiB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Microbenchmark: compiled KeywordMatcher vs the per-keyword substring loops
+# it replaced in classify_item and query parsing.
+# Run from the repo root: python benchmarks/bench_keyword_matcher.py
+#
+# expand_tags_from_content keeps its loops: for its few dozen keywords the
+# substring checks (run in C) beat a matcher scan in Python, about 0.9x here.
+import os
+import sys
+import json
+import sqlite3
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_features import (
+    SPICY_KEYWORDS, VEGETARIAN_KEYWORDS, VEGAN_KEYWORDS, DRINK_KEYWORDS,
+    INGREDIENT_TAG_MAP, MEAT_WORDS, NON_VEGAN_WORDS, TAG_FEATURES,
+    FEATURE_DRINK, FEATURE_SPICY, FEATURE_VEGETARIAN, FEATURE_VEGAN,
+    FEATURE_HAS_MEAT, FEATURE_HAS_NON_VEGAN,
+    expand_tags_from_content, classify_item
+)
+
+DB_PATH = "restaurants.db"
+
+def loop_expand_tags(name, description, existing_tags):
+    """expand_tags_from_content as it was before the matcher"""
+    content_lower = f"{name} {description}".lower()
+    expanded_tags = set([tag.lower() for tag in existing_tags])
+    for ingredient, tags in INGREDIENT_TAG_MAP.items():
+        if ingredient in content_lower:
+            for tag in tags:
+                expanded_tags.add(tag)
+    for drink_word in DRINK_KEYWORDS:
+        if drink_word in content_lower:
+            expanded_tags.add("drink")
+            break
+    return expanded_tags
+
+def loop_classify(name, description, tags):
+    """classify_item built on substring loops only"""
+    name = name.lower()
+    description = description.lower()
+    expanded_tags = loop_expand_tags(name, description, tags)
+
+    def mentions(words):
+        return any(word in name or word in description for word in words)
+
+    features = 0
+    for tag in expanded_tags:
+        features |= TAG_FEATURES.get(tag, 0)
+    for words, bit in ((DRINK_KEYWORDS, FEATURE_DRINK), (SPICY_KEYWORDS, FEATURE_SPICY),
+                       (VEGETARIAN_KEYWORDS, FEATURE_VEGETARIAN), (VEGAN_KEYWORDS, FEATURE_VEGAN),
+                       (MEAT_WORDS, FEATURE_HAS_MEAT), (NON_VEGAN_WORDS, FEATURE_HAS_NON_VEGAN)):
+        if mentions(words):
+            features |= bit
+    return features
+
+def loop_query_categories(query):
+    """The per-keyword any() checks parse_query_requirements used to run"""
+    from app_sqlite import DRINK_QUERY_PATTERNS
+    query_lower = query.lower()
+    categories = set()
+    for words, label in ((SPICY_KEYWORDS, "spicy"), (VEGETARIAN_KEYWORDS, "vegetarian"),
+                         (VEGAN_KEYWORDS, "vegan"), (DRINK_QUERY_PATTERNS, "drinks")):
+        if any(keyword in query_lower for keyword in words):
+            categories.add(label)
+    return categories
+
+def matcher_query_categories(query):
+    from app_sqlite import QUERY_MATCHER
+    return QUERY_MATCHER.find(query.lower())
+
+QUERIES = [
+    "spicy", "vegan", "something refreshing and light", "spicy chicken",
+    "I want something spicy and vegan", "cheese pizza", "iced milk tea with boba",
+    "vegetarian burrito bowl with beans", "hot wings", "coffee"
+]
+
+def bench(label, fn, rows, repeat=5):
+    """Time fn over every row and print the best per-item cost"""
+    def run():
+        for row in rows:
+            fn(*row)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    print(f"  {label:<10} {best / len(rows) * 1e6:8.2f} us/item")
+    return best
+
+def main():
+    conn = sqlite3.connect(DB_PATH)
+    rows = [(name, description, json.loads(tags) if tags else [])
+            for name, description, tags in conn.execute('SELECT name, description, tags FROM menu_items')]
+    conn.close()
+
+    mismatches = sum(loop_classify(*row) != classify_item(*row) for row in rows)
+    mismatches += sum(loop_expand_tags(*row) != expand_tags_from_content(*row) for row in rows)
+    print(f"{len(rows)} menu items, {mismatches} mismatches between loops and matcher")
+
+    results = {}
+    for name, loop_fn, matcher_fn in (("classify", loop_classify, classify_item),):
+        print(name)
+        loops = bench("loops", loop_fn, rows)
+        matcher = bench("matcher", matcher_fn, rows)
+        print(f"  speedup    {loops / matcher:8.2f}x")
+        results[name] = {"loops_us": loops / len(rows) * 1e6, "matcher_us": matcher / len(rows) * 1e6}
+
+    queries = [(query,) for query in QUERIES]
+    print("query_categories")
+    mismatches = sum(loop_query_categories(*q) != matcher_query_categories(*q) for q in queries)
+    loops = bench("loops", loop_query_categories, queries, repeat=200)
+    matcher = bench("matcher", matcher_query_categories, queries, repeat=200)
+    print(f"  speedup    {loops / matcher:8.2f}x ({mismatches} mismatches)")
+    results["query_categories"] = {"loops_us": loops / len(queries) * 1e6, "matcher_us": matcher / len(queries) * 1e6}
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Opening-hours filter benchmark: time to keep the nearby restaurants open at
+# a given minute of the week, for
+#   indexed    - CatalogSnapshot.open_at, one binary search per restaurant
+#                over the precompiled interval keys
+#   parsed     - json.loads and parse_opening_hours of every nearby
+#                restaurant's weekday_text on every request
+#
+#   python benchmarks/bench_opening_hours.py --db benchmarks/data/synthetic_2000x40.db --repeat 200
+#
+# Both must keep the same restaurants; the benchmark stops if they do not.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from menu_catalog import MenuCatalog
+from opening_hours import WEEK_MINUTES, parse_opening_hours
+from bench_recommend import summarize
+
+RADIUS_KM = 10
+
+def indexed(catalog, rows, minute):
+    return rows[catalog.open_at(rows, minute)]
+
+def parsed(catalog, rows, minute):
+    keep = []
+    for row in rows:
+        intervals = parse_opening_hours(json.loads(catalog.restaurants[row].opening_hours or "[]"))
+        if any(start <= minute < end for start, end in intervals):
+            keep.append(row)
+    return np.array(keep, dtype=rows.dtype)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare precompiled and per-request opening-hours filtering")
+    parser.add_argument("--db", default=os.path.join(ROOT, "restaurants.db"))
+    parser.add_argument("--repeat", type=int, default=200, help="random (location, time) pairs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    catalog = MenuCatalog(args.db).snapshot()
+    rng = random.Random(args.seed)
+    requests = [(33.7770706 + rng.uniform(-0.15, 0.15), -84.3902668 + rng.uniform(-0.15, 0.15),
+                 rng.randrange(WEEK_MINUTES)) for _ in range(args.repeat)]
+    print(f"{len(catalog.rest_ids)} restaurants, {len(catalog.hours_open_keys)} opening intervals")
+    results = {}
+    for label, method in (("indexed", indexed), ("parsed", parsed)):
+        samples, kept, nearby = [], [], 0
+        start = time.perf_counter()
+        for lat, lng, minute in requests:
+            rows, _ = catalog.nearby(lat, lng, RADIUS_KM)
+            nearby += len(rows)
+            t0 = time.perf_counter()
+            kept.append(method(catalog, rows, minute))
+            samples.append(time.perf_counter() - t0)
+        results[label] = kept
+        summary = summarize(samples, time.perf_counter() - start)
+        print(f"{label:<8} {nearby / len(requests):7.0f} nearby  {sum(map(len, kept)) / len(requests):7.0f} open  "
+              f"p50 {summary['p50_ms']:8.3f} ms  p95 {summary['p95_ms']:8.3f} ms")
+    if not all(np.array_equal(a, b) for a, b in zip(results["indexed"], results["parsed"])):
+        raise SystemExit("indexed and parsed filters disagree")
+
+if __name__ == "__main__":
+    main()
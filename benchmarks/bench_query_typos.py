@@ -0,0 +1,136 @@
+# Typo-tolerant query parsing benchmark: recall on misspelled queries and
+# per-query parse latency, with and without the SymSpell term corrector.
+#
+#   python benchmarks/bench_query_typos.py --db restaurants.db --repeat 200
+#
+# A misspelled query counts as recovered when it finds what the correctly
+# spelled query finds: the same dietary/drink flags and the same items for
+# its free-text keywords. Precision is checked on correctly spelled words
+# that are not on any menu: the corrector must not change their flags
+# (e.g. turn "bear" into "beer" and the query into a drinks query) or
+# their keywords (e.g. turn "lobster" into "oyster" and return another
+# dish); the benchmark stops if it does.
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import app_sqlite
+from menu_catalog import MenuCatalog
+from bench_recommend import summarize
+
+# (misspelled query, intended query)
+TYPO_QUERIES = [
+    ("spicey chiken", "spicy chicken"),
+    ("somthing refresing", "something refreshing"),
+    ("refreshin drink", "refreshing drink"),
+    ("vegitarian noodel", "vegetarian noodle"),
+    ("vegatarian curry", "vegetarian curry"),
+    ("veggan bowl", "vegan bowl"),
+    ("cofee", "coffee"),
+    ("iced cofee", "iced coffee"),
+    ("capuccino", "cappuccino"),
+    ("expresso", "espresso"),
+    ("lemonaid", "lemonade"),
+    ("smoothy", "smoothie"),
+    ("milkshak", "milkshake"),
+    ("brocoli", "broccoli"),
+    ("panner tikka", "paneer tikka"),
+    ("chikpea", "chickpea"),
+    ("falafal wrap", "falafel wrap"),
+    ("humus", "hummus"),
+    ("sandwhich", "sandwich"),
+    ("burito", "burrito"),
+    ("quesadila", "quesadilla"),
+    ("pizzza", "pizza"),
+    ("peperoni pizza", "pepperoni pizza"),
+    ("chese pizza", "cheese pizza"),
+    ("calzon", "calzone"),
+    ("bulgolgi", "bulgogi"),
+    ("edamamme", "edamame"),
+    ("samosas", "samosa"),
+    ("ramenn", "ramen"),
+    ("biriyani", "biryani"),
+    ("gyro platter", "gyro platter"),
+    ("shrimp tempura rol", "shrimp tempura roll"),
+    ("teryaki chicken", "teriyaki chicken"),
+    ("jalepeno", "jalapeno"),
+    ("siracha wings", "sriracha wings"),
+    ("chipolte", "chipotle"),
+    ("habenero", "habanero"),
+    ("salmom", "salmon"),
+    ("tofu stirfry", "tofu stir fry"),
+    ("fried rcie", "fried rice"),
+    ("dumplins", "dumplings"),
+    ("musroom", "mushroom"),
+    ("avacado", "avocado"),
+]
+
+# Correctly spelled words one or two letters away from a category or catalog word
+PRECISION_QUERIES = [
+    "dine", "dine in", "bear", "wise", "wise choice", "fine", "fine dining",
+    "nice", "something nice", "cold", "cake", "date night", "kind staff", "hole in the wall",
+    "lobster", "lobster roll", "brisket", "brownie", "brunch", "scallops", "risotto", "chowder"
+]
+
+FLAGS = ("spicy", "vegetarian", "vegan", "drinks")
+
+def outcome(catalog, query, corrector):
+    requirements = app_sqlite.parse_query_requirements(query, corrector)
+    items = catalog.keyword_index.search(requirements["other_keywords"]) if requirements["other_keywords"] else []
+    return tuple(requirements[flag] for flag in FLAGS), requirements["other_keywords"], list(items)
+
+def time_parse(queries, corrector, repeat):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if corrector is not None:
+            corrector._cache.clear()  # measure the lookups, not the per-word cache
+        for query in queries:
+            t0 = time.perf_counter()
+            app_sqlite.parse_query_requirements(query, corrector)
+            samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure recall and latency of typo-tolerant query parsing")
+    parser.add_argument("--db", default=os.path.join(ROOT, "restaurants.db"))
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the query list when timing")
+    parser.add_argument("--verbose", action="store_true", help="print every query that is not recovered")
+    args = parser.parse_args(argv)
+
+    catalog = MenuCatalog(args.db).snapshot()
+    start = time.perf_counter()
+    corrector = app_sqlite.query_corrector(catalog)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Corrector: {len(corrector)} terms, {len(corrector.deletes)} deletes, built in {build_ms:.1f} ms")
+
+    flipped = [query for query in PRECISION_QUERIES
+               if outcome(catalog, query, corrector)[:2] != outcome(catalog, query, None)[:2]]
+    print(f"precision          {len(PRECISION_QUERIES) - len(flipped)}/{len(PRECISION_QUERIES)} "
+          f"correctly spelled queries keep their flags and keywords")
+    if flipped:
+        raise SystemExit("corrector changed the flags or keywords of " + ", ".join(
+            f"{query!r} ({corrector.correct_text(query)[0]!r})" for query in flipped))
+
+    misspelled = [typo for typo, _ in TYPO_QUERIES]
+    for label, active in (("without corrector", None), ("with corrector", corrector)):
+        recovered = [typo for typo, intended in TYPO_QUERIES
+                     if outcome(catalog, typo, active)[::2] == outcome(catalog, intended, active)[::2]]
+        result = time_parse(misspelled, active, args.repeat)
+        print(f"{label:<18} recall {len(recovered)}/{len(TYPO_QUERIES)} ({len(recovered) / len(TYPO_QUERIES):.0%})  "
+              f"parse p50 {result['p50_ms'] * 1000:7.1f} us  p95 {result['p95_ms'] * 1000:7.1f} us")
+        if args.verbose:
+            for typo, intended in TYPO_QUERIES:
+                if typo not in recovered:
+                    got, expected = outcome(catalog, typo, active), outcome(catalog, intended, active)
+                    print(f"    {typo!r}: flags {got[0]} keywords {got[1]}, expected flags {expected[0]} "
+                          f"keywords {expected[1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Numeric range benchmark: time to find the nearby items matching queries
+# with price, calorie and rating constraints, for
+#   indexed    - CatalogSnapshot.candidates with the ranges pushed down
+#                (sorted value slices, rating applied to restaurant rows)
+#   scan       - every nearby candidate gathered, then a vectorized compare
+#   per-item   - every nearby item materialized and checked in Python with
+#                reference.item_matches_requirements
+#
+#   python benchmarks/bench_ranges.py --db benchmarks/data/synthetic_2000x40.db --repeat 20
+#
+# All three must find the same items, and the queries in PARSE_CASES must
+# parse to the expected ranges and keywords; the benchmark stops if not.
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import app_sqlite
+import reference
+from menu_catalog import MenuCatalog
+from menu_features import requirement_masks
+from numeric_ranges import ITEM_RANGE_FIELDS, RESTAURANT_RANGE_FIELDS, range_mask, in_range
+from bench_recommend import summarize
+
+QUERIES = [
+    "under $10",
+    "$3 or less",
+    "over $25",
+    "less than 800 calories",
+    "under 200 calories",
+    "4+ stars",
+    "4.8+ stars",
+    "chicken under $8",
+    "between $5 and $12 noodles",
+    "at least 4 stars and under 500 calories",
+    "between $5 and 12",
+    "tacos $10-15",
+]
+
+# (query, expected ranges, expected free-text keywords)
+PARSE_CASES = [
+    ("between $5 and 12", {"price": {"ge": 5.0, "le": 12.0}}, []),
+    ("between 5 and $12", {"price": {"ge": 5.0, "le": 12.0}}, []),
+    ("tacos $10-15", {"price": {"ge": 10.0, "le": 15.0}}, ["tacos"]),
+    ("noodles from $8 to 12", {"price": {"ge": 8.0, "le": 12.0}}, ["noodles"]),
+    ("5-12 dollars", {"price": {"ge": 5.0, "le": 12.0}}, []),
+    ("300 calories to 500", {"calories": {"ge": 300.0, "le": 500.0}}, []),
+    ("between 300 and 500 calories", {"calories": {"ge": 300.0, "le": 500.0}}, []),
+    ("3-4 stars", {"rating": {"ge": 3.0, "le": 4.0}}, []),
+    ("under $10", {"price": {"lt": 10.0}}, []),
+    ("chicken 5-10", {}, ["chicken"]),
+]
+
+def indexed(catalog, rows, requirements):
+    candidates = catalog.candidates(rows, requirements["other_keywords"], requirements.get("ranges"))
+    return catalog.filter_features(candidates, *requirement_masks(requirements))
+
+def scan(catalog, rows, requirements):
+    ranges = requirements.get("ranges", {})
+    for field in RESTAURANT_RANGE_FIELDS:
+        if field in ranges:
+            rows = rows[range_mask(catalog.columns["rest_" + field][rows], ranges[field])]
+    candidates = catalog.candidates(rows, requirements["other_keywords"])
+    for field in ITEM_RANGE_FIELDS:
+        if field in ranges:
+            candidates = candidates[range_mask(catalog.item_values[field][candidates], ranges[field])]
+    return catalog.filter_features(candidates, *requirement_masks(requirements))
+
+def per_item(catalog, rows, requirements):
+    ranges = requirements.get("ranges", {})
+    result = []
+    for row in rows:
+        if "rating" in ranges and not in_range(catalog.restaurants[row].rating, ranges["rating"]):
+            continue
+        for index in range(catalog.item_start[row], catalog.item_end[row]):
+            if reference.item_matches_requirements(catalog.item_dict(index), requirements):
+                result.append(index)
+    return np.array(result, dtype=np.int64)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare indexed and scanned numeric range filtering")
+    parser.add_argument("--db", default=os.path.join(ROOT, "restaurants.db"))
+    parser.add_argument("--repeat", type=int, default=20, help="random locations per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for query, ranges, keywords in PARSE_CASES:
+        requirements = app_sqlite.parse_query_requirements(query)
+        if requirements.get("ranges", {}) != ranges or requirements["other_keywords"] != keywords:
+            raise SystemExit(f"{query!r} parsed to {requirements.get('ranges', {})} {requirements['other_keywords']}, "
+                             f"expected {ranges} {keywords}")
+
+    catalog = MenuCatalog(args.db).snapshot()
+    rng = random.Random(args.seed)
+    center_lat, center_lng = 33.7770706, -84.3902668
+    locations = [(center_lat + rng.uniform(-0.15, 0.15), center_lng + rng.uniform(-0.15, 0.15))
+                 for _ in range(args.repeat)]
+    print(f"{len(catalog)} menu items, {len(catalog.rest_ids)} restaurants")
+    for query in QUERIES:
+        requirements = app_sqlite.parse_query_requirements(query)
+        timings = {}
+        found = None
+        for label, method in (("indexed", indexed), ("scan", scan), ("per-item", per_item)):
+            samples = []
+            start = time.perf_counter()
+            for lat, lng in locations:
+                rows, _ = catalog.nearby(lat, lng, app_sqlite.DEFAULT_RADIUS_KM)
+                t0 = time.perf_counter()
+                result = method(catalog, rows, requirements)
+                samples.append(time.perf_counter() - t0)
+            timings[label] = summarize(samples, time.perf_counter() - start)
+            if found is None:
+                found = result
+            elif not np.array_equal(np.sort(found), np.sort(result)):
+                raise SystemExit(f"{label} disagrees with indexed on {query!r}")
+        print(f"{query!r:42} {len(found):6d} items  " +
+              "  ".join(f"{label} p50 {timing['p50_ms']:7.2f} ms" for label, timing in timings.items()))
+
+if __name__ == "__main__":
+    main()
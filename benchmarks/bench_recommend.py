@@ -0,0 +1,174 @@
+# Latency/throughput benchmark for /recommend and setup_db.py on synthetic catalogs.
+#
+#   python benchmarks/bench_recommend.py --restaurants 2000 --items 40 --output bench.json
+#
+# Results are written as JSON (with the git commit) so runs from different
+# commits can be compared.
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic_data
+
+# Representative queries: dietary flags, free text, drinks, typos and combinations
+QUERIES = [
+    "spicy",
+    "vegan",
+    "vegetarian",
+    "something refreshing",
+    "chicken",
+    "spicy chicken",
+    "cheese pizza",
+    "I want something spicy and vegan",
+    "milk tea",
+    "sushi roll",
+    "fried rice",
+    "burger",
+]
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(samples, elapsed):
+    return {
+        "requests": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "qps": len(samples) / elapsed if elapsed else 0.0
+    }
+
+def run_queries(call, queries, iterations, warmup=2):
+    """Time call(query) for every query; returns per-query and overall summaries"""
+    for _ in range(warmup):
+        for query in queries:
+            call(query)
+    per_query = {}
+    all_samples = []
+    total_elapsed = 0.0
+    for query in queries:
+        samples = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            call(query)
+            samples.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        total_elapsed += elapsed
+        per_query[query] = summarize(samples, elapsed)
+        all_samples.extend(samples)
+    return {"overall": summarize(all_samples, total_elapsed), "queries": per_query}
+
+def bench_enrichment(n_items, latency_s, workers, batch_size):
+    """Items/sec of generate_data.enrich_menu against a stub completion with fixed latency"""
+    from types import SimpleNamespace
+    import generate_data
+
+    def stub_completion(messages, **kwargs):
+        time.sleep(latency_s)
+        prompt = messages[0]["content"]
+        if "Menu items:" in prompt:
+            items = json.loads(prompt.split("Menu items:", 1)[1])
+            content = json.dumps({"items": [dict(item, calories=500) for item in items]})
+        else:
+            content = json.dumps({"name": "stub", "calories": 500})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    items = [{"name": f"Item {i}", "price": 9.99, "tags": []} for i in range(n_items)]
+    limiter = generate_data.RateLimiter(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9)
+    start = time.perf_counter()
+    generate_data.enrich_menu(items, workers=workers, batch_size=batch_size,
+                              completion_fn=stub_completion, limiter=limiter)
+    elapsed = time.perf_counter() - start
+    return {"items": n_items, "stub_latency_ms": latency_s * 1000, "workers": workers,
+            "batch_size": batch_size, "seconds": elapsed, "items_per_sec": n_items / elapsed}
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(label, result):
+    overall = result["overall"]
+    print(f"{label:<8} p50 {overall['p50_ms']:8.2f} ms  p95 {overall['p95_ms']:8.2f} ms  "
+          f"p99 {overall['p99_ms']:8.2f} ms  {overall['qps']:8.1f} qps")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recommend() on a synthetic catalog")
+    parser.add_argument("--restaurants", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=40, help="menu items per restaurant")
+    parser.add_argument("--radius-km", type=float, default=15.0, help="spread of the synthetic restaurants")
+    parser.add_argument("--iterations", type=int, default=20, help="timed requests per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", "data"))
+    parser.add_argument("--enrich-items", type=int, default=200,
+                        help="items for the stubbed enrichment throughput run (0 to skip)")
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    print(f"Building synthetic catalog: {args.restaurants} restaurants x {args.items} items")
+    json_path, db_path, load_stats, load_seconds = synthetic_data.write_catalog(
+        args.data_dir, args.restaurants, args.items, args.radius_km, args.seed)
+    rows = args.restaurants * (args.items + 1)
+
+    # Point the app at the synthetic database before it is imported
+    os.environ["OPENMENU_DB_PATH"] = db_path
+    start = time.perf_counter()
+    import app_sqlite
+    import_seconds = time.perf_counter() - start
+
+    def direct(query):
+        with app_sqlite.app.test_request_context('/recommend', method='POST', json={"query": query}):
+            return app_sqlite.recommend()
+
+    client = app_sqlite.app.test_client()
+
+    def via_client(query):
+        response = client.post('/recommend', json={"query": query})
+        assert response.status_code == 200, response.status_code
+        return response
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "catalog": {"restaurants": args.restaurants, "items_per_restaurant": args.items,
+                    "radius_km": args.radius_km, "seed": args.seed},
+        "setup_db": {"seconds": load_seconds, "rows": rows, "rows_per_sec": rows / load_seconds},
+        "app_import_seconds": import_seconds,
+        "recommend": {
+            "direct": run_queries(direct, QUERIES, args.iterations),
+            "client": run_queries(via_client, QUERIES, args.iterations)
+        }
+    }
+
+    print(f"setup_db: {rows} rows in {load_seconds:.2f}s ({rows / load_seconds:,.0f} rows/sec)")
+    print_summary("direct", results["recommend"]["direct"])
+    print_summary("client", results["recommend"]["client"])
+    if args.enrich_items:
+        results["enrichment"] = bench_enrichment(args.enrich_items, 0.02, workers=8, batch_size=4)
+        print(f"enrichment: {results['enrichment']['items_per_sec']:,.0f} items/sec "
+              f"(stubbed 20 ms completions, 8 workers, batches of 4)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
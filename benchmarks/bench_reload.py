@@ -0,0 +1,104 @@
+# Catalog reload benchmark: a copy of the database gets --changed restaurants
+# rewritten by setup_db.load_restaurants (logging a new catalog version), and
+# requests keep running while MenuCatalog notices it, for
+#   full         - the first load, every restaurant read and prepared
+#   incremental  - a reload of only the changed restaurants, in the background
+#
+# Reported per round: how long the reload took, how many requests were served
+# while it ran and their latency (snapshot() plus a nearby lookup), which
+# stays flat because nothing waits for the reload.
+#
+#   python benchmarks/bench_reload.py --db benchmarks/data/synthetic_2000x40.db --changed 50 --rounds 3
+#
+# The reloaded catalog must match a full load of the same database; the
+# benchmark stops if it does not.
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import setup_db
+import synthetic_data
+from menu_catalog import MenuCatalog
+from bench_recommend import summarize
+
+RADIUS_KM = 5
+
+def same_columns(a, b):
+    for name, column in a.columns.items():
+        other = b.columns[name]
+        if isinstance(column, np.ndarray):
+            if not np.array_equal(column, other):
+                return False
+        elif list(column) != list(other):
+            return False
+    return True
+
+def serve_until_swapped(catalog, previous, rng):
+    """Run requests until the catalog stops being previous; returns per-request seconds"""
+    samples = []
+    while True:
+        t0 = time.perf_counter()
+        snapshot = catalog.snapshot()
+        snapshot.nearby(33.7770706 + rng.uniform(-0.15, 0.15), -84.3902668 + rng.uniform(-0.15, 0.15), RADIUS_KM)
+        samples.append(time.perf_counter() - t0)
+        if snapshot is not previous and not catalog.stats()["reloading"]:
+            return samples
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure full and incremental catalog reloads under load")
+    parser.add_argument("--db", default=os.path.join(ROOT, "benchmarks", "data", "synthetic_2000x40.db"))
+    parser.add_argument("--restaurants", type=int, default=2000, help="restaurants in the synthetic data of --db")
+    parser.add_argument("--items", type=int, default=40, help="items per restaurant in the synthetic data of --db")
+    parser.add_argument("--changed", type=int, default=50, help="restaurants rewritten per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_reload_")
+    db_path = os.path.join(workdir, "restaurants.db")
+    shutil.copy(args.db, db_path)
+    conn = setup_db.connect(db_path)
+    setup_db.create_tables(conn)
+    conn.commit()
+    records = list(synthetic_data.iter_restaurants(args.restaurants, args.items, seed=args.seed))
+    rng = random.Random(args.seed)
+    try:
+        catalog = MenuCatalog(db_path)
+        catalog.snapshot()
+        stats = catalog.stats()
+        print(f"{stats['reload_kind']:<12} {stats['restaurants_reloaded']:6d} restaurants  "
+              f"{stats['load_ms']:9.1f} ms  (version {stats['version']})")
+        for round_number in range(1, args.rounds + 1):
+            for record in rng.sample(records, args.changed):
+                record["rating"] = round(rng.uniform(1, 5), 1)
+                record["menu_items"] = record["menu_items"][1:] + record["menu_items"][:1]
+                record["menu_items"][0] = dict(record["menu_items"][0], name=f"Special no. {round_number}")
+            setup_db.load_restaurants(conn, records)
+            conn.commit()
+
+            previous = catalog.snapshot()
+            start = time.perf_counter()
+            samples = serve_until_swapped(catalog, previous, rng)
+            summary = summarize(samples, time.perf_counter() - start)
+            stats = catalog.stats()
+            print(f"{stats['reload_kind']:<12} {stats['restaurants_reloaded']:6d} restaurants  "
+                  f"{stats['load_ms']:9.1f} ms  (version {stats['version']})  "
+                  f"{len(samples):6d} requests during reload, p50 {summary['p50_ms']:.3f} ms  "
+                  f"p95 {summary['p95_ms']:.3f} ms  max {max(samples) * 1000:.3f} ms")
+            if not same_columns(MenuCatalog(db_path).snapshot(), catalog.snapshot()):
+                raise SystemExit(f"incremental reload of round {round_number} differs from a full load")
+    finally:
+        conn.close()
+        shutil.rmtree(workdir)
+
+if __name__ == "__main__":
+    main()
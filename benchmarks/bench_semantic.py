@@ -0,0 +1,120 @@
+# Semantic search benchmark: build time of the hashed TF-IDF item vectors,
+# and per-query latency of embedding a query, scoring the candidates with
+# one matvec and taking the top-k with argpartition, for
+#   all        - every item in the catalog
+#   nearby     - a --nearby share of the items, like /recommend's candidates
+#
+#   python benchmarks/bench_semantic.py --items 100000 --repeat 200
+#
+# Relevance is checked too: for each query in RELEVANCE_CASES, the share of
+# its top 10 items whose name or description has one of the expected words.
+# The benchmark stops if the mean falls below MIN_PRECISION.
+#
+# Everything runs in-process against synthetic menu items; no network.
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic_data
+from semantic_index import SemanticIndex, VECTOR_DIMS
+from bench_recommend import summarize
+
+ITEMS_PER_RESTAURANT = 40
+
+QUERIES = [
+    "something refreshing and light",
+    "creamy curry",
+    "crispy fried chicken sandwich",
+    "sweet fruity tea",
+    "spicy noodle soup",
+    "grilled fish tacos",
+    "warm comforting breakfast",
+    "cheesy pasta bake",
+]
+
+# (query, words one of which a relevant item's name or description contains)
+RELEVANCE_CASES = [
+    ("creamy curry", ["curry"]),
+    ("crispy fried chicken sandwich", ["chicken"]),
+    ("sweet fruity tea", ["tea"]),
+    ("spicy noodle soup", ["noodle", "soup", "ramen", "pho", "udon"]),
+    ("grilled fish tacos", ["taco", "fish"]),
+    ("cheesy pasta bake", ["chees", "mozzarella"]),
+    ("lobster roll", ["roll"]),
+]
+MIN_PRECISION = 0.8
+
+def synthetic_texts(n_items, seed=0):
+    """Item texts laid out like CatalogSnapshot.item_text"""
+    restaurants = synthetic_data.iter_restaurants(-(-n_items // ITEMS_PER_RESTAURANT), ITEMS_PER_RESTAURANT, seed=seed)
+    texts = ["\n".join([item.get("name") or "", item.get("description") or "", " ".join(item.get("tags") or [])])
+             for r in restaurants for item in r["menu_items"]]
+    return texts[:n_items]
+
+def top_k(index, candidates, query_text, k):
+    query = index.embed(query_text)
+    similarity = index.similarities(candidates, query)
+    k = min(k, len(candidates))
+    best = np.argpartition(-similarity, k - 1)[:k]
+    return candidates[best[np.argsort(-similarity[best])]], similarity
+
+def precision_at(index, texts, query, words, k=10):
+    """Share of the top k items for query whose name or description has one of words"""
+    best, _ = top_k(index, np.arange(len(index)), query, k)
+    return sum(any(word in "\n".join(texts[i].lower().splitlines()[:2]) for word in words) for i in best) / len(best)
+
+def time_queries(index, candidates, k, repeat):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            t0 = time.perf_counter()
+            top_k(index, candidates, query, k)
+            samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure semantic index build time and query latency")
+    parser.add_argument("--items", type=int, default=100000, help="menu items in the catalog")
+    parser.add_argument("--dims", type=int, default=VECTOR_DIMS)
+    parser.add_argument("--nearby", type=float, default=0.05, help="share of items scored as nearby candidates")
+    parser.add_argument("--k", type=int, default=200, help="items kept per query")
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the query list")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    texts = synthetic_texts(args.items, args.seed)
+    start = time.perf_counter()
+    index = SemanticIndex.build(texts, args.dims)
+    build_s = time.perf_counter() - start
+    print(f"Index: {len(index)} items x {index.dims} dims ({index.vectors.nbytes / 2 ** 20:.1f} MiB), "
+          f"{len(index.feature_hashes)} features, built in {build_s:.2f}s")
+
+    rng = np.random.default_rng(args.seed)
+    everything = np.arange(len(index))
+    nearby = np.sort(rng.choice(len(index), size=max(1, int(args.nearby * len(index))), replace=False))
+    for label, candidates in (("all", everything), ("nearby", nearby)):
+        result = time_queries(index, candidates, args.k, args.repeat)
+        print(f"{label:<7} {len(candidates):7d} candidates  p50 {result['p50_ms']:6.2f} ms  "
+              f"p95 {result['p95_ms']:6.2f} ms  {result['qps']:8.1f} queries/s")
+
+    for query in QUERIES:
+        best, similarity = top_k(index, everything, query, 3)
+        print(f"  {query!r}: " + ", ".join(f"{texts[i].splitlines()[0]!r} ({similarity[i]:.2f})" for i in best))
+
+    precisions = [precision_at(index, texts, query, words) for query, words in RELEVANCE_CASES]
+    print("precision@10: " + ", ".join(f"{query!r} {precision:.1f}"
+                                      for (query, _), precision in zip(RELEVANCE_CASES, precisions)))
+    mean = sum(precisions) / len(precisions)
+    print(f"mean precision@10 {mean:.2f}")
+    if mean < MIN_PRECISION:
+        raise SystemExit(f"mean precision@10 {mean:.2f} is below {MIN_PRECISION}")
+
+if __name__ == "__main__":
+    main()
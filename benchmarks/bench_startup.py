@@ -0,0 +1,128 @@
+# Worker startup benchmark: time from process start until app_sqlite is
+# imported and has answered its first /recommend, and the memory the
+# workers use together, for
+#   previous  - catalog read from SQLite, with the litellm import the app used to do
+#   database  - catalog read from SQLite
+#   snapshot  - catalog memory-mapped from a build_snapshot.py file
+#
+#   python benchmarks/bench_startup.py --restaurants 2000 --items 40 --workers 4
+#
+# Workers run concurrently and are measured while all of them are alive, so
+# the proportional set size (Pss) shows the snapshot pages being shared.
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic_data
+import build_snapshot
+
+WORKER = r'''
+import sys, time, json
+start = time.perf_counter()
+if sys.argv[1] == "1":
+    import litellm
+import app_sqlite
+imported = time.perf_counter()
+app_sqlite.app.test_client().post("/recommend", json={"query": "spicy"})
+ready = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "ready_s": ready - start,
+                  "catalog": app_sqlite.menu_catalog.stats()}), flush=True)
+sys.stdin.read()
+'''
+
+def memory_kib(pid):
+    """Rss/Pss/private KiB of a process from /proc (Linux only)"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return None
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0),
+            "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)}
+
+def start_workers(n, env, preload_litellm):
+    workers = []
+    for _ in range(n):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", WORKER, "1" if preload_litellm else "0"], cwd=ROOT, env=env,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        workers.append((proc, start))
+    results = []
+    for proc, start in workers:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"worker exited with {proc.wait()}")
+        result = json.loads(line)
+        result["wall_s"] = time.perf_counter() - start
+        results.append(result)
+    memory = [memory_kib(proc.pid) for proc, _ in workers]
+    for proc, _ in workers:
+        proc.stdin.close()
+        proc.wait()
+    return results, memory
+
+def run_mode(label, n, db_path, snapshot_path, preload_litellm):
+    env = dict(os.environ, OPENMENU_DB_PATH=db_path, OPENMENU_SNAPSHOT_PATH=snapshot_path,
+               # keep litellm from fetching its model price list over the network at import
+               LITELLM_LOCAL_MODEL_COST_MAP="True")
+    results, memory = start_workers(n, env, preload_litellm)
+    summary = {
+        "workers": n,
+        "import_s": sum(r["import_s"] for r in results) / n,
+        "ready_s": sum(r["ready_s"] for r in results) / n,
+        "wall_s": max(r["wall_s"] for r in results),
+        "catalog_load_ms": results[0]["catalog"]["load_ms"],
+        "source": results[0]["catalog"]["source"]
+    }
+    if all(memory):
+        summary["rss_mib_each"] = sum(m["rss"] for m in memory) / n / 1024
+        summary["private_mib_each"] = sum(m["private"] for m in memory) / n / 1024
+        summary["pss_mib_total"] = sum(m["pss"] for m in memory) / 1024
+    line = (f"{label:<9} import {summary['import_s']:6.2f}s  ready {summary['ready_s']:6.2f}s  "
+            f"catalog load {summary['catalog_load_ms']:9.1f} ms")
+    if "pss_mib_total" in summary:
+        line += (f"  rss {summary['rss_mib_each']:6.1f} MiB/worker  private {summary['private_mib_each']:6.1f} "
+                 f"MiB/worker  pss {summary['pss_mib_total']:6.1f} MiB total")
+    print(line)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare worker startup from SQLite and from a catalog snapshot")
+    parser.add_argument("--restaurants", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=40, help="menu items per restaurant")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent worker processes per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", "data"))
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    print(f"Building synthetic catalog: {args.restaurants} restaurants x {args.items} items")
+    _, db_path, _, _ = synthetic_data.write_catalog(args.data_dir, args.restaurants, args.items, seed=args.seed)
+    snapshot_path = os.path.splitext(db_path)[0] + ".snapshot"
+    build_snapshot.main(["--db", db_path, "--out", snapshot_path])
+    missing = os.path.join(args.data_dir, "no-such.snapshot")
+
+    results = {
+        "previous": run_mode("previous", args.workers, db_path, missing, preload_litellm=True),
+        "database": run_mode("database", args.workers, db_path, missing, preload_litellm=False),
+        "snapshot": run_mode("snapshot", args.workers, db_path, snapshot_path, preload_litellm=False)
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
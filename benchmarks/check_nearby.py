@@ -0,0 +1,114 @@
+# Nearby-restaurant check: the bounding-box prefilter must not lose any
+# restaurant. Random restaurants and queries, with extra ones at the poles and
+# on both sides of the antimeridian, are written to a scratch database, and
+# every query's result is compared with a brute-force haversine scan of all
+# restaurants, for
+#   sqlite     - reference.get_restaurants_nearby, the indexed SQL bounding box
+#   catalog    - CatalogSnapshot.nearby, the binary search over sorted latitudes
+#
+#   python benchmarks/check_nearby.py --restaurants 3000 --queries 1000
+#
+# Exits non-zero and lists the first mismatches if any query differs.
+import os
+import sys
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import setup_db
+import reference
+from geo import haversine
+from db_pool import connect_readonly
+from menu_catalog import MenuCatalog
+
+RADII_KM = [0.5, 5, 50, 500, 2000, 10000, 20000]
+# Distances this close to the radius may round either way; they are not counted as misses
+EDGE_KM = 1e-6
+
+def random_point(rng, kind):
+    if kind == "pole":
+        return rng.choice([1, -1]) * rng.uniform(85, 90), rng.uniform(-180, 180)
+    if kind == "antimeridian":
+        return rng.uniform(-85, 85), rng.choice([1, -1]) * (180 - rng.uniform(0, 0.5))
+    return rng.uniform(-90, 90), rng.uniform(-180, 180)
+
+def scenario(rng, count):
+    """Points spread over the globe, a third near a pole and a third near the antimeridian"""
+    points = [random_point(rng, ("pole", "antimeridian", "anywhere")[i % 3]) for i in range(count)]
+    # The exact extremes too
+    return points + [(90.0, 0.0), (-90.0, 0.0), (0.0, 180.0), (0.0, -180.0)]
+
+def brute_force(points, lat, lng, radius_km):
+    """(ids within radius_km, ids right on its edge) by checking every restaurant"""
+    inside, edge = [], set()
+    for restaurant_id, (plat, plng) in points.items():
+        distance = haversine(lat, lng, plat, plng)
+        if distance <= radius_km:
+            inside.append(restaurant_id)
+        if abs(distance - radius_km) <= EDGE_KM:
+            edge.add(restaurant_id)
+    return inside, edge
+
+def compare(conn, catalog, points, queries, rng):
+    """Run every query through both lookups; returns (mismatches, restaurants found)"""
+    methods = {
+        "sqlite": lambda lat, lng, radius: [r["id"] for r in reference.get_restaurants_nearby(conn, lat, lng, radius)],
+        "catalog": lambda lat, lng, radius: [int(catalog.rest_ids[row])
+                                             for row in catalog.nearby(lat, lng, radius)[0]]
+    }
+    mismatches = []
+    found = 0
+    for lat, lng in queries:
+        radius = rng.choice(RADII_KM)
+        expected, edge = brute_force(points, lat, lng, radius)
+        found += len(expected)
+        for label, method in methods.items():
+            got = method(lat, lng, radius)
+            if (set(got) ^ set(expected)) - edge or got != sorted(got):
+                mismatches.append((label, lat, lng, radius, len(expected), len(got)))
+    return mismatches, found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check nearby-restaurant lookups against a brute-force scan")
+    parser.add_argument("--restaurants", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="check_nearby_")
+    db_path = os.path.join(workdir, "restaurants.db")
+    conn = sqlite3.connect(db_path)
+    setup_db.create_tables(conn)
+    locations = scenario(rng, args.restaurants)
+    conn.executemany("INSERT INTO restaurants (source_key, name, lat, lng) VALUES (?, ?, ?, ?)",
+                     [(f"check-{i}", f"Restaurant {i}", lat, lng) for i, (lat, lng) in enumerate(locations)])
+    # Restaurants without coordinates are never nearby
+    conn.execute("INSERT INTO restaurants (source_key, name) VALUES ('check-none', 'No location')")
+    conn.commit()
+    points = {restaurant_id: (lat, lng) for restaurant_id, lat, lng in
+              conn.execute("SELECT id, lat, lng FROM restaurants WHERE lat IS NOT NULL")}
+    conn.close()
+
+    conn = connect_readonly(db_path)
+    try:
+        catalog = MenuCatalog(db_path).snapshot()
+        mismatches, found = compare(conn, catalog, points, scenario(rng, args.queries), rng)
+    finally:
+        conn.close()
+        shutil.rmtree(workdir)
+    print(f"{args.queries + 4} queries over {len(points)} restaurants "
+          f"({found / (args.queries + 4):.1f} nearby on average): {len(mismatches)} mismatches")
+    for label, lat, lng, radius, expected, got in mismatches[:20]:
+        print(f"  {label}: ({lat:.5f}, {lng:.5f}) within {radius} km: expected {expected}, got {got}")
+    if mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
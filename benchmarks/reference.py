@@ -0,0 +1,78 @@
+# Reference implementations of request-path code the service no longer runs.
+# /recommend serves from the columnar MenuCatalog; these per-row versions are
+# what the benchmarks and checks compare it against.
+import json
+
+from geo import haversine, bounding_box
+from numeric_ranges import ITEM_RANGE_FIELDS, in_range
+from menu_features import expand_tags_from_content, classify_item, item_search_text, requirement_masks
+
+def get_restaurants_nearby(conn, lat, lng, radius_km):
+    """Get restaurants within radius of given coordinates"""
+    # Only rows inside the bounding box (served by idx_restaurants_lat_lng)
+    # need the exact haversine check
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+    query = '''SELECT id, name, address, rating, user_ratings_count,
+               opening_hours, phone, website, photo_url, price_level,
+               business_status, google_maps_url, lat, lng FROM restaurants
+               WHERE lat BETWEEN ? AND ?'''
+    params = [min_lat, max_lat]
+    if lng_ranges:
+        query += " AND (" + " OR ".join("lng BETWEEN ? AND ?" for _ in lng_ranges) + ")"
+        for min_lng, max_lng in lng_ranges:
+            params.extend((min_lng, max_lng))
+    query += " ORDER BY id"
+
+    results = []
+    for row in conn.execute(query, params).fetchall():
+        (rid, name, address, rating, user_ratings_count, opening_hours,
+         phone, website, photo_url, price_level, business_status,
+         google_maps_url, rlat, rlng) = row
+
+        dist = haversine(lat, lng, rlat, rlng)
+        if dist <= radius_km:
+            results.append({
+                "id": rid,
+                "name": name,
+                "address": address,
+                "rating": rating,
+                "user_ratings_count": user_ratings_count,
+                "opening_hours": json.loads(opening_hours) if opening_hours else [],
+                "phone": phone,
+                "website": website,
+                "photo_url": json.loads(photo_url) if photo_url else [],
+                "price_level": price_level,
+                "business_status": business_status,
+                "google_maps_url": google_maps_url,
+                "lat": rlat,
+                "lng": rlng,
+                "distance_km": dist
+            })
+    return results
+
+def keywords_match(search_text, keywords):
+    """Check that every free-text keyword appears in an item's search text"""
+    for keyword in keywords:
+        if keyword not in search_text:
+            return False
+    return True
+
+def item_matches_requirements(item, requirements):
+    """Check if a menu item matches all requirements"""
+    expanded_tags = expand_tags_from_content(item['name'], item['description'], item.get('tags', []))
+    features = classify_item(item['name'], item['description'], item.get('tags', []))
+
+    # Rules 1-5: drink, spicy, vegetarian and vegan checks against the feature bits
+    required, forbidden = requirement_masks(requirements)
+    if features & (required | forbidden) != required:
+        return False
+
+    # Rule 6: price and calorie ranges (a rating range applies to the restaurant, not the item)
+    ranges = requirements.get("ranges", {})
+    for field in ITEM_RANGE_FIELDS:
+        if field in ranges and not in_range(item.get(field), ranges[field]):
+            return False
+
+    # Rule 7: Check other keywords (AND condition for all)
+    search_text = item_search_text(item['name'], item['description'], expanded_tags)
+    return keywords_match(search_text, requirements["other_keywords"])
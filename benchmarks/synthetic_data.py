@@ -0,0 +1,146 @@
+# Synthetic city-scale catalogs for benchmarking.
+# Writes a restaurants JSON in the same shape as
+# data/restaurant_list/restaurants_google_maps_deduped.json and loads it
+# into a restaurants.db with setup_db.py, so the schema always matches.
+#
+#   python benchmarks/synthetic_data.py --restaurants 2000 --items 40 --out-dir benchmarks/data
+import os
+import sys
+import glob
+import json
+import math
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import setup_db
+
+# Tech Square, the app's default location
+CENTER = (33.7770706, -84.3902668)
+
+# Item templates come from the real enriched menus so the tag and keyword mix is realistic
+TEMPLATE_GLOB = os.path.join(ROOT, "data", "enriched_menus", "*.json")
+
+NAME_PREFIXES = [
+    "", "", "", "Classic", "House", "Spicy", "Crispy", "Grilled", "Signature",
+    "Double", "Mini", "Loaded", "Vegan", "Chef's", "Smoked", "Garlic", "Honey",
+    "Lemon", "Teriyaki", "Sesame", "Buffalo", "Mango", "Iced", "Hot"
+]
+
+CUISINES = [
+    "Grill", "Kitchen", "Cafe", "Bistro", "Tacos", "Pizza", "Noodle Bar",
+    "Sushi", "Curry House", "Boba", "Deli", "Burgers", "BBQ", "Wok"
+]
+
+OPENING_HOURS = [
+    ["{day}: 11:00 AM – 9:00 PM"],
+    ["{day}: 10:30 AM – 10:00 PM"],
+    ["{day}: 7:00 AM – 3:00 PM"],
+    ["{day}: 5:00 PM – 2:00 AM"],
+    ["{day}: Open 24 hours"],
+]
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def load_templates():
+    templates = []
+    for path in sorted(glob.glob(TEMPLATE_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            templates.extend(json.load(f))
+    return templates
+
+def random_point(rng, center, radius_km):
+    """Uniform random point within radius_km of center"""
+    distance = radius_km * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    dlat = distance / 111.195 * math.cos(bearing)
+    dlng = distance / (111.195 * math.cos(math.radians(center[0]))) * math.sin(bearing)
+    return round(center[0] + dlat, 6), round(center[1] + dlng, 6)
+
+def make_menu(rng, templates, n_items):
+    items = []
+    seen = set()
+    while len(items) < n_items:
+        template = rng.choice(templates)
+        prefix = rng.choice(NAME_PREFIXES)
+        name = f"{prefix} {template['name']}".strip()
+        if name in seen:
+            name = f"{name} #{len(items)}"
+        seen.add(name)
+        tags = list(template.get("tags", []))
+        rng.shuffle(tags)
+        price = template.get("price") or rng.uniform(3, 20)
+        calories = template.get("calories") or rng.randint(100, 1500)
+        items.append({
+            "name": name,
+            "description": template.get("description", ""),
+            "price": round(price * rng.uniform(0.8, 1.3), 2),
+            "calories": int(calories * rng.uniform(0.8, 1.2)),
+            "tags": tags[:rng.randint(3, max(3, len(tags)))]
+        })
+    return items
+
+def iter_restaurants(n_restaurants, n_items, radius_km=15.0, seed=0):
+    """Yield n_restaurants restaurant records with n_items menu items each"""
+    rng = random.Random(seed)
+    templates = load_templates()
+    for i in range(n_restaurants):
+        lat, lng = random_point(rng, CENTER, radius_km)
+        hours = rng.choice(OPENING_HOURS)[0]
+        yield {
+            "name": f"Synthetic {rng.choice(CUISINES)} {i}",
+            "menu_items": make_menu(rng, templates, n_items),
+            "address": f"{rng.randint(1, 999)} Synthetic St NW, Atlanta, GA 30332, USA",
+            "lat": lat,
+            "lng": lng,
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "user_ratings_count": int(rng.paretovariate(1.2) * 20),
+            "opening_hours": [hours.format(day=day) for day in DAYS],
+            "photos": [f"https://example.com/photos/{i}/{p}.jpg" for p in range(rng.randint(0, 5))],
+            "types": ["establishment", "food", "point_of_interest", "restaurant"],
+            "price_level": rng.choice([1, 1, 2, 2, 2, 3, 4]),
+            "website": f"https://example.com/restaurants/{i}",
+            "phone_number": f"(404) 555-{i % 10000:04d}",
+            "business_status": "OPERATIONAL",
+            "reviews": [],
+            "google_maps_url": f"https://maps.google.com/?cid=synthetic{i}"
+        }
+
+def make_restaurants(n_restaurants, n_items, radius_km=15.0, seed=0):
+    """Generate n_restaurants restaurant records with n_items menu items each"""
+    return list(iter_restaurants(n_restaurants, n_items, radius_km, seed))
+
+def write_catalog(out_dir, n_restaurants, n_items, radius_km=15.0, seed=0):
+    """Write restaurants JSON and build a fresh restaurants.db from it
+
+    Returns (json_path, db_path, setup_db stats, load seconds).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stem = f"synthetic_{n_restaurants}x{n_items}"
+    json_path = os.path.join(out_dir, f"{stem}.json")
+    db_path = os.path.join(out_dir, f"{stem}.db")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(make_restaurants(n_restaurants, n_items, radius_km, seed), f, ensure_ascii=False)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    start = time.perf_counter()
+    stats = setup_db.main(["--db", db_path, "--json", json_path])
+    return json_path, db_path, stats, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic restaurants JSON and restaurants.db")
+    parser.add_argument("--restaurants", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=40, help="menu items per restaurant")
+    parser.add_argument("--radius-km", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default=os.path.join(ROOT, "benchmarks", "data"))
+    args = parser.parse_args(argv)
+    json_path, db_path, _, _ = write_catalog(args.out_dir, args.restaurants, args.items, args.radius_km, args.seed)
+    print(f"Wrote {json_path} and {db_path}")
+
+if __name__ == "__main__":
+    main()
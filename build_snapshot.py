@@ -0,0 +1,33 @@
+import os
+import time
+import argparse
+from menu_catalog import MenuCatalog
+
+DB_PATH = "restaurants.db"
+SNAPSHOT_PATH = "restaurants.snapshot"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compile restaurants.db into a catalog snapshot that app workers memory-map")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database to read")
+    parser.add_argument('--out', default=SNAPSHOT_PATH, help="snapshot file to write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    catalog = MenuCatalog(args.db)
+    snapshot = catalog.snapshot()
+    # Item vectors for semantic search are computed here, offline, and mapped by the workers
+    snapshot.semantic_index()
+    db_stat = os.stat(args.db)
+    snapshot.save(args.out, source_db=os.path.abspath(args.db), source_mtime_ns=db_stat.st_mtime_ns,
+                  catalog_stamp=snapshot.catalog_stamp, built_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    elapsed = time.perf_counter() - start
+
+    size = os.path.getsize(args.out)
+    print(f"Wrote {args.out}: {len(snapshot.restaurants)} restaurants, {len(snapshot)} menu items "
+          f"({snapshot.semantic_index().dims}-dim vectors), "
+          f"{size / 2 ** 20:.1f} MiB in {elapsed:.2f}s.")
+    return args.out
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import os
+import json
+import mmap
+import struct
+import numpy as np
+
+# File layout:
+#   MAGIC | u32 format version | u32 reserved | u64 header length | JSON header | padding | column data
+# The header maps each column name to where its data lives, relative to the
+# first byte after the (aligned) header. Numeric columns are little-endian
+# fixed-width arrays, C-ordered when they have more than one dimension; string columns are a UTF-8 blob plus an int64 offsets
+# array and a uint8 null mask. Every block starts on an ALIGN boundary so
+# it can be viewed in place with np.frombuffer.
+MAGIC = b"OMCATSNP"
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct("<8sIIQ")
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+class StringColumn:
+    """Read-only sequence of optional strings stored as one UTF-8 blob plus offsets"""
+
+    __slots__ = ("data", "offsets", "nulls")
+
+    def __init__(self, data, offsets, nulls):
+        self.data = data
+        self.offsets = offsets
+        self.nulls = nulls
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [b"" if s is None else s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        nulls = np.array([s is None for s in strings], dtype=np.uint8)
+        return cls(b"".join(encoded), offsets, nulls)
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def __getitem__(self, index):
+        if self.nulls[index]:
+            return None
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def write(path, columns, meta=None):
+    """Write columns (NumPy arrays or sequences of optional strings) to path atomically
+
+    Readers that still have the previous file mapped keep seeing it intact.
+    """
+    blocks = []
+    specs = {}
+    offset = 0
+
+    def add(array):
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        start = offset
+        blocks.append((start, array.tobytes()))
+        offset = _aligned(start + array.nbytes)
+        return start
+
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray):
+            specs[name] = {"kind": "array", "dtype": values.dtype.newbyteorder("<").str,
+                           "length": len(values), "offset": add(values)}
+            if values.ndim > 1:
+                specs[name]["shape"] = list(values.shape)
+            continue
+        if not isinstance(values, StringColumn):
+            values = StringColumn.from_strings(list(values))
+        data = np.frombuffer(bytes(values.data), dtype=np.uint8)
+        specs[name] = {"kind": "strings", "length": len(values), "data_bytes": len(data),
+                       "offsets": add(values.offsets.astype(np.int64)), "nulls": add(values.nulls.astype(np.uint8)),
+                       "data": add(data)}
+
+    header = json.dumps({"meta": meta or {}, "columns": specs}).encode("utf-8")
+    base = _aligned(_PREAMBLE.size + len(header))
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header)))
+        f.write(header)
+        for start, data in blocks:
+            f.seek(base + start)
+            f.write(data)
+        f.truncate(base + offset)
+    os.replace(tmp_path, path)
+
+
+def read_meta(path):
+    """Read only the meta of a file written by write(), without mapping its columns"""
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        magic, version, _, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {version}, expected {FORMAT_VERSION}")
+        return json.loads(f.read(header_length))["meta"]
+
+
+def read(path):
+    """Map a file written by write() read-only; returns (meta, columns)
+
+    Columns are views into the shared mapping, so processes reading the
+    same file share its pages.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _, header_length = _PREAMBLE.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a catalog snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has snapshot format {version}, expected {FORMAT_VERSION}")
+    header = json.loads(mapping[_PREAMBLE.size:_PREAMBLE.size + header_length])
+    base = _aligned(_PREAMBLE.size + header_length)
+    view = memoryview(mapping)
+
+    def array(offset, dtype, length):
+        return np.frombuffer(mapping, dtype=dtype, count=length, offset=base + offset)
+
+    columns = {}
+    for name, spec in header["columns"].items():
+        if spec["kind"] == "array" and "shape" in spec:
+            shape = tuple(spec["shape"])
+            columns[name] = array(spec["offset"], np.dtype(spec["dtype"]), int(np.prod(shape))).reshape(shape)
+        elif spec["kind"] == "array":
+            columns[name] = array(spec["offset"], np.dtype(spec["dtype"]), spec["length"])
+        else:
+            data_start = base + spec["data"]
+            columns[name] = StringColumn(view[data_start:data_start + spec["data_bytes"]],
+                                         array(spec["offsets"], np.int64, spec["length"] + 1),
+                                         array(spec["nulls"], np.uint8, spec["length"]))
+    return header["meta"], columns
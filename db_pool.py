@@ -0,0 +1,26 @@
+import os
+import sqlite3
+from urllib.parse import quote
+
+# Applied to every read-only connection
+READ_PRAGMAS = [
+    "PRAGMA query_only=1",
+    "PRAGMA mmap_size=268435456",  # 256 MiB of the file read through the page cache, not read()
+    "PRAGMA cache_size=-16384"     # 16 MiB per connection
+]
+# Prepared statements kept per connection, keyed by SQL text
+CACHED_STATEMENTS = 64
+
+
+def connect_readonly(db_path, immutable=False):
+    """Open db_path read-only through a URI with the absolute path, so the CWD does not matter
+
+    immutable=1 also skips all locking and change detection; only use it
+    for files that are never written while open.
+    """
+    uri = "file:%s?%s" % (quote(os.path.abspath(db_path)), "immutable=1" if immutable else "mode=ro")
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
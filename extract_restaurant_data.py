@@ -2,7 +2,13 @@
 import requests
 import json
 import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from restaurant_stream import write_records
 
 load_dotenv()
 
@@ -10,51 +16,111 @@ load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 YELP_API_KEY = os.getenv("YELP_API_KEY")
 
+# Overridable so the crawler can run against a local stand-in for the Places API
+PLACES_API_BASE = os.getenv("GOOGLE_PLACES_API_BASE", "https://maps.googleapis.com/maps/api/place")
+
 # Georgia Tech/Tech Square coordinates
 LOCATION = {'lat': 33.7770706, 'lng': -84.3902668}  # Georgia Tech/ Tech Square
 RADIUS_METERS = 250  # 250m radius
 
-def get_google_restaurants():
-	url = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
+DETAIL_FIELDS = [
+	'name', 'formatted_address', 'rating', 'user_ratings_total', 'opening_hours', 'photos',
+	'types', 'price_level', 'website', 'formatted_phone_number', 'business_status', 'reviews', 'url'
+]
+
+class PlaceCache:
+	"""On-disk cache of raw Place Details results, one JSON file per place_id
+
+	Entries older than ttl_seconds are treated as missing, so an incremental
+	re-crawl only fetches new or stale places.
+	"""
+
+	def __init__(self, cache_dir, ttl_seconds=7 * 24 * 3600):
+		self.cache_dir = cache_dir
+		self.ttl_seconds = ttl_seconds
+		self.hits = 0
+		self.misses = 0
+		os.makedirs(cache_dir, exist_ok=True)
+
+	def _path(self, place_id):
+		safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in place_id)
+		return os.path.join(self.cache_dir, f"{safe_id}.json")
+
+	def get(self, place_id):
+		try:
+			with open(self._path(place_id), 'r', encoding='utf-8') as f:
+				entry = json.load(f)
+		except (OSError, ValueError):
+			self.misses += 1
+			return None
+		if time.time() - entry.get('fetched_at', 0) > self.ttl_seconds:
+			self.misses += 1
+			return None
+		self.hits += 1
+		return entry['result']
+
+	def put(self, place_id, result):
+		path = self._path(place_id)
+		tmp_path = f"{path}.{os.getpid()}.tmp"
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump({'fetched_at': time.time(), 'result': result}, f, ensure_ascii=False)
+		# Atomic so a crash never leaves a half-written entry behind
+		os.replace(tmp_path, path)
+
+def make_session(pool_size=10):
+	"""Session with keep-alive connections shared by every crawler thread"""
+	session = requests.Session()
+	retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+	adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+	session.mount('https://', adapter)
+	session.mount('http://', adapter)
+	return session
+
+def get_google_restaurants(session=None, cache=None, concurrency=8):
+	url = f'{PLACES_API_BASE}/nearbysearch/json'
 	params = {
 		'location': f"{LOCATION['lat']},{LOCATION['lng']}",
 		'radius': RADIUS_METERS,
 		'type': 'restaurant',
 		'key': GOOGLE_API_KEY
 	}
-	restaurants = []
+	session = session or make_session(concurrency)
+	futures = []
 	next_page_token = None
-	while True:
-		if next_page_token:
-			params['pagetoken'] = next_page_token
-		response = requests.get(url, params=params)
-		data = response.json()
-		results = data.get('results', [])
-		for r in results:
-			place_id = r.get('place_id')
-			details = get_place_details(place_id)
-			if details:
-				restaurants.append(details)
-		next_page_token = data.get('next_page_token')
-		if not next_page_token or len(restaurants) >= 60:
-			break
-		import time
-		time.sleep(2)
-	return restaurants
-
-def get_place_details(place_id):
-	url = 'https://maps.googleapis.com/maps/api/place/details/json'
-	fields = [
-		'name', 'formatted_address', 'rating', 'user_ratings_total', 'opening_hours', 'photos',
-		'types', 'price_level', 'website', 'formatted_phone_number', 'business_status', 'reviews', 'url'
-	]
+	with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+		while True:
+			if next_page_token:
+				params['pagetoken'] = next_page_token
+			response = session.get(url, params=params)
+			data = response.json()
+			results = data.get('results', [])
+			# Details for this page are fetched while the next page token becomes valid
+			for r in results:
+				futures.append(pool.submit(get_place_details, r.get('place_id'), session, cache))
+			next_page_token = data.get('next_page_token')
+			if not next_page_token or len(futures) >= 60:
+				break
+			time.sleep(2)
+		details = [future.result() for future in futures]
+	return [d for d in details if d]
+
+def fetch_place_details(place_id, session=None):
+	"""Fetch the raw Place Details result for place_id"""
+	url = f'{PLACES_API_BASE}/details/json'
 	params = {
 		'place_id': place_id,
-		'fields': ','.join(fields),
+		'fields': ','.join(DETAIL_FIELDS),
 		'key': GOOGLE_API_KEY
 	}
-	response = requests.get(url, params=params)
-	result = response.json().get('result', {})
+	response = (session or requests).get(url, params=params)
+	return response.json().get('result', {})
+
+def get_place_details(place_id, session=None, cache=None):
+	result = cache.get(place_id) if cache else None
+	if result is None:
+		result = fetch_place_details(place_id, session)
+		if result and cache:
+			cache.put(place_id, result)
 	if not result:
 		return None
 	# Extract photo URLs if available
@@ -110,10 +176,25 @@ def get_place_details(place_id):
 # 		})
 # 	return restaurants
 
-def main():
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Crawl nearby restaurants from the Google Places API")
+	parser.add_argument('--output', default='restaurants_google_maps.json')
+	parser.add_argument('--concurrency', type=int, default=8, help="concurrent Place Details requests")
+	parser.add_argument('--cache-dir', default='data/place_cache', help="on-disk Place Details cache")
+	parser.add_argument('--ttl-hours', type=float, default=24 * 7, help="refetch cached places older than this")
+	parser.add_argument('--no-cache', action='store_true')
+	parser.add_argument('--ndjson', action='store_true', help="write one restaurant per line (implied by a .ndjson/.jsonl output)")
+	args = parser.parse_args(argv)
+
+	cache = None if args.no_cache else PlaceCache(args.cache_dir, args.ttl_hours * 3600)
+	session = make_session(args.concurrency)
+
 	print('Fetching Google Maps restaurants...')
-	google_restaurants = get_google_restaurants()
-	print(f'Found {len(google_restaurants)} restaurants from Google Maps.')
+	start = time.perf_counter()
+	google_restaurants = get_google_restaurants(session, cache, args.concurrency)
+	print(f'Found {len(google_restaurants)} restaurants from Google Maps in {time.perf_counter() - start:.1f}s.')
+	if cache:
+		print(f'Place cache: {cache.hits} hits, {cache.misses} fetched.')
 	# for r in google_restaurants:
 	# 	print(r)
 
@@ -123,13 +204,9 @@ def main():
 	# for r in yelp_restaurants:
 	# 	print(r)
 
-	print('Fetching Google Maps restaurants...')
-	google_restaurants = get_google_restaurants()
-	print(f'Found {len(google_restaurants)} restaurants from Google Maps.')
-	# Save to JSON file
-	with open('restaurants_google_maps.json', 'w', encoding='utf-8') as f:
-		json.dump(google_restaurants, f, ensure_ascii=False, indent=2)
-	print('Saved all restaurant data to restaurants_google_maps.json')
+	# Save to JSON or NDJSON file
+	write_records(args.output, google_restaurants, ndjson=args.ndjson or None)
+	print(f'Saved all restaurant data to {args.output}')
 
 if __name__ == '__main__':
 	main()
@@ -1,12 +1,19 @@
 import os
+import re
 import json
 import time
+import random
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from litellm import completion
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+MODEL = "gemini/gemini-2.0-flash-lite"
+
 PROMPT_TEMPLATE = """
 Given the following menu item data, fill in any missing fields (description, calories, etc.) with reasonable estimates. If a field is already present, keep it. If you don't know, make a best guess. Do not add any new categories other than name, description, price, calories and tags. If the JSON currently contains any keys other than these, remove them. Ensure that the tags specifies what meat the dish contains, or "Vegetarian" or "Vegan" if it is vegetarian or vegan respectively. Return a JSON object with all fields filled.
 
@@ -14,72 +21,290 @@ Menu item:
 {name: "%s", description: %s, price: %s, calories: %s, tags: %s}
 """
 
-def enrich_menu_item(item):
-    prompt = PROMPT_TEMPLATE % (
+BATCH_PROMPT_TEMPLATE = """
+Given the following list of menu items, fill in any missing fields (description, calories, etc.) of each item with reasonable estimates. If a field is already present, keep it. If you don't know, make a best guess. Do not add any new categories other than name, description, price, calories and tags. If an item currently contains any keys other than these, remove them. Ensure that the tags specifies what meat the dish contains, or "Vegetarian" or "Vegan" if it is vegetarian or vegan respectively. Return a JSON object of the form {"items": [...]} with one filled-in object per menu item, in the same order.
+
+Menu items:
+%s
+"""
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        """Take amount tokens and return how long the caller must wait before using them
+
+        Requests larger than the capacity are clamped so they cannot block forever.
+        """
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class RateLimiter:
+    """Limits LLM calls by requests per minute and (estimated) tokens per minute"""
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=1000000, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.sleep = sleep
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, estimated_tokens):
+        """Block until a call of estimated_tokens may be sent"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        with self.lock:
+            wait = max(wait, self.paused_until - time.monotonic())
+        if wait > 0:
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every worker, e.g. after the API reports a rate limit"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class EnrichmentCache:
+    """Append-only JSONL cache of enriched items, keyed by a hash of the input
+
+    The key covers the input item, the prompt templates and the model name,
+    so editing any of them re-enriches the affected items. Each result is
+    flushed as soon as it arrives, which makes the cache the checkpoint a
+    killed run resumes from.
+    """
+
+    def __init__(self, path, model=MODEL):
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write can leave a partial last line
+                        continue
+                    self.entries[record["key"]] = record["item"]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def key(self, item):
+        payload = json.dumps([item, PROMPT_TEMPLATE, BATCH_PROMPT_TEMPLATE, self.model],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, item):
+        enriched = self.entries.get(self.key(item))
+        with self.lock:
+            if enriched is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return enriched
+
+    def put(self, item, enriched):
+        key = self.key(item)
+        line = json.dumps({"key": key, "item": enriched}, ensure_ascii=False)
+        with self.lock:
+            self.entries[key] = enriched
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self):
+        self.file.close()
+
+def estimate_tokens(text):
+    """Rough token count for rate limiting (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+def format_item_prompt(item):
+    return PROMPT_TEMPLATE % (
         item.get("name", "null"),
         json.dumps(item.get("description", None)),
         json.dumps(item.get("price", None)),
         json.dumps(item.get("calories", None)),
         json.dumps(item.get("tags", []))
     )
+
+def format_batch_prompt(items):
+    fields = ("name", "description", "price", "calories", "tags")
+    return BATCH_PROMPT_TEMPLATE % json.dumps(
+        [{field: item.get(field) for field in fields} for item in items],
+        ensure_ascii=False, indent=2
+    )
+
+def retry_delay(err_str, attempt):
+    """Get how long to wait after a rate-limit error, preferring the API's retryDelay"""
+    match = re.search(r'retryDelay":\s*"(\d+)', err_str)
+    if match:
+        return int(match.group(1))
+    # Exponential backoff with jitter when the API gives no hint
+    return min(60, 2 ** attempt) + random.uniform(0, 1)
+
+def call_llm(prompt, completion_fn=None, limiter=None, model=MODEL, api_base=None,
+             max_attempts=5, sleep=time.sleep):
+    """Send one JSON-mode prompt, retrying on rate limits; returns the parsed JSON or raises"""
+    if completion_fn is None:
+        # litellm takes seconds to import, so only pay for it when a real call is made
+        from litellm import completion as completion_fn
     messages = [
         {"role": "user", "content": prompt}
     ]
-    max_attempts = 5
+    kwargs = {"api_base": api_base} if api_base else {}
     attempt = 0
-    while attempt < max_attempts:
+    while True:
+        if limiter:
+            limiter.acquire(estimate_tokens(prompt))
         try:
-            response = completion(
-                model="gemini/gemini-2.0-flash-lite",
+            response = completion_fn(
+                model=model,
                 api_key=GEMINI_API_KEY,
                 messages=messages,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                **kwargs
             )
-            enriched = json.loads(response.choices[0].message.content)
-            return enriched
+            return json.loads(response.choices[0].message.content)
         except Exception as e:
             err_str = str(e)
-            if "RateLimitError" in err_str or "RESOURCE_EXHAUSTED" in err_str:
-                # Try to extract suggested retry time from error message
-                import re
-                match = re.search(r'retryDelay":\s*"(\d+)', err_str)
-                if match:
-                    wait_time = int(match.group(1))
-                else:
-                    wait_time = 60  # Default to 60 seconds if not found
-                print(f"Rate limit hit. Waiting {wait_time} seconds before retrying...")
-                time.sleep(wait_time)
-                attempt += 1
+            if "RateLimitError" not in err_str and "RESOURCE_EXHAUSTED" not in err_str:
+                raise
+            attempt += 1
+            if attempt >= max_attempts:
+                raise
+            wait_time = retry_delay(err_str, attempt)
+            print(f"Rate limit hit. Waiting {wait_time:.0f} seconds before retrying...")
+            if limiter:
+                # Every worker shares the same quota, so they all back off
+                limiter.pause(wait_time)
             else:
-                print(f"Error parsing Gemini response for item '{item.get('name', '')}': {e}")
-                return item
-    print(f"Max retry attempts reached for item '{item.get('name', '')}'. Returning original item.")
-    return item
+                sleep(wait_time)
 
-def main():
-    menus_dir = "data/menus"
-    enriched_dir = "data/enriched_menus"
-    os.makedirs(enriched_dir, exist_ok=True)
-    menu_files = [f for f in os.listdir(menus_dir) if f.endswith(".json")]
+def enrich_menu_item(item, **llm_options):
+    """Enrich one item; on failure the original item object itself is returned"""
+    try:
+        return call_llm(format_item_prompt(item), **llm_options)
+    except Exception as e:
+        print(f"Error enriching item '{item.get('name', '')}': {e}. Returning original item.")
+        return item
+
+def enrich_menu_batch(items, **llm_options):
+    """Enrich several items with one LLM call, falling back to one call per item"""
+    if len(items) == 1:
+        return [enrich_menu_item(items[0], **llm_options)]
+    try:
+        enriched = call_llm(format_batch_prompt(items), **llm_options).get("items")
+    except Exception as e:
+        print(f"Error enriching batch of {len(items)} items: {e}")
+        enriched = None
+    if (not isinstance(enriched, list) or len(enriched) != len(items)
+            or not all(isinstance(item, dict) for item in enriched)):
+        print(f"Batch response did not match the {len(items)} items sent; enriching them one at a time.")
+        return [enrich_menu_item(item, **llm_options) for item in items]
+    return enriched
+
+def enrich_menu(menu_items, workers=4, batch_size=1, on_result=None, cache=None, **llm_options):
+    """Enrich a whole menu concurrently, keeping the original item order
+
+    Items found in cache are not sent to the LLM, and every successful
+    result is checkpointed to it as soon as it arrives. on_result(index,
+    enriched_item) is called from worker threads as each item finishes.
+    """
+    enriched_items = [None] * len(menu_items)
+    pending = []
+    for i, item in enumerate(menu_items):
+        cached = cache.get(item) if cache else None
+        if cached is None:
+            pending.append(i)
+        else:
+            enriched_items[i] = cached
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+    def run(batch):
+        results = enrich_menu_batch([menu_items[i] for i in batch], **llm_options)
+        for i, enriched in zip(batch, results):
+            enriched_items[i] = enriched
+            # Failures come back as the original item and are retried next run
+            if cache and enriched is not menu_items[i]:
+                cache.put(menu_items[i], enriched)
+            if on_result:
+                on_result(i, enriched)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in [pool.submit(run, batch) for batch in batches]:
+            future.result()
+    return enriched_items
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill in missing menu item fields with an LLM")
+    parser.add_argument("--menus-dir", default="data/menus")
+    parser.add_argument("--enriched-dir", default="data/enriched_menus")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--api-base", default=None, help="alternate completion endpoint, e.g. a local fake server")
+    parser.add_argument("--workers", type=int, default=4, help="maximum concurrent LLM calls")
+    parser.add_argument("--rpm", type=float, default=30, help="requests per minute")
+    parser.add_argument("--tpm", type=float, default=1000000, help="prompt tokens per minute")
+    parser.add_argument("--batch-size", type=int, default=1, help="menu items packed into each prompt")
+    parser.add_argument("--cache", default="data/enrichment_cache.jsonl",
+                        help="enrichment cache / checkpoint file")
+    parser.add_argument("--no-cache", action="store_true", help="re-enrich every item")
+    args = parser.parse_args(argv)
+
+    limiter = RateLimiter(args.rpm, args.tpm)
+    cache = None if args.no_cache else EnrichmentCache(args.cache, model=args.model)
+    batch_size = max(1, args.batch_size)
+    llm_options = {"limiter": limiter, "model": args.model, "api_base": args.api_base}
+
+    os.makedirs(args.enriched_dir, exist_ok=True)
+    menu_files = [f for f in os.listdir(args.menus_dir) if f.endswith(".json")]
 
     for menu_file in menu_files:
-        input_path = os.path.join(menus_dir, menu_file)
-        output_path = os.path.join(enriched_dir, menu_file.replace(".json", "_enriched.json"))
+        input_path = os.path.join(args.menus_dir, menu_file)
+        output_path = os.path.join(args.enriched_dir, menu_file.replace(".json", "_enriched.json"))
         print(f"\nProcessing {menu_file}...")
         with open(input_path, "r", encoding="utf-8") as f:
             menu_items = json.load(f)
 
-        enriched_items = []
-        for idx, item in enumerate(menu_items, 1):
-            print(f"Enriching item {idx}/{len(menu_items)}: {item.get('name', '')}")
-            enriched = enrich_menu_item(item)
-            print(f"Enriched item: {enriched}\n")
-            enriched_items.append(enriched)
-            time.sleep(3)  # Sleep 3 seconds between LLM calls to avoid rate limits
+        start = time.perf_counter()
+        enriched_items = enrich_menu(
+            menu_items, workers=args.workers, batch_size=batch_size, cache=cache,
+            on_result=lambda i, enriched: print(f"Enriched item {i + 1}/{len(menu_items)}: {enriched.get('name', '')}"),
+            **llm_options
+        )
+        elapsed = time.perf_counter() - start
 
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(enriched_items, f, ensure_ascii=False, indent=2)
-        print(f"Enriched menu saved to {output_path}")
+        print(f"Enriched {len(menu_items)} items in {elapsed:.1f}s; saved to {output_path}")
+
+    if cache:
+        cache.close()
+        calls_saved = -(-cache.hits // batch_size)
+        print(f"\nEnrichment cache: {cache.hits} hits, {cache.misses} misses "
+              f"({cache.hit_rate():.0%} hit rate), about {calls_saved} LLM calls saved")
 
 if __name__ == "__main__":
     main()
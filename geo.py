@@ -0,0 +1,53 @@
+import numpy as np
+from math import radians, degrees, cos, sin, asin, sqrt, pi
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points on Earth in km"""
+    R = EARTH_RADIUS_KM
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return R * c
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """Vectorized haversine from one point to arrays of points, in km"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lngs - lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Get the lat/lng ranges that contain every point within radius_km of (lat, lng).
+
+    Returns (min_lat, max_lat, lng_ranges) where lng_ranges is a list of
+    (min_lng, max_lng) tuples; it has two entries when the box crosses the
+    antimeridian and is empty when the box covers every longitude.
+    """
+    R = EARTH_RADIUS_KM
+    # Pad slightly so points exactly on the radius survive float rounding
+    angular = radius_km / R * (1 + 1e-9)
+    lat_r = radians(lat)
+    min_lat_r = lat_r - angular
+    max_lat_r = lat_r + angular
+    if min_lat_r <= -pi / 2 or max_lat_r >= pi / 2 or angular >= pi:
+        # Circle contains a pole, so every longitude is in range
+        return max(degrees(min_lat_r), -90.0), min(degrees(max_lat_r), 90.0), []
+
+    dlng = degrees(asin(min(1.0, sin(angular) / cos(lat_r))))
+    min_lng = lng - dlng
+    max_lng = lng + dlng
+    if min_lng < -180.0:
+        lng_ranges = [(min_lng + 360.0, 180.0), (-180.0, max_lng)]
+    elif max_lng > 180.0:
+        lng_ranges = [(min_lng, 180.0), (-180.0, max_lng - 360.0)]
+    else:
+        lng_ranges = [(min_lng, max_lng)]
+    return degrees(min_lat_r), degrees(max_lat_r), lng_ranges
@@ -0,0 +1,184 @@
+import re
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import chain
+import numpy as np
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Sorts after any character that can appear in a token
+_MAX_CHAR = '\U0010ffff'
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _suffix_table(tokens):
+    """(token ids, start offsets) of every suffix of the vocabulary, in sorted order"""
+    suffixes = sorted((token[i:], token_id, i) for token_id, token in enumerate(tokens) for i in range(len(token)))
+    return (np.array([suffix[1] for suffix in suffixes], dtype=np.int32),
+            np.array([suffix[2] for suffix in suffixes], dtype=np.int32))
+
+
+class _Suffixes:
+    """The vocabulary suffixes in sorted order, decoded on access (for bisect)"""
+
+    __slots__ = ("tokens", "token_ids", "starts")
+
+    def __init__(self, tokens, token_ids, starts):
+        self.tokens = tokens
+        self.token_ids = token_ids
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.token_ids)
+
+    def __getitem__(self, index):
+        return self.tokens[self.token_ids[index]][self.starts[index]:]
+
+
+class KeywordIndex:
+    """In-memory inverted index from word tokens to the documents containing them.
+
+    Lookups keep the substring semantics of ``keyword in text``: a keyword
+    made of word characters can only occur inside a single token, so the
+    documents containing it are the union of the posting lists of every
+    token that contains it. Those tokens are found by a prefix search over
+    the sorted suffixes of the vocabulary.
+
+    Everything is held in flat arrays (sorted vocabulary, posting lists
+    back to back with their offsets, and a (token, start) suffix table),
+    so an index can be saved with columns() and memory-mapped back with
+    from_columns().
+    """
+
+    def __init__(self, texts=()):
+        postings = {}
+        for doc_id, text in enumerate(texts):
+            for token in set(TOKEN_RE.findall(text)):
+                postings.setdefault(token, []).append(doc_id)
+        tokens = sorted(postings)
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        np.cumsum([len(postings[token]) for token in tokens], out=offsets[1:])
+        doc_ids = np.fromiter(chain.from_iterable(postings[token] for token in tokens),
+                              dtype=np.int32, count=int(offsets[-1]))
+        self._init(tokens, offsets, doc_ids, *_suffix_table(tokens))
+
+    def _init(self, tokens, posting_offsets, posting_doc_ids, suffix_token_ids, suffix_starts):
+        self._tokens = tokens
+        self._posting_offsets = posting_offsets
+        self._posting_doc_ids = posting_doc_ids
+        self._suffix_token_ids = suffix_token_ids
+        self._suffixes = _Suffixes(tokens, suffix_token_ids, suffix_starts)
+        self._lookup_cache = {}
+
+    def patched(self, doc_map, patch, patch_doc_map):
+        """Get the index of this index's documents and patch's, renumbered
+
+        doc_map gives the new id of each of this index's documents, or -1
+        to drop it; patch_doc_map gives the new id of each of patch's.
+        Equals KeywordIndex(texts) over the resulting documents, but the
+        work in Python is proportional to patch and to the new tokens;
+        the rest is array operations over the postings and suffix table.
+        """
+        old_tokens = list(self._tokens)
+        new_tokens = sorted(set(patch._tokens).difference(old_tokens))
+        tokens = list(merge(old_tokens, new_tokens))
+        # Every token of this index moves up by the new tokens sorting before it
+        inserted = np.array([bisect_left(old_tokens, token) for token in new_tokens], dtype=np.int64)
+        old_ids = np.arange(len(old_tokens)) + np.searchsorted(inserted, np.arange(len(old_tokens)), side="right")
+        patch_ids = np.array([bisect_left(tokens, token) for token in patch._tokens], dtype=np.int64)
+
+        # Postings as token * n_docs + doc keys; this index's stay sorted under both renumberings
+        n_docs = int(max(doc_map.max(initial=-1), patch_doc_map.max(initial=-1))) + 1
+        docs = doc_map[self._posting_doc_ids]
+        keys = (np.repeat(old_ids, np.diff(self._posting_offsets)) * n_docs + docs)[docs >= 0]
+        patch_keys = np.sort(np.repeat(patch_ids, np.diff(patch._posting_offsets)) * n_docs
+                             + patch_doc_map[patch._posting_doc_ids])
+        keys = np.insert(keys, np.searchsorted(keys, patch_keys), patch_keys)
+        counts = np.bincount(keys // n_docs, minlength=len(tokens))
+        # Tokens left without documents are dropped and the rest renumbered
+        live = counts > 0
+        compact = np.cumsum(live) - 1
+
+        # New suffixes go in among the old ones, equal suffixes ordered by token id as _suffix_table does
+        suffix_ids = old_ids[self._suffix_token_ids]
+        new_suffixes = sorted((token[i:], bisect_left(tokens, token), i) for token in new_tokens for i in range(len(token)))
+        positions = []
+        for suffix, token_id, _ in new_suffixes:
+            lo = bisect_left(self._suffixes, suffix)
+            hi = bisect_right(self._suffixes, suffix, lo)
+            positions.append(lo + int(np.searchsorted(suffix_ids[lo:hi], token_id)))
+        suffix_ids = np.insert(suffix_ids, positions, [entry[1] for entry in new_suffixes])
+        suffix_starts = np.insert(self._suffixes.starts, positions, [entry[2] for entry in new_suffixes])
+        kept = live[suffix_ids]
+
+        offsets = np.zeros(int(live.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[live], out=offsets[1:])
+        index = KeywordIndex.__new__(KeywordIndex)
+        index._init([token for token, alive in zip(tokens, live.tolist()) if alive], offsets,
+                    (keys % n_docs).astype(np.int32), compact[suffix_ids[kept]].astype(np.int32),
+                    suffix_starts[kept].astype(np.int32))
+        return index
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Rebuild an index from the arrays returned by columns()"""
+        index = cls.__new__(cls)
+        index._init(columns["kw_tokens"], columns["kw_posting_offsets"], columns["kw_posting_doc_ids"],
+                    columns["kw_suffix_token_ids"], columns["kw_suffix_starts"])
+        return index
+
+    def columns(self):
+        return {
+            "kw_tokens": self._tokens,
+            "kw_posting_offsets": self._posting_offsets,
+            "kw_posting_doc_ids": self._posting_doc_ids,
+            "kw_suffix_token_ids": self._suffix_token_ids,
+            "kw_suffix_starts": self._suffixes.starts
+        }
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _token_ids_containing(self, keyword):
+        lo = bisect_left(self._suffixes, keyword)
+        hi = bisect_left(self._suffixes, keyword + _MAX_CHAR, lo)
+        return np.unique(self._suffix_token_ids[lo:hi])
+
+    def contains(self, keyword):
+        """Check whether any vocabulary token has keyword as a substring"""
+        lo = bisect_left(self._suffixes, keyword)
+        return lo < len(self._suffixes) and self._suffixes[lo].startswith(keyword)
+
+    def document_frequencies(self):
+        """Get {token: number of documents containing it} for the whole vocabulary"""
+        return dict(zip(self._tokens, np.diff(self._posting_offsets).tolist()))
+
+    def tokens_containing(self, keyword):
+        """Get every vocabulary token that has keyword as a substring"""
+        return {self._tokens[token_id] for token_id in self._token_ids_containing(keyword)}
+
+    def lookup(self, keyword):
+        """Get the sorted ids of the documents containing keyword"""
+        doc_ids = self._lookup_cache.get(keyword)
+        if doc_ids is None:
+            offsets = self._posting_offsets
+            postings = [self._posting_doc_ids[offsets[token_id]:offsets[token_id + 1]]
+                        for token_id in self._token_ids_containing(keyword)]
+            doc_ids = np.unique(np.concatenate(postings)) if postings else _EMPTY
+            if len(self._lookup_cache) >= 10000:
+                self._lookup_cache.clear()
+            self._lookup_cache[keyword] = doc_ids
+        return doc_ids
+
+    def search(self, keywords):
+        """Get the sorted ids of the documents containing every keyword"""
+        posting_arrays = sorted((self.lookup(keyword) for keyword in keywords), key=len)
+        if not posting_arrays:
+            return _EMPTY
+        result = posting_arrays[0]
+        for doc_ids in posting_arrays[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, doc_ids, assume_unique=True)
+        return result
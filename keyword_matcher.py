@@ -0,0 +1,79 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every keyword in a text in one pass.
+
+    Built from a mapping of keyword -> labels. find() returns the union of
+    the labels of every keyword that occurs anywhere in the text, including
+    overlapping and nested occurrences, so it gives the same answer as
+    checking ``keyword in text`` for each keyword in turn.
+    """
+
+    def __init__(self, keyword_labels):
+        goto = [{}]
+        outputs = [set()]
+        for keyword, labels in keyword_labels.items():
+            if not keyword:
+                raise ValueError("keywords must be non-empty")
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    outputs.append(set())
+                    nxt = len(goto) - 1
+                    goto[state][ch] = nxt
+                state = nxt
+            outputs[state].update(labels)
+
+        # Breadth-first pass to compute failure links; each state inherits
+        # the labels of the longest proper suffix that is also a trie state
+        fail = [0] * len(goto)
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                outputs[nxt] |= outputs[fail[nxt]]
+
+        # Fold the failure links into a full transition table (a DFA) so the
+        # scan loop is a single dict lookup per character
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        for state in order:
+            transitions = dict(delta[fail[state]])
+            transitions.update(goto[state])
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs = [frozenset(labels) for labels in outputs]
+
+    def find(self, text):
+        """Get the set of labels of every keyword contained in text"""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        found = set()
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+    def contains_any(self, text):
+        """Check whether text contains at least one keyword"""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                return True
+        return False
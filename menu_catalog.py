@@ -0,0 +1,773 @@
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+import columnar_file
+from db_pool import connect_readonly
+from geo import haversine, haversine_many, bounding_box
+from keyword_index import KeywordIndex
+from opening_hours import WEEK_MINUTES, parse_opening_hours
+from numeric_ranges import ITEM_RANGE_FIELDS, RESTAURANT_RANGE_FIELDS, range_mask, sorted_slice
+from semantic_index import SemanticIndex
+from menu_features import classify_item, expand_tags_from_content, item_search_text
+
+RESTAURANT_FIELDS = (
+    "id", "name", "address", "rating", "user_ratings_count", "opening_hours",
+    "phone", "website", "photo_url", "price_level", "business_status",
+    "google_maps_url", "lat", "lng"
+)
+# Restaurant fields held as float64 columns (NaN for NULL); the rest are strings
+RESTAURANT_NUMBER_FIELDS = ("rating", "user_ratings_count", "price_level", "lat", "lng")
+
+# Bump when the set or meaning of the snapshot columns changes
+SNAPSHOT_SCHEMA = 3
+# Restaurant ids per IN (...) query of an incremental reload
+ID_CHUNK = 500
+# Past this share of changed restaurants a full read is cheaper than patching
+MAX_PATCH_SHARE = 0.5
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+def _float(value):
+    return np.nan if value is None else value
+
+
+def _real(value):
+    return None if np.isnan(value) else float(value)
+
+
+def _number(value):
+    """Give integral values back as int, as SQLite's INTEGER affinity stores them"""
+    if np.isnan(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _combined(values, indices, patch_values, order):
+    """values at indices followed by every patch value, then taken in order"""
+    if isinstance(values, np.ndarray):
+        return np.concatenate([values[indices], patch_values])[order]
+    combined = [values[i] for i in indices.tolist()] + list(patch_values)
+    return [combined[i] for i in order.tolist()]
+
+
+def _gather_runs(values, offsets, indices):
+    """Concatenate the runs values[offsets[i]:offsets[i + 1]] of the given indices; returns (values, offsets)"""
+    starts = offsets[indices]
+    lengths = offsets[indices + 1] - starts
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return values[positions], new_offsets
+
+
+class RestaurantRecord:
+    """One restaurants row as loaded from the database
+
+    opening_hours and photo_url are kept as their JSON text and only
+    decoded when the record is turned into a response dict.
+    """
+
+    __slots__ = RESTAURANT_FIELDS
+
+    def __init__(self, row):
+        (self.id, self.name, self.address, self.rating, self.user_ratings_count,
+         self.opening_hours, self.phone, self.website, self.photo_url, self.price_level,
+         self.business_status, self.google_maps_url, self.lat, self.lng) = row
+
+    def to_dict(self, distance_km=None):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "address": self.address,
+            "rating": self.rating,
+            "user_ratings_count": self.user_ratings_count,
+            "opening_hours": json.loads(self.opening_hours) if self.opening_hours else [],
+            "phone": self.phone,
+            "website": self.website,
+            "photo_url": json.loads(self.photo_url) if self.photo_url else [],
+            "price_level": self.price_level,
+            "business_status": self.business_status,
+            "google_maps_url": self.google_maps_url,
+            "lat": self.lat,
+            "lng": self.lng,
+            "distance_km": distance_km
+        }
+
+
+class RestaurantTable:
+    """Sequence of RestaurantRecords, each built on access from the restaurant columns"""
+
+    __slots__ = ("columns",)
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["rest_id"])
+
+    def __getitem__(self, row):
+        c = self.columns
+        return RestaurantRecord((
+            int(c["rest_id"][row]), c["rest_name"][row], c["rest_address"][row],
+            _real(c["rest_rating"][row]), _number(c["rest_user_ratings_count"][row]),
+            c["rest_opening_hours"][row], c["rest_phone"][row], c["rest_website"][row],
+            c["rest_photo_url"][row], _number(c["rest_price_level"][row]), c["rest_business_status"][row],
+            c["rest_google_maps_url"][row], _real(c["rest_lat"][row]), _real(c["rest_lng"][row])
+        ))
+
+
+class CatalogSnapshot:
+    """Immutable columnar view of one version of the database.
+
+    Everything lives in a dict of named columns: NumPy arrays for numbers
+    and sequences of strings (lists when loaded from SQLite, StringColumns
+    when mapped from a snapshot file). Restaurants are rows in id order;
+    menu items are ordered by restaurant so each menu is a contiguous
+    range [item_start[row], item_end[row]), and their tags are runs of ids
+    into a shared tag table. Item positions double as document ids in the
+    keyword index. Nothing is turned into a dict until a caller asks for a
+    specific item or restaurant.
+    """
+
+    def __init__(self, version, columns, meta=None):
+        self.version = version
+        self.columns = columns
+        self.meta = meta or {}
+        # (version, created_at) of the change-log entry this was built from, when known
+        stamp = self.meta.get("catalog_stamp")
+        self.catalog_stamp = tuple(stamp) if stamp else None
+        self.catalog_version = stamp[0] if stamp else None
+        self.restaurants = RestaurantTable(columns)
+        self.rest_ids = columns["rest_id"]
+        self.rest_lat = columns["rest_lat"]
+        self.rest_lng = columns["rest_lng"]
+        self.rest_rating = columns["rest_rating"]
+        self.rest_ratings_count = columns["rest_user_ratings_count"]
+        # Rows sorted by latitude, so the bounding box is two binary searches
+        self.lat_order = columns["rest_lat_order"]
+        self.sorted_lat = self.rest_lat[self.lat_order]
+        # Opening intervals of every restaurant as row * WEEK_MINUTES + minute of the week, in order
+        self.hours_open_keys = columns["hours_open_key"]
+        self.hours_close_keys = columns["hours_close_key"]
+
+        self.item_names = columns["item_name"]
+        self.item_descriptions = columns["item_description"]
+        self.item_row = columns["item_row"]
+        self.item_price = columns["item_price"]
+        self.item_calories = columns["item_calories"]
+        # Items sorted by price and by calories (unknown last), so a range is two binary searches
+        self.item_values = {field: columns["item_" + field] for field in ITEM_RANGE_FIELDS}
+        self.item_orders = {field: columns["item_%s_order" % field] for field in ITEM_RANGE_FIELDS}
+        self.sorted_item_values = {field: self.item_values[field][self.item_orders[field]]
+                                   for field in ITEM_RANGE_FIELDS}
+        self.item_features = columns["item_features"]
+        self.item_tag_offsets = columns["item_tag_offsets"]
+        self.item_tag_ids = columns["item_tag_ids"]
+        self.tag_names = columns["tag_name"]
+        all_rows = np.arange(len(self.rest_ids))
+        self.item_start = np.searchsorted(self.item_row, all_rows, side="left")
+        self.item_end = np.searchsorted(self.item_row, all_rows, side="right")
+        self.keyword_index = KeywordIndex.from_columns(columns)
+        # Serialized restaurants by row, filled lazily by the response encoder
+        self.restaurant_fragments = {}
+        # Query spelling corrector over this version's vocabulary, built by the app on first use
+        self.term_corrector = None
+        self._semantic_index = SemanticIndex.from_columns(columns) if "item_vectors" in columns else None
+
+    @classmethod
+    def from_rows(cls, version, restaurant_rows, item_rows, hours_rows=None):
+        """Build a snapshot from database rows
+
+        restaurant_rows hold RESTAURANT_FIELDS in id order; item_rows are
+        (restaurant_id, name, description, price, calories, tags, features,
+        search_text) tuples in restaurant order; hours_rows are the
+        (restaurant_id, open_minute, close_minute) opening_intervals rows in
+        the same order. Without hours_rows the opening_hours are parsed here.
+        """
+        columns = {"rest_id": np.array([row[0] for row in restaurant_rows], dtype=np.int64)}
+        for position, field in enumerate(RESTAURANT_FIELDS[1:], 1):
+            values = [row[position] for row in restaurant_rows]
+            if field in RESTAURANT_NUMBER_FIELDS:
+                columns["rest_" + field] = np.array([_float(value) for value in values], dtype=np.float64)
+            else:
+                columns["rest_" + field] = values
+        columns["rest_lat_order"] = np.argsort(columns["rest_lat"], kind="stable")
+
+        row_by_id = {restaurant_id: row for row, restaurant_id in enumerate(columns["rest_id"].tolist())}
+        if hours_rows is None:
+            hours_position = RESTAURANT_FIELDS.index("opening_hours")
+            hours_rows = [(row[0], start, end) for row in restaurant_rows
+                          for start, end in parse_opening_hours(json.loads(row[hours_position] or "[]"))]
+        hours_keys = [(row_by_id[restaurant_id] * WEEK_MINUTES + start, row_by_id[restaurant_id] * WEEK_MINUTES + end)
+                      for restaurant_id, start, end in hours_rows if restaurant_id in row_by_id]
+        columns["hours_open_key"] = np.array([key[0] for key in hours_keys], dtype=np.int64)
+        columns["hours_close_key"] = np.array([key[1] for key in hours_keys], dtype=np.int64)
+        tag_ids = {}
+        rows, names, descriptions, prices, calories, features, search_texts = [], [], [], [], [], [], []
+        tag_offsets, item_tag_ids = [0], []
+        for restaurant_id, name, description, price, calorie, tags, item_features, search_text in item_rows:
+            row = row_by_id.get(restaurant_id)
+            if row is None:
+                continue
+            rows.append(row)
+            names.append(name)
+            descriptions.append(_intern(description))
+            prices.append(_float(price))
+            calories.append(_float(calorie))
+            features.append(item_features)
+            item_tag_ids.extend(tag_ids.setdefault(tag, len(tag_ids)) for tag in tags)
+            tag_offsets.append(len(item_tag_ids))
+            search_texts.append(search_text)
+        columns.update({
+            "item_row": np.array(rows, dtype=np.int32),
+            "item_name": names,
+            "item_description": descriptions,
+            "item_price": np.array(prices, dtype=np.float64),
+            "item_calories": np.array(calories, dtype=np.float64),
+            "item_features": np.array(features, dtype=np.int32),
+            "item_tag_offsets": np.array(tag_offsets, dtype=np.int64),
+            "item_tag_ids": np.array(item_tag_ids, dtype=np.int32),
+            "tag_name": list(tag_ids)
+        })
+        for field in ITEM_RANGE_FIELDS:
+            columns["item_%s_order" % field] = np.argsort(columns["item_" + field], kind="stable")
+        columns.update(KeywordIndex(search_texts).columns())
+        return cls(version, columns)
+
+    def patched(self, version, changed_ids, patch):
+        """Get this snapshot with the restaurants in changed_ids replaced by those of patch
+
+        patch is a snapshot of the changed restaurants that still exist.
+        The result equals a snapshot built from rows of the whole updated
+        database (without item vectors). Only patch's rows were prepared
+        in Python; the unchanged restaurants are carried over from this
+        snapshot's columns with array gathers and merges.
+        """
+        c, p = self.columns, patch.columns
+        kept_rows = np.flatnonzero(~np.isin(self.rest_ids, np.array(sorted(changed_ids), dtype=np.int64)))
+        rest_order = np.argsort(np.concatenate([self.rest_ids[kept_rows], patch.rest_ids]), kind="stable")
+        new_rows = np.empty(len(rest_order), dtype=np.int64)
+        new_rows[rest_order] = np.arange(len(rest_order))
+        row_map = np.full(len(self.rest_ids), -1, dtype=np.int64)
+        row_map[kept_rows] = new_rows[:len(kept_rows)]
+        patch_row_map = new_rows[len(kept_rows):]
+        columns = {"rest_" + field: _combined(c["rest_" + field], kept_rows, p["rest_" + field], rest_order)
+                   for field in RESTAURANT_FIELDS}
+        columns["rest_lat_order"] = np.argsort(columns["rest_lat"], kind="stable")
+
+        # Opening intervals move with their restaurant's row
+        hours = []
+        for snapshot, rows_map in ((self, row_map), (patch, patch_row_map)):
+            rows = snapshot.hours_open_keys // WEEK_MINUTES
+            keep = rows_map[rows] >= 0
+            shift = (rows_map[rows] - rows)[keep] * WEEK_MINUTES
+            hours.append((snapshot.hours_open_keys[keep] + shift, snapshot.hours_close_keys[keep] + shift))
+        open_keys = np.concatenate([hours[0][0], hours[1][0]])
+        hours_order = np.argsort(open_keys, kind="stable")
+        columns["hours_open_key"] = open_keys[hours_order]
+        columns["hours_close_key"] = np.concatenate([hours[0][1], hours[1][1]])[hours_order]
+
+        # Each menu comes whole from one side, so a stable sort by new row keeps every menu in order
+        kept_items = np.flatnonzero(row_map[self.item_row] >= 0)
+        item_rows = np.concatenate([row_map[self.item_row[kept_items]], patch_row_map[patch.item_row]])
+        item_order = np.argsort(item_rows, kind="stable")
+        columns["item_row"] = item_rows[item_order].astype(np.int32)
+        for name in ("item_name", "item_description", "item_price", "item_calories", "item_features"):
+            columns[name] = _combined(c[name], kept_items, p[name], item_order)
+        for field in ITEM_RANGE_FIELDS:
+            columns["item_%s_order" % field] = np.argsort(columns["item_" + field], kind="stable")
+
+        # Tags: patch's names join this tag table, then ids are renumbered by first use as from_rows does
+        tag_names = list(self.tag_names)
+        tag_ids = {name: tag_id for tag_id, name in enumerate(tag_names)}
+        patch_tag_ids = np.array([tag_ids.setdefault(name, len(tag_ids)) for name in patch.tag_names], dtype=np.int64)
+        tag_names += list(tag_ids)[len(tag_names):]
+        kept_tags, kept_offsets = _gather_runs(self.item_tag_ids, self.item_tag_offsets, kept_items)
+        offsets = np.concatenate([kept_offsets, kept_offsets[-1] + patch.item_tag_offsets[1:]])
+        item_tags = np.concatenate([kept_tags.astype(np.int64), patch_tag_ids[patch.item_tag_ids]])
+        item_tags, columns["item_tag_offsets"] = _gather_runs(item_tags, offsets, item_order)
+        first_use = np.full(len(tag_names), len(item_tags), dtype=np.int64)
+        np.minimum.at(first_use, item_tags, np.arange(len(item_tags)))
+        by_first_use = np.argsort(first_use, kind="stable")[:int((first_use < len(item_tags)).sum())]
+        renumber = np.zeros(len(tag_names), dtype=np.int64)
+        renumber[by_first_use] = np.arange(len(by_first_use))
+        columns["item_tag_ids"] = renumber[item_tags].astype(np.int32)
+        columns["tag_name"] = [tag_names[tag_id] for tag_id in by_first_use.tolist()]
+
+        positions = np.empty(len(item_order), dtype=np.int64)
+        positions[item_order] = np.arange(len(item_order))
+        doc_map = np.full(len(self), -1, dtype=np.int64)
+        doc_map[kept_items] = positions[:len(kept_items)]
+        columns.update(self.keyword_index.patched(doc_map, patch.keyword_index, positions[len(kept_items):]).columns())
+        return CatalogSnapshot(version, columns)
+
+    def __len__(self):
+        return len(self.item_names)
+
+    def row_of(self, restaurant_id):
+        """Get the row of a restaurant id, or None"""
+        row = int(np.searchsorted(self.rest_ids, restaurant_id))
+        if row < len(self.rest_ids) and self.rest_ids[row] == restaurant_id:
+            return row
+        return None
+
+    def nearby(self, lat, lng, radius_km):
+        """Get (rows, distances_km) of the restaurants within radius_km, in id order"""
+        min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+        lo = np.searchsorted(self.sorted_lat, min_lat, side="left")
+        hi = np.searchsorted(self.sorted_lat, max_lat, side="right")
+        rows = np.sort(self.lat_order[lo:hi])
+        if lng_ranges:
+            lngs = self.rest_lng[rows]
+            in_box = np.zeros(len(rows), dtype=bool)
+            for min_lng, max_lng in lng_ranges:
+                in_box |= (lngs >= min_lng) & (lngs <= max_lng)
+            rows = rows[in_box]
+        return self.within(rows, lat, lng, radius_km)
+
+    def within(self, rows, lat, lng, radius_km):
+        """Narrow candidate rows to those within radius_km, as (rows, distances_km)"""
+        distances = haversine_many(lat, lng, self.rest_lat[rows], self.rest_lng[rows])
+        # Settle rows within rounding error of the radius with the scalar formula
+        for i in np.flatnonzero(np.abs(distances - radius_km) <= 1e-9 * max(radius_km, 1.0)):
+            row = rows[i]
+            distances[i] = haversine(lat, lng, self.rest_lat[row], self.rest_lng[row])
+        keep = distances <= radius_km
+        return rows[keep], distances[keep]
+
+    def open_at(self, rows, minute):
+        """Mask of the rows whose restaurant is open at a minute of the week
+
+        One binary search per row finds the last interval starting at or
+        before that minute; it belongs to the row and covers the minute
+        only if its close key is past it. Restaurants without known hours
+        are never open.
+        """
+        keys = rows.astype(np.int64) * WEEK_MINUTES + minute
+        last = np.searchsorted(self.hours_open_keys, keys, side="right") - 1
+        if not len(self.hours_close_keys):
+            return np.zeros(len(rows), dtype=bool)
+        return (last >= 0) & (self.hours_close_keys[np.maximum(last, 0)] > keys)
+
+    def count_items(self, rows):
+        """Count the menu items of several restaurant rows"""
+        return int((self.item_end[rows] - self.item_start[rows]).sum())
+
+    def candidates(self, rows, keywords, ranges=None):
+        """Get the item indices of the given restaurant rows containing every keyword
+
+        With keywords, the keyword index posting lists are intersected first
+        and only the surviving items are checked against rows. Indices come
+        back in catalog order either way.
+
+        ranges ({field: bounds} from numeric_ranges) narrow the result too.
+        A restaurant rating range drops rows up front. A price or calorie
+        range is a slice of the items sorted by that value: when the slice
+        is smaller than the candidates so far it is intersected with them,
+        otherwise the candidates' own values are compared with the bounds.
+        """
+        ranges = ranges or {}
+        for field in RESTAURANT_RANGE_FIELDS:
+            if field in ranges:
+                rows = rows[range_mask(self.columns["rest_" + field][rows], ranges[field])]
+        indices = self.keyword_index.search(keywords) if keywords else None
+        size = self.count_items(rows) if indices is None else len(indices)
+        slices = [sorted_slice(self.sorted_item_values[field], ranges[field]) + (field,)
+                  for field in ITEM_RANGE_FIELDS if field in ranges]
+        unchecked = []
+        # Narrowest range first
+        for start, stop, field in sorted(slices, key=lambda entry: entry[1] - entry[0]):
+            if stop - start < size:
+                in_range = np.sort(self.item_orders[field][start:stop])
+                indices = in_range if indices is None else np.intersect1d(indices, in_range, assume_unique=True)
+                size = len(indices)
+            else:
+                unchecked.append(field)
+        if indices is None:
+            spans = [np.arange(start, end) for start, end in zip(self.item_start[rows], self.item_end[rows])]
+            indices = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+        else:
+            indices = self.items_at(indices, rows)
+        for field in unchecked:
+            indices = indices[range_mask(self.item_values[field][indices], ranges[field])]
+        return indices
+
+    def filter_features(self, indices, required, forbidden):
+        """Keep the item indices whose feature bits satisfy the requirement masks"""
+        return indices[(self.item_features[indices] & (required | forbidden)) == required]
+
+    def items_at(self, indices, rows):
+        """Keep the item indices that belong to one of the given restaurant rows"""
+        selected = np.zeros(len(self.rest_ids), dtype=bool)
+        selected[rows] = True
+        return indices[selected[self.item_row[indices]]]
+
+    def item_dict(self, index):
+        """Materialize one menu item in the response format"""
+        tag_ids = self.item_tag_ids[self.item_tag_offsets[index]:self.item_tag_offsets[index + 1]]
+        return {
+            "name": self.item_names[index],
+            "description": self.item_descriptions[index],
+            "price": _real(self.item_price[index]),
+            "calories": _number(self.item_calories[index]),
+            "tags": [self.tag_names[tag_id] for tag_id in tag_ids]
+        }
+
+    def item_text(self, index):
+        """Name, description and tags of an item, the text its semantic vector is built from"""
+        tag_ids = self.item_tag_ids[self.item_tag_offsets[index]:self.item_tag_offsets[index + 1]]
+        return "\n".join([self.item_names[index] or "", self.item_descriptions[index] or "",
+                          " ".join(self.tag_names[tag_id] for tag_id in tag_ids)])
+
+    def semantic_index(self):
+        """Get the item vectors, mapped from the snapshot file or built on first use
+
+        A built index is added to the columns, so save() writes it out.
+        """
+        if self._semantic_index is None:
+            index = SemanticIndex.build(self.item_text(i) for i in range(len(self)))
+            self.columns.update(index.columns())
+            self._semantic_index = index
+        return self._semantic_index
+
+    def has_semantic_index(self):
+        """Check whether the item vectors are mapped or built already"""
+        return self._semantic_index is not None
+
+    def items_for(self, restaurant_id):
+        """Materialize one restaurant's menu"""
+        row = self.row_of(restaurant_id)
+        if row is None:
+            return []
+        return [self.item_dict(index) for index in range(self.item_start[row], self.item_end[row])]
+
+    def save(self, path, **meta):
+        """Write the snapshot to a file that load_snapshot() can memory-map"""
+        columnar_file.write(path, self.columns, dict(meta, schema=SNAPSHOT_SCHEMA))
+
+
+def load_snapshot(path, version=None):
+    """Memory-map a snapshot file written by CatalogSnapshot.save()"""
+    meta, columns = columnar_file.read(path)
+    if meta.get("schema") != SNAPSHOT_SCHEMA:
+        raise ValueError(f"{path} has catalog schema {meta.get('schema')}, expected {SNAPSHOT_SCHEMA}; rebuild it")
+    return CatalogSnapshot(version, columns, meta)
+
+
+class MenuCatalog:
+    """Warm in-process catalog of every restaurant and menu item.
+
+    Loaded either from restaurants.db (both tables read with one query
+    each; tags decoded and each item's feature bits and search text
+    prepared once) or, when snapshot_path names an existing file built by
+    build_snapshot.py, by memory-mapping that file, which takes
+    milliseconds and shares its pages between worker processes. The
+    catalog is reloaded when the snapshot file, the database or its WAL
+    file changes on disk, so a re-run of setup_db.py or build_snapshot.py
+    is picked up without a restart.
+
+    The snapshot file is only served while it matches the database: same
+    SNAPSHOT_SCHEMA, and built from the database's current catalog version
+    (or, for a database without a change log, its current mtime).
+    Otherwise the database is loaded instead and stats() carries a
+    snapshot_warning until build_snapshot.py is run again.
+
+    Only the first load blocks. Later reloads run in a background thread
+    while requests keep using the current snapshot, and the new one is
+    swapped in with a single assignment once it is complete, so a request
+    sees one version or the other and never a mix. When the database has
+    setup_db.py's change log, a reload reads and prepares only the
+    restaurants changed since the loaded version and splices them into
+    the current snapshot's columns (CatalogSnapshot.patched). Nothing but
+    the snapshot itself is kept between reloads. The Python work is
+    proportional to the change; the unchanged restaurants are carried over
+    with array gathers and sorts over the whole catalog, which take tens
+    of milliseconds at 80k items.
+
+    A mapped snapshot file is patched the same way once the database moves
+    past the version it was built from; the result lives in memory and its
+    item vectors are rebuilt by the warmer rather than carried over.
+    """
+
+    def __init__(self, db_path, snapshot_path=None):
+        self.db_path = db_path
+        self.snapshot_path = snapshot_path
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        # SQLite statements run to check and load the source
+        self.db_queries = 0
+        self.load_seconds = 0.0
+        self.reload_kind = None
+        self.restaurants_reloaded = 0
+        self.reload_error = None
+        self.snapshot_warning = None
+        # Callables(new snapshot, previous snapshot) run in the reload thread before the swap
+        self.warmers = []
+        self._snapshot = CatalogSnapshot.from_rows(None, [], [])
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._failed_fingerprint = None
+        self._reloading = False
+
+    def _connect(self):
+        """Open the database read-only, counting every statement run on it in db_queries"""
+        conn = connect_readonly(self.db_path)
+        conn.set_trace_callback(self._count_query)
+        return conn
+
+    def _count_query(self, statement):
+        self.db_queries += 1
+
+    def _snapshot_problem(self):
+        """Why the snapshot file must not be served instead of the database, or None if it can be"""
+        try:
+            meta = columnar_file.read_meta(self.snapshot_path)
+        except (OSError, ValueError) as e:
+            return str(e)
+        if meta.get("schema") != SNAPSHOT_SCHEMA:
+            return f"{self.snapshot_path} has catalog schema {meta.get('schema')}, expected {SNAPSHOT_SCHEMA}"
+        if not os.path.exists(self.db_path):
+            return None
+        conn = self._connect()
+        try:
+            stamp = _version_stamp(conn)
+        finally:
+            conn.close()
+        if stamp is not None:
+            built_from = tuple(meta["catalog_stamp"]) if meta.get("catalog_stamp") else None
+            if built_from != stamp:
+                return (f"{self.snapshot_path} was built from catalog version "
+                        f"{built_from[0] if built_from else None}, the database is at version {stamp[0]}")
+        elif meta.get("source_mtime_ns") != os.stat(self.db_path).st_mtime_ns:
+            return f"{self.snapshot_path} was built from an older copy of {self.db_path}"
+        return None
+
+    def _uses_snapshot_file(self):
+        """Check whether the snapshot file can be served, noting why in snapshot_warning if not"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            self.snapshot_warning = None
+            return False
+        problem = self._snapshot_problem()
+        if problem is not None and not os.path.exists(self.db_path):
+            raise ValueError(problem)
+        self.snapshot_warning = None if problem is None else f"{problem}; serving the database instead"
+        return problem is None
+
+    def _source_fingerprint(self):
+        """Get a cheap fingerprint of the source files"""
+        paths = (self.db_path, self.db_path + "-wal")
+        if self.snapshot_path:
+            paths += (self.snapshot_path,)
+        fingerprint = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                fingerprint.append(None)
+                continue
+            if path.endswith("-wal") and st.st_size == 0:
+                # Readers create an empty WAL when they open the database; only content counts
+                fingerprint.append(None)
+                continue
+            fingerprint.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(fingerprint)
+
+    def _load(self, fingerprint):
+        """Build the snapshot of the current source
+
+        Returns (snapshot, reload kind, restaurants read), or None if the
+        source still matches the loaded snapshot.
+        """
+        if self._uses_snapshot_file():
+            if self.reload_kind == "snapshot" and self._fingerprint and fingerprint[2:] == self._fingerprint[2:]:
+                # The database changed, but the mapped file still matches it
+                return None
+            snapshot = load_snapshot(self.snapshot_path, fingerprint)
+            return snapshot, "snapshot", len(snapshot.restaurants)
+        current = self._snapshot
+        conn = self._connect()
+        try:
+            # One read transaction, so the version and the rows read agree
+            conn.execute('BEGIN')
+            stamp = _version_stamp(conn)
+            if stamp is not None and stamp == current.catalog_stamp:
+                return None
+            changed = None
+            if stamp is not None and current.catalog_stamp is not None:
+                changed = _changes_since(conn, current.catalog_stamp)
+            if changed is not None and len(changed) > MAX_PATCH_SHARE * len(current.rest_ids):
+                changed = None
+            rows = self._read_db(conn, changed)
+            conn.rollback()
+        finally:
+            conn.close()
+
+        if changed is None:
+            snapshot, kind, count = CatalogSnapshot.from_rows(fingerprint, *rows), "full", len(rows[0])
+        else:
+            snapshot = current.patched(fingerprint, changed, CatalogSnapshot.from_rows(None, *rows))
+            kind, count = "incremental", len(changed)
+        if stamp is not None:
+            snapshot.catalog_stamp, snapshot.catalog_version = stamp, stamp[0]
+        return snapshot, kind, count
+
+    def _read_db(self, conn, restaurant_ids=None):
+        """Read and prepare every restaurant, or only those in restaurant_ids
+
+        Returns (restaurant rows, item rows, hours rows) in restaurant id
+        order, as CatalogSnapshot.from_rows() takes them.
+        """
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(menu_items)')}
+        # Databases built before the features column existed are classified here
+        features_column = 'features' if 'features' in columns else 'NULL'
+        queries = [
+            'SELECT %s FROM restaurants {where} ORDER BY id' % ', '.join(RESTAURANT_FIELDS),
+            'SELECT restaurant_id, name, description, price, calories, tags, %s '
+            'FROM menu_items {where} ORDER BY restaurant_id, id' % features_column
+        ]
+        if 'opening_intervals' in tables:
+            queries.append('SELECT restaurant_id, open_minute, close_minute FROM opening_intervals {where} '
+                           'ORDER BY restaurant_id, open_minute')
+        if restaurant_ids is None:
+            results = [conn.execute(query.format(where='')).fetchall() for query in queries]
+        else:
+            ids = sorted(restaurant_ids)
+            results = [[] for _ in queries]
+            for chunk_start in range(0, len(ids), ID_CHUNK):
+                chunk = ids[chunk_start:chunk_start + ID_CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                for result, query, key in zip(results, queries, ('id', 'restaurant_id', 'restaurant_id')):
+                    result.extend(conn.execute(query.format(where='WHERE %s IN (%s)' % (key, placeholders)), chunk))
+
+        items = []
+        for restaurant_id, name, description, price, calories, tags, features in results[1]:
+            tags = json.loads(tags) if tags else []
+            if features is None:
+                features = classify_item(name, description, tags)
+            expanded_tags = expand_tags_from_content(name, description, tags)
+            search_text = item_search_text(name, description, expanded_tags)
+            items.append((restaurant_id, name, description, price, calories, tags, features, search_text))
+        # Databases built before opening_intervals existed have their hours parsed by from_rows
+        return results[0], items, results[2] if len(results) > 2 else None
+
+    def refresh(self):
+        """Reload the catalog if its source changed; return True if it was current
+
+        Runs in the calling thread. The new snapshot is warmed up and then
+        swapped in; if loading fails the current one stays and the error
+        is raised.
+        """
+        fingerprint = self._source_fingerprint()
+        if fingerprint == self._fingerprint:
+            return True
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if fingerprint == self._fingerprint:
+                return True
+            start = time.perf_counter()
+            previous = self._snapshot
+            loaded = self._load(fingerprint)
+            if loaded is not None:
+                snapshot, kind, count = loaded
+                for warm in self.warmers:
+                    warm(snapshot, previous)
+                self._snapshot = snapshot
+                self.load_seconds = time.perf_counter() - start
+                self.reload_kind, self.restaurants_reloaded = kind, count
+                self.reloads += 1
+            self._fingerprint = fingerprint
+        return loaded is None
+
+    def _reload_in_background(self, fingerprint):
+        try:
+            self.refresh()
+            self.reload_error = None
+        except Exception as e:
+            # Keep serving the current snapshot; this source is not retried until it changes again
+            self._failed_fingerprint = fingerprint
+            self.reload_error = f"{type(e).__name__}: {e}"
+        finally:
+            self._reloading = False
+
+    def snapshot(self):
+        """Get the current snapshot
+
+        The first call loads the catalog. After that a changed source is
+        reloaded in a background thread, and the current snapshot is
+        returned until the new one is swapped in.
+        """
+        if self._fingerprint is None:
+            self.refresh()
+            self.misses += 1
+            return self._snapshot
+        fingerprint = self._source_fingerprint()
+        if fingerprint == self._fingerprint:
+            self.hits += 1
+            return self._snapshot
+        self.misses += 1
+        if not self._reloading and fingerprint != self._failed_fingerprint:
+            self._reloading = True
+            threading.Thread(target=self._reload_in_background, args=(fingerprint,),
+                             name="catalog-reload", daemon=True).start()
+        return self._snapshot
+
+    def get_items(self, restaurant_id):
+        """Get fresh dicts of a restaurant's menu items"""
+        return self.snapshot().items_for(restaurant_id)
+
+    def stats(self):
+        """Get cache counters and the state of the last reload for debug output"""
+        snapshot = self._snapshot
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "db_queries": self.db_queries,
+            "source": "snapshot" if snapshot.meta else "database",
+            "version": snapshot.catalog_version,
+            "load_ms": round(self.load_seconds * 1000, 3),
+            "reload_kind": self.reload_kind,
+            "restaurants_reloaded": self.restaurants_reloaded,
+            "reloading": self._reloading,
+            "restaurants": len(snapshot.restaurants),
+            "indexed_tokens": len(snapshot.keyword_index)
+        }
+        if self.reload_error:
+            stats["reload_error"] = self.reload_error
+        if self.snapshot_warning:
+            stats["snapshot_warning"] = self.snapshot_warning
+        return stats
+
+
+def _version_stamp(conn):
+    """(version, created_at) of a database's latest catalog version, or None without a change log"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if 'catalog_versions' not in tables:
+        return None
+    row = conn.execute('SELECT version, created_at FROM catalog_versions ORDER BY version DESC LIMIT 1').fetchone()
+    return tuple(row) if row else (0, None)
+
+
+def _changes_since(conn, stamp):
+    """Ids of the restaurants changed after the version stamp, or None if everything must be reloaded
+
+    A full reload is needed after a full_reload version, or when the
+    stamp's version is not in this database's log (a replaced database).
+    """
+    version, created_at = stamp
+    if version and conn.execute('SELECT created_at FROM catalog_versions WHERE version=?',
+                                (version,)).fetchone() != (created_at,):
+        return None
+    if conn.execute('SELECT 1 FROM catalog_versions WHERE version > ? AND full_reload', (version,)).fetchone():
+        return None
+    return {restaurant_id for (restaurant_id,) in
+            conn.execute('SELECT DISTINCT restaurant_id FROM catalog_changes WHERE version > ?', (version,))}
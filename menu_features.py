@@ -0,0 +1,167 @@
+# Keyword tables and per-item feature classification shared by the
+# recommend service and the database loader
+from keyword_matcher import KeywordMatcher
+
+# Define comprehensive keyword mappings
+SPICY_KEYWORDS = {
+    "spicy", "hot", "jalapeno", "sriracha", "chili", "chipotle", 
+    "buffalo", "cayenne", "habanero", "ghost", "pepper", "fiery",
+    "zesty", "piquant", "wasabi", "horseradish", "gochujang",
+    "harissa", "tabasco", "scotch bonnet", "thai chili"
+}
+
+VEGETARIAN_KEYWORDS = {
+    "vegetarian", "veggie", "veg", "meatless", "plant-based",
+    "paneer", "tofu", "tempeh", "seitan", "mushroom", "eggplant",
+    "broccoli", "cauliflower", "spinach", "kale", "beans", "lentil",
+    "chickpea", "quinoa", "falafel", "hummus", "vegetable", "salad"
+}
+
+VEGAN_KEYWORDS = {
+    "vegan", "plant-based", "dairy-free", "non-dairy", "animal-free"
+}
+
+DRINK_KEYWORDS = {
+    "drink", "beverage", "juice", "soda", "tea", "coffee", 
+    "smoothie", "cocktail", "milkshake", "beer", "wine", 
+    "alcohol", "lemonade", "water", "cola", "pepsi", "coke",
+    "latte", "cappuccino", "espresso", "frappe", "mocktail",
+    "refreshment", "thirst", "liquid"
+}
+
+# Mapping of ingredients/descriptions to tags
+INGREDIENT_TAG_MAP = {
+    # Spicy mappings
+    "jalapeno": ["spicy"],
+    "sriracha": ["spicy"],
+    "chili": ["spicy"],
+    "chipotle": ["spicy"],
+    "buffalo": ["spicy"],
+    "cayenne": ["spicy"],
+    "habanero": ["spicy"],
+    "ghost pepper": ["spicy"],
+    "hot sauce": ["spicy"],
+    "wasabi": ["spicy"],
+    "gochujang": ["spicy"],
+    
+    # Vegetarian mappings
+    "paneer": ["vegetarian"],
+    "tofu": ["vegetarian", "vegan"],
+    "tempeh": ["vegetarian", "vegan"],
+    "mushroom": ["vegetarian"],
+    "eggplant": ["vegetarian"],
+    "broccoli": ["vegetarian"],
+    "cauliflower": ["vegetarian"],
+    "cheese": ["vegetarian"],
+    "beans": ["vegetarian"],
+    "lentil": ["vegetarian"],
+    "chickpea": ["vegetarian"],
+    "quinoa": ["vegetarian"],
+    "falafel": ["vegetarian"],
+    
+    # Vegan mappings
+    "plant-based": ["vegan", "vegetarian"],
+    "dairy-free": ["vegan"],
+    "almond milk": ["vegan"],
+    "oat milk": ["vegan"],
+    "soy milk": ["vegan"],
+}
+
+# Words that rule an item out of vegetarian/vegan results
+MEAT_WORDS = {
+    "chicken", "beef", "pork", "lamb", "fish", "shrimp", "salmon", "tuna",
+    "bacon", "ham", "turkey", "duck", "crab", "lobster", "meat", "steak"
+}
+
+NON_VEGAN_WORDS = {
+    "cheese", "milk", "cream", "butter", "egg", "yogurt", "mayo",
+    "mayonnaise", "honey"
+}
+
+# Feature bits stored in menu_items.features
+FEATURE_DRINK = 1
+FEATURE_SPICY = 2
+FEATURE_VEGETARIAN = 4
+FEATURE_VEGAN = 8
+FEATURE_HAS_MEAT = 16
+FEATURE_HAS_NON_VEGAN = 32
+
+def keyword_table(*groups):
+    """Merge (keywords, labels) groups into a keyword -> labels mapping for KeywordMatcher"""
+    table = {}
+    for keywords, labels in groups:
+        for keyword in keywords:
+            table.setdefault(keyword, set()).update(labels)
+    return table
+
+# Compiled once: feature bits implied by words in an item's name or description
+MENTION_MATCHER = KeywordMatcher(keyword_table(
+    (DRINK_KEYWORDS, [FEATURE_DRINK]),
+    (SPICY_KEYWORDS, [FEATURE_SPICY]),
+    (VEGETARIAN_KEYWORDS, [FEATURE_VEGETARIAN]),
+    (VEGAN_KEYWORDS, [FEATURE_VEGAN]),
+    (MEAT_WORDS, [FEATURE_HAS_MEAT]),
+    (NON_VEGAN_WORDS, [FEATURE_HAS_NON_VEGAN])
+))
+
+TAG_FEATURES = {
+    "drink": FEATURE_DRINK,
+    "spicy": FEATURE_SPICY,
+    "vegetarian": FEATURE_VEGETARIAN,
+    "vegan": FEATURE_VEGAN
+}
+
+def expand_tags_from_content(name, description, existing_tags):
+    """Expand tags based on item name and description"""
+    content_lower = f"{name} {description}".lower()
+    expanded_tags = set([tag.lower() for tag in existing_tags])
+    
+    # A few dozen substring checks run in C; a matcher scan in Python is slower here
+    for ingredient, tags in INGREDIENT_TAG_MAP.items():
+        if ingredient in content_lower:
+            expanded_tags.update(tags)
+    if any(drink_word in content_lower for drink_word in DRINK_KEYWORDS):
+        expanded_tags.add("drink")
+    
+    return expanded_tags
+
+def classify_item(name, description, tags):
+    """Compute the feature bitmask for a menu item"""
+    name = (name or "").lower()
+    description = (description or "").lower()
+    expanded_tags = expand_tags_from_content(name, description, tags or [])
+
+    features = 0
+    for tag in expanded_tags:
+        features |= TAG_FEATURES.get(tag, 0)
+    # No keyword contains a newline, so nothing can match across name and description
+    for bit in MENTION_MATCHER.find(f"{name}\n{description}"):
+        features |= bit
+    return features
+
+def item_search_text(name, description, expanded_tags):
+    """Build the lowercase text that free-text keywords are matched against
+
+    Query keywords are runs of word characters, so they can never match
+    across the newline and space separators used here.
+    """
+    return "\n".join([(name or "").lower(), (description or "").lower(), " ".join(sorted(expanded_tags))])
+
+def requirement_masks(requirements):
+    """Translate parsed query requirements into (required, forbidden) feature masks"""
+    required = 0
+    forbidden = 0
+    # Drinks are only returned when asked for, and then nothing else is
+    if requirements["drinks"]:
+        required |= FEATURE_DRINK
+    else:
+        forbidden |= FEATURE_DRINK
+    if requirements["spicy"]:
+        required |= FEATURE_SPICY
+    if requirements["vegetarian"]:
+        required |= FEATURE_VEGETARIAN
+        forbidden |= FEATURE_HAS_MEAT
+    if requirements["vegan"]:
+        required |= FEATURE_VEGAN
+        forbidden |= FEATURE_HAS_NON_VEGAN
+    return required, forbidden
@@ -0,0 +1,266 @@
+import re
+import json
+import zlib
+import argparse
+import sqlite3
+import numpy as np
+from functools import lru_cache
+from menu_features import classify_item
+
+DB_PATH = "restaurants.db"
+
+NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.8
+# Prices further apart than this fraction are different items (sizes, counts), not variants
+DEFAULT_PRICE_TOLERANCE = 0.1
+SHINGLE_SIZE = 2
+# Probability that LSH proposes a pair whose similarity is exactly the threshold
+LSH_RECALL = 0.98
+# Rows of (shingle, permutation) hashes computed at once while building signatures
+HASH_CHUNK = 1 << 16
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(name, description=None, k=SHINGLE_SIZE):
+    """Character k-grams of the normalized name plus word pairs of the description
+
+    The two kinds are namespaced so a name fragment never matches a
+    description word.
+    """
+    padded = " %s " % " ".join(_WORD.findall((name or "").lower()))
+    result = {"n:" + padded[i:i + k] for i in range(max(1, len(padded) - k + 1))}
+    words = _WORD.findall((description or "").lower())
+    if len(words) == 1:
+        result.add("d:" + words[0])
+    result.update("d:%s %s" % pair for pair in zip(words, words[1:]))
+    return result
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@lru_cache(maxsize=None)
+def lsh_params(threshold, num_perm=NUM_PERM, recall=LSH_RECALL):
+    """(bands, rows) for banding num_perm signature rows
+
+    Two items with Jaccard similarity s share a bucket with probability
+    1 - (1 - s**rows)**bands. This takes the most rows per band, i.e. the
+    fewest candidates, that still pairs items at exactly threshold with
+    probability recall; candidates are verified exactly afterwards, so
+    erring towards more of them only costs time.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class MinHasher:
+    """MinHash signatures with num_perm universal hash functions (a*x + b) mod 2**61-1"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets):
+        """uint32 array of shape (len(shingle_sets), num_perm), one row per set
+
+        Rows of empty sets are all 0xffffffff.
+        """
+        out = np.full((len(shingle_sets), self.num_perm), 0xffffffff, dtype=np.uint32)
+        start = 0
+        while start < len(shingle_sets):
+            # Hash as many sets as fit in one chunk of HASH_CHUNK shingles
+            stop, size = start, 0
+            while stop < len(shingle_sets) and (stop == start or size + len(shingle_sets[stop]) <= HASH_CHUNK):
+                size += len(shingle_sets[stop])
+                stop += 1
+            chunk = shingle_sets[start:stop]
+            lengths = np.fromiter((len(s) for s in chunk), dtype=np.int64, count=len(chunk))
+            hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for shingle_set in chunk for s in shingle_set),
+                                 dtype=np.uint64, count=int(lengths.sum()))
+            if len(hashes):
+                # uint64 products wrap around; that is fine for hashing
+                permuted = ((np.outer(hashes, self.a) + self.b) % _MERSENNE) & np.uint64(0xffffffff)
+                nonempty = lengths > 0
+                offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+                out[start:stop][nonempty] = np.minimum.reduceat(permuted, offsets, axis=0).astype(np.uint32)
+            start = stop
+        return out
+
+
+def candidate_pairs(signatures, bands, rows, groups=None):
+    """Index pairs that agree on every row of at least one band
+
+    With groups, only items of the same group are paired, e.g. the
+    restaurant id to look for duplicates within each menu.
+    """
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(len(block)):
+            key = block[i].tobytes() if groups is None else (groups[i], block[i].tobytes())
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def prices_compatible(a, b, tolerance=DEFAULT_PRICE_TOLERANCE):
+    if a is None or b is None or tolerance is None:
+        return True
+    return abs(a - b) <= tolerance * max(abs(a), abs(b))
+
+
+def item_features(item):
+    """classify_item bits (spicy, vegetarian, drink, ...) of a menu item dict"""
+    tags = item.get("tags") or []
+    if isinstance(tags, str):
+        tags = json.loads(tags)
+    return classify_item(item.get("name"), item.get("description"), tags)
+
+
+def find_near_duplicates(items, threshold=DEFAULT_THRESHOLD, groups=None, num_perm=NUM_PERM,
+                         price_tolerance=DEFAULT_PRICE_TOLERANCE, hasher=None):
+    """Pairs (i, j, similarity) of items whose name+description shingles have Jaccard >= threshold
+
+    items are menu item dicts. LSH banding proposes the candidates, and
+    each one is checked against the exact Jaccard similarity, the price
+    tolerance and the feature bits, so the result has no false positives.
+    Items that classify differently ("Spicy Salmon Poke Bowl" and "Salmon
+    Poke Bowl") are never paired: merging them would change what dietary
+    and spicy queries find.
+    """
+    sets = [shingles(item.get("name"), item.get("description")) for item in items]
+    if len(sets) < 2:
+        return []
+    hasher = hasher or MinHasher(num_perm)
+    bands, rows = lsh_params(threshold, hasher.num_perm)
+    features = {}
+    matches = []
+    for i, j in sorted(candidate_pairs(hasher.signatures(sets), bands, rows, groups)):
+        similarity = jaccard(sets[i], sets[j])
+        if similarity < threshold or not prices_compatible(items[i].get("price"), items[j].get("price"),
+                                                           price_tolerance):
+            continue
+        for index in (i, j):
+            if index not in features:
+                features[index] = item_features(items[index])
+        if features[i] == features[j]:
+            matches.append((i, j, similarity))
+    return matches
+
+
+def clusters(n, pairs):
+    """Connected components of size > 1 as sorted index lists, ordered by first index"""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    components = {}
+    for i in range(n):
+        components.setdefault(find(i), []).append(i)
+    return [members for members in components.values() if len(members) > 1]
+
+
+def merge_report(items, pairs, labels=None):
+    """One entry per cluster: the item kept (the first one) and the items merged into it
+
+    labels, if given, names the restaurant of every item.
+    """
+    similarity = {}
+    for i, j, s in pairs:
+        similarity[(i, j)] = similarity[(j, i)] = s
+
+    def describe(i):
+        entry = {"name": items[i].get("name"), "price": items[i].get("price")}
+        if labels is not None:
+            entry["restaurant"] = labels[i]
+        return entry
+
+    report = []
+    for members in clusters(len(items), pairs):
+        keep = members[0]
+        merged = []
+        for i in members[1:]:
+            entry = describe(i)
+            # Clusters are transitive, so an item may only be similar to another member
+            entry["similarity"] = round(similarity.get((keep, i), max(similarity.get((i, m), 0.0) for m in members)), 3)
+            merged.append(entry)
+        report.append({"keep": describe(keep), "merge": merged})
+    return report
+
+
+def dedupe_menu_near(restaurant, threshold=DEFAULT_THRESHOLD, price_tolerance=DEFAULT_PRICE_TOLERANCE, hasher=None):
+    """Drop menu items that are near duplicates of an earlier item on the same menu
+
+    Returns the merge report entries for this restaurant.
+    """
+    items = restaurant.get("menu_items") or []
+    pairs = find_near_duplicates(items, threshold, price_tolerance=price_tolerance, hasher=hasher)
+    report = [dict(restaurant=restaurant.get("name"), **entry) for entry in merge_report(items, pairs)]
+    if report:
+        dropped = {i for members in clusters(len(items), pairs) for i in members[1:]}
+        restaurant["menu_items"] = [item for i, item in enumerate(items) if i not in dropped]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report near-duplicate menu items in restaurants.db")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="minimum Jaccard similarity of name+description shingles")
+    parser.add_argument("--price-tolerance", type=float, default=DEFAULT_PRICE_TOLERANCE,
+                        help="maximum relative price difference of a merged pair")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM, help="MinHash permutations")
+    parser.add_argument("--across-restaurants", action="store_true",
+                        help="also pair items of different restaurants, e.g. chain locations")
+    parser.add_argument("--report", default=None, help="write the merge report JSON here")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    rows = conn.execute('''SELECT m.restaurant_id, r.name, m.name, m.description, m.price, m.tags
+                           FROM menu_items m JOIN restaurants r ON r.id = m.restaurant_id
+                           ORDER BY m.restaurant_id, m.id''').fetchall()
+    conn.close()
+    items = [{"name": name, "description": description, "price": price, "tags": tags}
+             for _, _, name, description, price, tags in rows]
+    groups = None if args.across_restaurants else [row[0] for row in rows]
+    pairs = find_near_duplicates(items, args.threshold, groups, args.num_perm, args.price_tolerance)
+    report = merge_report(items, pairs, labels=[row[1] for row in rows])
+
+    merged = sum(len(entry["merge"]) for entry in report)
+    print(f"{len(items)} menu items: {len(report)} near-duplicate groups, {merged} items would be merged "
+          f"(threshold {args.threshold}).")
+    for entry in report[:20]:
+        keep = entry["keep"]
+        print(f"  {keep['restaurant']}: {keep['name']!r} <- " +
+              ", ".join(f"{m['name']!r} ({m['similarity']})" for m in entry["merge"]))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Merge report written to {args.report}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import re
+import numpy as np
+
+# Menu item columns and restaurant columns a query can put a range on
+ITEM_RANGE_FIELDS = ("price", "calories")
+RESTAURANT_RANGE_FIELDS = ("rating",)
+RANGE_FIELDS = ITEM_RANGE_FIELDS + RESTAURANT_RANGE_FIELDS
+
+# A lone amount ("a $10 lunch", "500 calories", "4 stars") is a budget for
+# price and calories and a minimum for the rating
+DEFAULT_OPERATORS = {"price": "le", "calories": "le", "rating": "ge"}
+
+_NUMBER = r"(?<![\w.])\d+(?:\.\d+)?"
+_UNITS = {
+    "price": (r"\$\s*", ""),
+    "calories": ("", r"\s*(?:kcals?|calories|calorie|cals?)\b"),
+    "rating": ("", r"\s*\+?\s*stars?\b")
+}
+# Words naming the field, after which the amount needs no unit ("rated 4+", "price under 10")
+_FIELD_WORDS = {
+    "price": r"\b(?:price[ds]?|costs?|costing)",
+    "calories": r"\b(?:calories|calorie count)",
+    "rating": r"\b(?:rated|ratings?)"
+}
+
+_PREFIX_OPERATORS = {
+    "le": ["at most", "up to", "no more than", "not more than", "maximum of", "maximum", "max of", "max", "within",
+           "<=", "≤"],
+    "lt": ["under", "below", "less than", "fewer than", "lower than", "cheaper than", "<"],
+    "ge": ["at least", "no less than", "not less than", "minimum of", "minimum", "min of", "min", ">=", "≥"],
+    "gt": ["over", "above", "more than", "greater than", "higher than", "better than", ">"]
+}
+_SUFFIX_OPERATORS = {
+    "le": ["or less", "or fewer", "or under", "or below", "or lower", "or cheaper", "and under", "and below",
+           "at most", "maximum", "max", "tops"],
+    "ge": ["or more", "or higher", "or above", "or over", "or better", "and up", "and above", "and over",
+           "and higher", "at least", "minimum", "min", "plus", "+"]
+}
+
+_DOLLAR_WORDS = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)\s*(?:dollars?|bucks|usd)\b")
+
+
+def _alternatives(phrases):
+    """Regex alternation of phrases, word phrases bounded by \\b"""
+    return "|".join(r"\b%s\b" % re.escape(p).replace(r"\ ", r"\s+") if p[0].isalpha() else re.escape(p)
+                    for p in phrases)
+
+
+def _operator_group(operators):
+    return "(?:%s)" % "|".join("(?P<op_%s>%s)" % (op, _alternatives(phrases)) for op, phrases in operators.items())
+
+
+def _amount(field, name, unit=True):
+    """Regex of an amount of field with its number in group name; the unit is optional unless unit"""
+    prefix, suffix = _UNITS[field]
+    optional = "" if unit else "?"
+    return "".join([
+        "(?:%s)%s" % (prefix, optional) if prefix else "",
+        "(?P<%s>%s)" % (name, _NUMBER),
+        "(?:%s)%s" % (suffix, optional) if suffix else ""
+    ])
+
+
+def _patterns(field):
+    """(form, regex) pairs for one field, most specific first
+
+    Forms are "range" (between/from-to), "prefix" (an operator before the
+    amount), "suffix" (one after it) and "bare". Each comes once after a
+    word naming the field, where units are optional, and once standing
+    alone, where the amount must carry its unit (a range on at least one
+    of its bounds).
+    """
+    patterns = []
+    for context, unit in ((_FIELD_WORDS[field] + r"\s+(?:(?:of|is)\s+)?", False), ("", True)):
+        amount = _amount(field, "value", unit)
+        # A range needs its unit once, on either bound: "$5-12", "5 to 12 dollars"
+        bounds = [(False, False)] if not unit else [(True, False), (False, True)]
+        forms = []
+        for low_unit, high_unit in bounds:
+            low, high = _amount(field, "low", low_unit), _amount(field, "high", high_unit)
+            forms += [
+                ("range", r"%s\bbetween\s+%s\s+and\s+%s" % (context, low, high)),
+                ("range", r"%s(?:\bfrom\s+)?%s\s*(?:-|–|\bto\b)\s*%s" % (context, low, high))
+            ]
+        forms += [
+            ("prefix", r"%s%s\s*%s" % (context, _operator_group(_PREFIX_OPERATORS), amount)),
+            ("suffix", r"%s%s\s*%s" % (context, amount, _operator_group(_SUFFIX_OPERATORS))),
+            ("bare", context + amount)
+        ]
+        patterns.extend((form, re.compile(regex)) for form, regex in forms)
+    return patterns
+
+
+_FIELD_PATTERNS = [(field, _patterns(field)) for field in RANGE_FIELDS]
+
+
+def _tighten(bounds, op, value):
+    if op not in bounds:
+        bounds[op] = value
+    elif op in ("gt", "ge"):
+        bounds[op] = max(bounds[op], value)
+    else:
+        bounds[op] = min(bounds[op], value)
+
+
+def extract_ranges(text):
+    """Pull numeric constraints out of a lowercase query
+
+    Returns ({field: {operator: value}}, rest of the text) where operators
+    are "lt", "le", "gt" and "ge", e.g. "under $10" gives
+    {"price": {"lt": 10.0}} and "4+ stars" {"rating": {"ge": 4.0}}. The
+    matched phrases are blanked out of the text so their words are not
+    taken as keywords.
+    """
+    ranges = {}
+    if not any(ch.isdigit() for ch in text):
+        return ranges, text
+    text = _DOLLAR_WORDS.sub(r"$\1", text)
+    for field, patterns in _FIELD_PATTERNS:
+        for form, pattern in patterns:
+            def take(match):
+                bounds = ranges.setdefault(field, {})
+                if form == "range":
+                    low, high = sorted((float(match.group("low")), float(match.group("high"))))
+                    _tighten(bounds, "ge", low)
+                    _tighten(bounds, "le", high)
+                else:
+                    op = next((key[3:] for key, value in match.groupdict().items()
+                               if key.startswith("op_") and value is not None), DEFAULT_OPERATORS[field])
+                    _tighten(bounds, op, float(match.group("value")))
+                return " "
+            text = pattern.sub(take, text)
+    return ranges, text
+
+
+def ranges_key(ranges):
+    """Hashable form of parsed ranges, for cache keys"""
+    return tuple(sorted((field, tuple(sorted(bounds.items()))) for field, bounds in (ranges or {}).items()))
+
+
+def range_mask(values, bounds):
+    """Boolean mask of the values within bounds; NaN (unknown) never is"""
+    mask = np.ones(len(values), dtype=bool)
+    for op, limit in bounds.items():
+        if op == "lt":
+            mask &= values < limit
+        elif op == "le":
+            mask &= values <= limit
+        elif op == "gt":
+            mask &= values > limit
+        else:
+            mask &= values >= limit
+    return mask
+
+
+def in_range(value, bounds):
+    """Check one value (None when unknown) against bounds"""
+    return value is not None and bool(range_mask(np.array([value], dtype=np.float64), bounds)[0])
+
+
+def sorted_slice(sorted_values, bounds):
+    """(start, stop) of the values within bounds in an ascending array with NaN last"""
+    start = 0
+    stop = int(np.searchsorted(sorted_values, np.inf, side="right"))
+    for op, limit in bounds.items():
+        if op == "lt":
+            stop = min(stop, int(np.searchsorted(sorted_values, limit, side="left")))
+        elif op == "le":
+            stop = min(stop, int(np.searchsorted(sorted_values, limit, side="right")))
+        elif op == "gt":
+            start = max(start, int(np.searchsorted(sorted_values, limit, side="right")))
+        else:
+            start = max(start, int(np.searchsorted(sorted_values, limit, side="left")))
+    return start, max(start, stop)
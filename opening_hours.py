@@ -0,0 +1,106 @@
+import re
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Google separates times with narrow no-break and thin spaces and ranges with an en dash
+_SPACES = re.compile(r"[\s   ]+")
+_DASHES = re.compile(r"\s*[–—‒-]\s*")
+_LINE = re.compile(r"^(%s)\s*:\s*(.*)$" % "|".join(DAYS))
+_TIME = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?\s*(?:m\.?)?$")
+
+
+def _normalize(text):
+    return _DASHES.sub("-", _SPACES.sub(" ", text)).strip().lower()
+
+
+def _clock(text):
+    """(hour, minute, "a"/"p"/None) of a time such as "9:30 pm", "21:30" or "9 am", or None"""
+    match = _TIME.match(text.strip())
+    if match is None:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if minute > 59 or hour > 24 or (match.group(3) and not 1 <= hour <= 12):
+        return None
+    return hour, minute, match.group(3)
+
+
+def _minutes(hour, minute, meridiem):
+    if meridiem is not None:
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    return hour * 60 + minute
+
+
+def parse_span(text):
+    """Minutes after midnight (open, close) of one "11:00 AM - 2:30 PM" span, or None
+
+    The opening time may leave out AM/PM when it is the same as the
+    closing time's ("12:00 - 9:30 PM"). A closing time at or before the
+    opening time is on the next day, so close can exceed DAY_MINUTES.
+    """
+    parts = text.split("-")
+    if len(parts) != 2:
+        return None
+    start, end = _clock(parts[0]), _clock(parts[1])
+    if start is None or end is None:
+        return None
+    close = _minutes(*end)
+    open_ = _minutes(*start[:2], start[2] or end[2])
+    if start[2] is None and end[2] is not None and open_ > close:
+        # "11:00 - 1:00 PM" can only mean 11 AM
+        open_ = _minutes(*start[:2], "a")
+    if close <= open_:
+        close += DAY_MINUTES
+    return open_, close
+
+
+def parse_day(line):
+    """(day index, [(open, close), ...]) of one weekday_text line, or None if it is not one
+
+    "Closed" gives no spans and "Open 24 hours" the whole day.
+    """
+    match = _LINE.match(_normalize(line))
+    if match is None:
+        return None
+    day, hours = DAYS.index(match.group(1)), match.group(2)
+    if hours.startswith("closed"):
+        return day, []
+    if hours.startswith("open 24 hours"):
+        return day, [(0, DAY_MINUTES)]
+    spans = [parse_span(part) for part in hours.split(",")]
+    if any(span is None for span in spans):
+        return None
+    return day, spans
+
+
+def parse_opening_hours(weekday_text):
+    """Sorted, non-overlapping (open, close) minutes since Monday 00:00 of a week of weekday_text lines
+
+    Spans running past Sunday midnight wrap round to Monday. Lines that
+    cannot be parsed are skipped, so their day counts as closed.
+    """
+    intervals = []
+    for line in weekday_text or []:
+        parsed = parse_day(line) if isinstance(line, str) else None
+        if parsed is None:
+            continue
+        day, spans = parsed
+        for open_, close in spans:
+            start, end = day * DAY_MINUTES + open_, day * DAY_MINUTES + close
+            if end > WEEK_MINUTES:
+                intervals.append((0, end - WEEK_MINUTES))
+                end = WEEK_MINUTES
+            intervals.append((start, end))
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def minute_of_week(when):
+    """Minutes since Monday 00:00 of a datetime, in its own time zone"""
+    return when.weekday() * DAY_MINUTES + when.hour * 60 + when.minute
@@ -0,0 +1,124 @@
+import math
+import numpy as np
+
+# Relative importance of each signal in an item's score. Every signal is
+# scaled to roughly [0, 1] before weighting, so the weights are comparable.
+DEFAULT_WEIGHTS = {
+    "keyword": 1.0,     # how strongly the free-text keywords match (name beats description/tags)
+    "rating": 1.0,      # restaurant rating, shrunk towards RATING_PRIOR for few reviews
+    "popularity": 0.5,  # log of the restaurant's review count
+    "distance": 1.0,    # closer restaurants score higher
+    "price": 0.25,      # cheaper items score higher
+    "random": 0.0       # uniform noise for variety; reproducible with a seed
+}
+
+# Bayesian average: a restaurant with few reviews is pulled towards this rating
+RATING_PRIOR = 3.5
+RATING_PRIOR_WEIGHT = 20
+
+
+def merge_weights(overrides=None):
+    """Get DEFAULT_WEIGHTS updated with overrides
+
+    Raises ValueError unless overrides is a dict of known keys to finite numbers.
+    """
+    if overrides is None:
+        overrides = {}
+    if not isinstance(overrides, dict):
+        raise ValueError("weights must be an object of ranking weights")
+    weights = dict(DEFAULT_WEIGHTS)
+    for key, value in overrides.items():
+        if key not in weights:
+            raise ValueError(f"unknown ranking weight: {key}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"ranking weight {key} must be a finite number, got {value!r}")
+        weights[key] = float(value)
+    return weights
+
+
+def ranking_seed(seed):
+    """Check the seed of the random term: None or a non-negative integer, else ValueError"""
+    if seed is None or (isinstance(seed, int) and not isinstance(seed, bool) and seed >= 0):
+        return seed
+    raise ValueError(f"seed must be a non-negative integer, got {seed!r}")
+
+
+def keyword_strength(name, keywords):
+    """Score how strongly an item matches keywords it is already known to contain
+
+    Each keyword scores 1.0 when it appears in the item name and 0.5 when
+    it only appears in the description or tags.
+    """
+    if not keywords:
+        return 0.0
+    name = name.lower()
+    return sum(1.0 if keyword in name else 0.5 for keyword in keywords) / len(keywords)
+
+
+def score_items(keyword, rating, ratings_count, distance_km, price, radius_km, weights, rng=None):
+    """Vectorized item scores from parallel arrays of per-item signals
+
+    rating, ratings_count and price may contain NaN for missing values.
+    """
+    rating = np.nan_to_num(rating, nan=RATING_PRIOR)
+    ratings_count = np.nan_to_num(ratings_count, nan=0.0)
+    shrunk_rating = ((RATING_PRIOR * RATING_PRIOR_WEIGHT + rating * ratings_count)
+                     / (RATING_PRIOR_WEIGHT + ratings_count))
+
+    popularity = np.log1p(ratings_count)
+    max_popularity = popularity.max() if len(popularity) else 0.0
+    if max_popularity > 0:
+        popularity = popularity / max_popularity
+
+    closeness = 1.0 - np.clip(distance_km / radius_km, 0.0, 1.0) if radius_km > 0 else np.zeros(len(distance_km))
+
+    max_price = np.nanmax(price) if len(price) and not np.all(np.isnan(price)) else 0.0
+    if max_price > 0:
+        cheapness = np.nan_to_num(1.0 - price / max_price, nan=0.5)
+    else:
+        cheapness = np.full(len(price), 0.5)
+
+    scores = (weights["keyword"] * keyword
+              + weights["rating"] * shrunk_rating / 5.0
+              + weights["popularity"] * popularity
+              + weights["distance"] * closeness
+              + weights["price"] * cheapness)
+    if weights["random"] and rng is not None:
+        scores = scores + weights["random"] * rng.random(len(scores))
+    return scores
+
+
+def select_top_k(scores, group_ids, k=20, per_group_cap=5):
+    """Get the indices of the k best scores with at most per_group_cap per group
+
+    Only a bounded prefix of the candidates is sorted: the best m are pulled
+    out with argpartition, and m only grows (doubling) when the per-group
+    cap rejects too many of them. Ties are broken by candidate index so the
+    result is deterministic.
+    """
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return []
+    m = min(n, k)
+    while True:
+        if m < n:
+            # Keep everything tied with the m-th best so ties resolve by index
+            threshold = scores[np.argpartition(-scores, m - 1)[m - 1]]
+            top = np.flatnonzero(scores >= threshold)
+        else:
+            top = np.arange(n)
+        # Sort the prefix by score descending, then index ascending
+        top = top[np.lexsort((top, -scores[top]))]
+        selected = []
+        group_counts = {}
+        for index in top:
+            group = group_ids[index]
+            count = group_counts.get(group, 0)
+            if count < per_group_cap:
+                selected.append(int(index))
+                group_counts[group] = count + 1
+                if len(selected) >= k:
+                    return selected
+        if len(top) == n:
+            return selected
+        m = min(n, m * 2)
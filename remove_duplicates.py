@@ -1,19 +1,48 @@
 import json
+import argparse
+from restaurant_stream import iter_records, deduped, write_records
+from near_duplicates import MinHasher, dedupe_menu_near, DEFAULT_PRICE_TOLERANCE
 
-with open('data/restaurant_list/restaurants_google_maps.json', 'r', encoding='utf-8') as f:
-    restaurants = json.load(f)
+INPUT_PATH = 'data/restaurant_list/restaurants_google_maps.json'
+OUTPUT_PATH = 'data/restaurant_list/restaurants_google_maps_deduped.json'
 
-    for restaurant in restaurants:
-        seen = set()
-        unique_menu = []
-        for item in restaurant.get('menu_items', []):
-            name_key = item['name'].strip().lower()
-            if name_key not in seen:
-                unique_menu.append(item)
-                seen.add(name_key)
-        restaurant['menu_items'] = unique_menu
+def near_deduped(records, threshold, price_tolerance, report):
+    """Also merge near-duplicate menu items of each restaurant, appending to report"""
+    hasher = MinHasher()
+    for record in records:
+        report.extend(dedupe_menu_near(record, threshold, price_tolerance, hasher))
+        yield record
 
-with open('data/restaurant_list/restaurants_google_maps_deduped.json', 'w', encoding='utf-8') as f:
-    json.dump(restaurants, f, ensure_ascii=False, indent=2)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drop repeated menu items from a restaurant JSON or NDJSON dump")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--ndjson', action='store_true',
+                        help="write one restaurant per line (implied by a .ndjson/.jsonl output)")
+    parser.add_argument('--near-threshold', type=float, default=None,
+                        help="also merge items of a menu whose name+description similarity is at least this")
+    parser.add_argument('--price-tolerance', type=float, default=DEFAULT_PRICE_TOLERANCE,
+                        help="maximum relative price difference of near duplicates")
+    parser.add_argument('--report', default=None, help="write the near-duplicate merge report JSON here")
+    args = parser.parse_args(argv)
 
-print("Deduplication complete. Output: restaurants_google_maps_deduped.json")
\ No newline at end of file
+    # Records are read, deduplicated and written one at a time
+    stats = {}
+    report = []
+    records = deduped(iter_records(args.input), stats)
+    if args.near_threshold is not None:
+        records = near_deduped(records, args.near_threshold, args.price_tolerance, report)
+    count = write_records(args.output, records, ndjson=args.ndjson or None)
+    print(f"Deduplication complete: {count} restaurants, {stats.get('duplicate_items', 0)} duplicate menu items "
+          f"removed. Output: {args.output}")
+    if args.near_threshold is not None:
+        stats['near_duplicate_items'] = sum(len(entry['merge']) for entry in report)
+        print(f"Near duplicates: {stats['near_duplicate_items']} menu items merged into {len(report)} others.")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Merge report written to {args.report}")
+    return stats
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import json
+from itertools import islice
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+# Bytes read from the input at a time
+READ_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+def _skip_whitespace(buf, pos):
+    while pos < len(buf) and buf[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+def iter_json_array(f, read_size=READ_SIZE):
+    """Yield the elements of a top-level JSON array one at a time
+
+    Only the element being decoded is held in memory, never the whole
+    array, so a dump of any size is read in roughly constant memory.
+    """
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill(pos):
+        nonlocal buf, eof
+        # Read at least as much as is buffered, so one huge element is not re-decoded for every chunk
+        chunk = f.read(max(read_size, len(buf) - pos))
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        return 0
+
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if pos < len(buf) or eof:
+            break
+        pos = fill(pos)
+    if pos >= len(buf):
+        return
+    if buf[pos] != '[':
+        raise ValueError("expected a JSON array")
+    pos += 1
+    expect_element = True
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("unterminated JSON array")
+            pos = fill(pos)
+            continue
+        if buf[pos] == ']':
+            return
+        if not expect_element:
+            if buf[pos] != ',':
+                raise ValueError(f"expected ',' or ']' in JSON array, got {buf[pos]!r}")
+            pos += 1
+            expect_element = True
+            continue
+        try:
+            element, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            pos = fill(pos)
+            continue
+        if isinstance(element, (int, float)) and not eof:
+            # A number cut off at the end of the buffer decodes as a shorter one
+            after = _skip_whitespace(buf, end)
+            if after == len(buf) or buf[after] not in ',]':
+                pos = fill(pos)
+                continue
+        yield element
+        pos = end
+        expect_element = False
+
+
+def iter_ndjson(f):
+    """Yield one record per non-blank line"""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_records(path):
+    """Yield the restaurant records of a JSON array or NDJSON file
+
+    NDJSON is recognized by its extension or by the file starting with an
+    object instead of an array.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(NDJSON_EXTENSIONS):
+            yield from iter_ndjson(f)
+            return
+        head = f.read(READ_SIZE)
+        start = _skip_whitespace(head, 0)
+        f.seek(0)
+        if head[start:start + 1] == '{':
+            yield from iter_ndjson(f)
+        else:
+            yield from iter_json_array(f)
+
+
+def dedupe_menu(restaurant):
+    """Drop menu items whose name repeats an earlier item, ignoring case and surrounding spaces
+
+    Returns the number of items dropped.
+    """
+    items = restaurant.get('menu_items')
+    if not items:
+        return 0
+    seen = set()
+    unique_menu = []
+    for item in items:
+        name_key = (item.get('name') or '').strip().lower()
+        if name_key not in seen:
+            unique_menu.append(item)
+            seen.add(name_key)
+    restaurant['menu_items'] = unique_menu
+    return len(items) - len(unique_menu)
+
+
+def deduped(records, stats=None):
+    """Apply dedupe_menu to each record as it streams past
+
+    stats, if given, is a dict that gets 'restaurants' and
+    'duplicate_items' counts.
+    """
+    for record in records:
+        dropped = dedupe_menu(record)
+        if stats is not None:
+            stats['restaurants'] = stats.get('restaurants', 0) + 1
+            stats['duplicate_items'] = stats.get('duplicate_items', 0) + dropped
+        yield record
+
+
+def batched(records, size):
+    """Group an iterable into lists of at most size records"""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+class RecordWriter:
+    """Write records one at a time as a JSON array or as NDJSON
+
+    The array form is indented like the json.dump(..., indent=2) files it
+    replaces; NDJSON puts each record on its own line.
+    """
+
+    def __init__(self, f, ndjson=False):
+        self.f = f
+        self.ndjson = ndjson
+        self.count = 0
+
+    def write(self, record):
+        if self.ndjson:
+            self.f.write(json.dumps(record, ensure_ascii=False))
+            self.f.write('\n')
+        else:
+            encoded = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            self.f.write(('[\n  ' if self.count == 0 else ',\n  ') + encoded)
+        self.count += 1
+
+    def close(self):
+        if not self.ndjson:
+            self.f.write('\n]' if self.count else '[]')
+
+
+def write_records(path, records, ndjson=None):
+    """Stream records into path; NDJSON when ndjson is True or the extension says so
+
+    Returns the number of records written.
+    """
+    if ndjson is None:
+        ndjson = path.endswith(NDJSON_EXTENSIONS)
+    with open(path, 'w', encoding='utf-8') as f:
+        writer = RecordWriter(f, ndjson)
+        for record in records:
+            writer.write(record)
+        writer.close()
+    return writer.count
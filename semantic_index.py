@@ -0,0 +1,134 @@
+import re
+import math
+import zlib
+import numpy as np
+from collections import Counter
+from functools import lru_cache
+
+# Width of the hashed feature vectors. A catalog has a few thousand distinct words and
+# trigrams and an item about 60 of them, so at 128 buckets collisions outweighed real
+# overlap ("cheesy pasta bake" ranked soft drinks first). 100k items take 200 MiB at float32
+VECTOR_DIMS = 512
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+CHAR_NGRAM = 3
+# Whole words count fully; their character trigrams, which let inflections and
+# near spellings ("refresh", "refreshing") overlap, count for less
+NGRAM_WEIGHT = 0.5
+# Above this share of the catalog, one contiguous matvec beats gathering rows first
+FULL_SCAN_FRACTION = 0.25
+
+STOP_WORDS = {
+    "a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or", "our", "your", "its",
+    "is", "are", "it", "by", "as", "at", "from", "that", "this", "served", "made", "choice",
+    "something", "food", "dish", "meal", "item", "want", "need", "like", "get", "find", "give",
+    "looking", "would", "could", "please", "thanks", "can", "some", "me", "i"
+}
+
+
+@lru_cache(maxsize=65536)
+def _ngram_hashes(word):
+    padded = f"<{word}>".encode("utf-8")
+    return tuple(zlib.crc32(b"c:" + padded[i:i + CHAR_NGRAM]) for i in range(len(padded) - CHAR_NGRAM + 1))
+
+
+@lru_cache(maxsize=65536)
+def _word_hash(word):
+    return zlib.crc32(b"w:" + word.encode("utf-8"))
+
+
+def features(text):
+    """Get {feature hash: weight} for the words of text and their character trigrams
+
+    Weights are sublinear in the term count (1 + log count).
+    """
+    words = [word for word in TOKEN_RE.findall((text or "").lower()) if word not in STOP_WORDS]
+    ngrams = Counter()
+    for word in words:
+        ngrams.update(_ngram_hashes(word))
+    counts = {key: NGRAM_WEIGHT * count for key, count in ngrams.items()}
+    for key, count in Counter(map(_word_hash, words)).items():
+        counts[key] = counts.get(key, 0.0) + count
+    return {key: count if count <= 1.0 else 1.0 + math.log(count) for key, count in counts.items()}
+
+
+def _bucket_and_sign(hashes, dims):
+    """Bucket of each feature hash, and a +/-1 sign from a higher bit so collisions tend to cancel"""
+    hashes = np.asarray(hashes, dtype=np.uint32)
+    return (hashes % dims).astype(np.int64), np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+
+
+class SemanticIndex:
+    """L2-normalized hashed TF-IDF vectors of menu items, one float32 row per item
+
+    IDF weights are kept per feature (as a sorted hash table) rather than
+    per bucket, so a query is weighted exactly like the items it is
+    compared with. Queries are embedded the same way and scored with a
+    single matrix-vector product.
+    """
+
+    def __init__(self, vectors, feature_hashes, feature_idf):
+        self.vectors = vectors
+        self.feature_hashes = feature_hashes
+        self.feature_idf = feature_idf
+        self.dims = vectors.shape[1]
+
+    @classmethod
+    def build(cls, texts, dims=VECTOR_DIMS):
+        """Vectorize texts (one per item) into a new index"""
+        docs = [features(text) for text in texts]
+        document_frequency = {}
+        for doc in docs:
+            for key in doc:
+                document_frequency[key] = document_frequency.get(key, 0) + 1
+        feature_hashes = np.array(sorted(document_frequency), dtype=np.uint32)
+        df = np.array([document_frequency[key] for key in feature_hashes.tolist()], dtype=np.float64)
+        feature_idf = (np.log((1 + len(docs)) / (1 + df)) + 1.0).astype(np.float32)
+
+        lengths = np.fromiter((len(doc) for doc in docs), dtype=np.int64, count=len(docs))
+        keys = np.fromiter((key for doc in docs for key in doc), dtype=np.uint32, count=int(lengths.sum()))
+        weights = np.fromiter((weight for doc in docs for weight in doc.values()), dtype=np.float32,
+                              count=len(keys))
+        weights *= feature_idf[np.searchsorted(feature_hashes, keys)]
+        buckets, signs = _bucket_and_sign(keys, dims)
+        cells = np.repeat(np.arange(len(docs)) * dims, lengths) + buckets
+        vectors = np.bincount(cells, weights * signs, minlength=len(docs) * dims).astype(np.float32)
+        vectors = vectors.reshape(len(docs), dims)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return cls(vectors, feature_hashes, feature_idf)
+
+    @classmethod
+    def from_columns(cls, columns):
+        return cls(columns["item_vectors"], columns["vec_feature_hashes"], columns["vec_feature_idf"])
+
+    def columns(self):
+        return {
+            "item_vectors": self.vectors,
+            "vec_feature_hashes": self.feature_hashes,
+            "vec_feature_idf": self.feature_idf
+        }
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def embed(self, text):
+        """Unit vector of a query; all zeros when none of its features occur in the catalog"""
+        query = np.zeros(self.dims, dtype=np.float32)
+        doc = features(text)
+        if not doc or not len(self.feature_hashes):
+            return query
+        keys = np.fromiter(doc, dtype=np.uint32, count=len(doc))
+        weights = np.fromiter(doc.values(), dtype=np.float32, count=len(doc))
+        positions = np.minimum(np.searchsorted(self.feature_hashes, keys), len(self.feature_hashes) - 1)
+        # Features no item has cannot make anything more similar
+        known = self.feature_hashes[positions] == keys
+        buckets, signs = _bucket_and_sign(keys[known], self.dims)
+        np.add.at(query, buckets, weights[known] * self.feature_idf[positions[known]] * signs)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def similarities(self, item_indices, query):
+        """Cosine similarity of the given items to a unit query vector"""
+        if len(item_indices) >= FULL_SCAN_FRACTION * len(self.vectors):
+            return (self.vectors @ query)[item_indices]
+        return self.vectors[item_indices] @ query
@@ -0,0 +1,61 @@
+import json
+import gzip
+import hashlib
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib encoder gives the same JSON
+    orjson = None
+
+# Bodies smaller than this are sent uncompressed even when gzip is accepted
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+
+def dumps(obj):
+    """Serialize obj to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def restaurant_fragment(record):
+    """Serialize a RestaurantRecord without its per-request distance
+
+    The result is an object missing its closing brace, so with_distance()
+    can append the distance without re-encoding the rest.
+    """
+    fields = record.to_dict()
+    del fields["distance_km"]
+    return dumps(fields)[:-1]
+
+
+def with_distance(fragment, distance_km):
+    return fragment + b',"distance_km":' + dumps(distance_km) + b'}'
+
+
+def encode_normalized(restaurants, recommendations, debug_info=None):
+    """Build a normalized response body
+
+    restaurants is a list of (restaurant_id, serialized restaurant) pairs;
+    each recommendation refers to one of them by restaurant_id.
+    """
+    parts = [b'{"restaurants":{']
+    parts.append(b",".join(b'"%d":%s' % (restaurant_id, body) for restaurant_id, body in restaurants))
+    parts.append(b'},"recommendations":')
+    parts.append(dumps(recommendations))
+    if debug_info is not None:
+        parts.append(b',"debug_info":')
+        parts.append(dumps(debug_info))
+    parts.append(b'}')
+    return b"".join(parts)
+
+
+def etag(body):
+    """Entity tag of a response body, computed before any content encoding"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def gzip_body(body):
+    # mtime=0 keeps the compressed bytes identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
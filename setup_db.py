@@ -1,55 +1,305 @@
 import os
 import json
+import time
 import sqlite3
+import hashlib
+import argparse
+from datetime import datetime
+from menu_features import classify_item
+from opening_hours import parse_opening_hours
+from restaurant_stream import iter_records, deduped, batched
 
 DB_PATH = "restaurants.db"
 JSON_PATH = "data/restaurant_list/restaurants_google_maps_deduped.json"
 
-conn = sqlite3.connect(DB_PATH)
-c = conn.cursor()
-
-# Create tables
-c.execute('''CREATE TABLE IF NOT EXISTS restaurants (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    lat REAL,
-    lng REAL,
-    name TEXT,
-    address TEXT,
-    rating REAL,
-    user_ratings_count INTEGER,
-    opening_hours TEXT,
-    photo_url TEXT,
-    price_level INTEGER,
-    phone TEXT,
-    website TEXT,
-    business_status TEXT,
-    google_maps_url TEXT
-)''')
-c.execute('''CREATE TABLE IF NOT EXISTS menu_items (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    restaurant_id INTEGER,
-    name TEXT,
-    description TEXT,
-    price REAL,
-    calories INTEGER,
-    tags TEXT,
-    FOREIGN KEY (restaurant_id) REFERENCES restaurants(id)
-)''')
-
-# Load JSON and insert data
-with open(JSON_PATH, encoding='utf-8') as f:
-    restaurants = json.load(f)
-
-for r in restaurants:
-    c.execute('''INSERT INTO restaurants (lat, lng, name, address, rating, user_ratings_count, opening_hours, phone, website, photo_url, price_level, business_status, google_maps_url)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                                (r.get('lat'), r.get('lng'), r.get('name'), r.get('address'), r.get('rating'), r.get('user_ratings_count'), json.dumps(r.get('opening_hours', [])), r.get('phone_number'), r.get('website'), json.dumps(r.get('photos', [])), r.get('price_level'), r.get('business_status'), r.get('google_maps_url')))
-    restaurant_id = c.lastrowid
-    for item in r.get('menu_items', []):
-        c.execute('''INSERT INTO menu_items (restaurant_id, name, description, price, calories, tags)
-                     VALUES (?, ?, ?, ?, ?, ?)''',
-                  (restaurant_id, item.get('name'), item.get('description'), item.get('price'), item.get('calories'), json.dumps(item.get('tags', []))))
-
-conn.commit()
-conn.close()
-print("Database setup complete.")
+# Applied to every loader connection; journal_mode=WAL is persistent
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA temp_store=MEMORY"
+]
+
+RESTAURANT_COLUMNS = [
+    "source_key", "content_hash", "lat", "lng", "name", "address", "rating",
+    "user_ratings_count", "opening_hours", "phone", "website", "photo_url",
+    "price_level", "business_status", "google_maps_url"
+]
+
+MENU_ITEM_COLUMNS = ["restaurant_id", "name", "description", "price", "calories", "tags", "features"]
+
+# Restaurants per upsert batch; only one batch of records is in memory at a time
+BATCH_SIZE = 500
+
+def create_tables(c):
+    """Create the tables and indexes the app reads from"""
+    tables = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    c.execute('''CREATE TABLE IF NOT EXISTS restaurants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lat REAL,
+        lng REAL,
+        name TEXT,
+        address TEXT,
+        rating REAL,
+        user_ratings_count INTEGER,
+        opening_hours TEXT,
+        photo_url TEXT,
+        price_level INTEGER,
+        phone TEXT,
+        website TEXT,
+        business_status TEXT,
+        google_maps_url TEXT,
+        source_key TEXT,
+        content_hash TEXT
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS menu_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        restaurant_id INTEGER,
+        name TEXT,
+        description TEXT,
+        price REAL,
+        calories INTEGER,
+        tags TEXT,
+        features INTEGER,
+        FOREIGN KEY (restaurant_id) REFERENCES restaurants(id)
+    )''')
+    # opening_hours parsed once: minutes since Monday 00:00, no row for a closed or unknown week
+    c.execute('''CREATE TABLE IF NOT EXISTS opening_intervals (
+        restaurant_id INTEGER NOT NULL,
+        open_minute INTEGER NOT NULL,
+        close_minute INTEGER NOT NULL,
+        FOREIGN KEY (restaurant_id) REFERENCES restaurants(id)
+    )''')
+    # Change log: one row per load that changed anything, and the restaurants it changed,
+    # so a serving process can tell a new catalog apart and re-read only those restaurants
+    c.execute('''CREATE TABLE IF NOT EXISTS catalog_versions (
+        version INTEGER PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        full_reload INTEGER NOT NULL DEFAULT 0
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS catalog_changes (
+        version INTEGER NOT NULL,
+        restaurant_id INTEGER NOT NULL
+    )''')
+    migrate(c)
+    if 'restaurants' in tables and 'catalog_versions' not in tables:
+        # Nothing says what changed before the log existed
+        record_version(c, full=True)
+    # Serves the bounding-box prefilter in get_restaurants_nearby
+    c.execute('CREATE INDEX IF NOT EXISTS idx_restaurants_lat_lng ON restaurants (lat, lng)')
+    # Natural keys for upserts; the menu item key also serves lookups by restaurant_id
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_restaurants_source_key ON restaurants (source_key)')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_menu_items_restaurant_name ON menu_items (restaurant_id, name)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_opening_intervals_restaurant ON opening_intervals (restaurant_id, open_minute)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_catalog_changes_version ON catalog_changes (version)')
+
+def migrate(c):
+    """Bring databases written by earlier versions of this script up to date"""
+    columns = {row[1] for row in c.execute('PRAGMA table_info(menu_items)')}
+    if 'features' not in columns:
+        c.execute('ALTER TABLE menu_items ADD COLUMN features INTEGER')
+    columns = {row[1] for row in c.execute('PRAGMA table_info(restaurants)')}
+    for column in ('source_key', 'content_hash'):
+        if column not in columns:
+            c.execute(f'ALTER TABLE restaurants ADD COLUMN {column} TEXT')
+    c.execute("UPDATE restaurants SET source_key = COALESCE(google_maps_url, name || '|' || COALESCE(address, '')) "
+              "WHERE source_key IS NULL")
+    # Earlier versions appended a full copy of the data on every run; keep the oldest copy
+    c.execute('''DELETE FROM menu_items WHERE restaurant_id IN (
+        SELECT id FROM restaurants WHERE id NOT IN (SELECT MIN(id) FROM restaurants GROUP BY source_key))''')
+    c.execute('DELETE FROM restaurants WHERE id NOT IN (SELECT MIN(id) FROM restaurants GROUP BY source_key)')
+    c.execute('DELETE FROM menu_items WHERE id NOT IN (SELECT MAX(id) FROM menu_items GROUP BY restaurant_id, name)')
+    c.execute('DELETE FROM opening_intervals WHERE restaurant_id NOT IN (SELECT id FROM restaurants)')
+    # Restaurants loaded before opening_intervals existed
+    rows = c.execute('''SELECT id, opening_hours FROM restaurants
+                        WHERE id NOT IN (SELECT restaurant_id FROM opening_intervals)''').fetchall()
+    for rid, hours in rows:
+        c.executemany('INSERT INTO opening_intervals VALUES (?, ?, ?)',
+                      opening_interval_rows(rid, json.loads(hours) if hours else []))
+
+def record_version(c, restaurant_ids=(), full=False):
+    """Log a new catalog version and the restaurants it changed; returns the version number
+
+    full marks a change to every restaurant (e.g. reclassified features),
+    after which readers reload the whole catalog.
+    """
+    version = c.execute('SELECT COALESCE(MAX(version), 0) + 1 FROM catalog_versions').fetchone()[0]
+    c.execute('INSERT INTO catalog_versions (version, created_at, full_reload) VALUES (?, ?, ?)',
+              (version, datetime.now().isoformat(), int(full)))
+    c.executemany('INSERT INTO catalog_changes (version, restaurant_id) VALUES (?, ?)',
+                  [(version, restaurant_id) for restaurant_id in sorted(restaurant_ids)])
+    return version
+
+def source_key(r):
+    """Stable natural key of a restaurant record"""
+    return r.get('google_maps_url') or f"{r.get('name')}|{r.get('address') or ''}"
+
+def content_hash(r):
+    """Hash of a restaurant record, used to skip restaurants whose JSON has not changed"""
+    return hashlib.sha256(json.dumps(r, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def restaurant_row(r, digest):
+    return (source_key(r), digest, r.get('lat'), r.get('lng'), r.get('name'), r.get('address'),
+            r.get('rating'), r.get('user_ratings_count'), json.dumps(r.get('opening_hours', [])),
+            r.get('phone_number'), r.get('website'), json.dumps(r.get('photos', [])),
+            r.get('price_level'), r.get('business_status'), r.get('google_maps_url'))
+
+def menu_item_row(restaurant_id, item):
+    tags = item.get('tags', [])
+    return (restaurant_id, item.get('name'), item.get('description'), item.get('price'),
+            item.get('calories'), json.dumps(tags), classify_item(item.get('name'), item.get('description'), tags))
+
+def opening_interval_rows(restaurant_id, weekday_text):
+    return [(restaurant_id, start, end) for start, end in parse_opening_hours(weekday_text)]
+
+def upsert_sql(table, columns, key_columns):
+    """Build an INSERT ... ON CONFLICT DO UPDATE statement"""
+    updates = ", ".join(f"{col}=excluded.{col}" for col in columns if col not in key_columns)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+def load_batch(c, restaurants, existing, stats, changed_ids=None):
+    """Upsert one batch of restaurant records and their menu items
+
+    existing maps source_key to (id, content_hash) and is updated with the
+    restaurants written, so a record repeated in a later batch is compared
+    against the copy loaded before it. The ids of the restaurants written
+    are added to changed_ids.
+    """
+    changed = {}
+    for r in restaurants:
+        key = source_key(r)
+        digest = content_hash(r)
+        if key in existing and existing[key][1] == digest:
+            stats["unchanged"] += 1
+            continue
+        stats["updated" if key in existing else "inserted"] += 1
+        changed[key] = (r, digest)
+
+    c.executemany(upsert_sql('restaurants', RESTAURANT_COLUMNS, ['source_key']),
+                  [restaurant_row(r, digest) for r, digest in changed.values()])
+
+    item_rows = []
+    stale_items = []
+    hours_rows = []
+    stale_hours = []
+    for key, (r, digest) in changed.items():
+        if key in existing:
+            restaurant_id = existing[key][0]
+        else:
+            restaurant_id = c.execute('SELECT id FROM restaurants WHERE source_key=?', (key,)).fetchone()[0]
+        names = set()
+        for item in r.get('menu_items', []):
+            item_rows.append(menu_item_row(restaurant_id, item))
+            names.add(item.get('name'))
+        if key in existing:
+            for item_id, name in c.execute('SELECT id, name FROM menu_items WHERE restaurant_id=?', (restaurant_id,)):
+                if name not in names:
+                    stale_items.append((item_id,))
+            stale_hours.append((restaurant_id,))
+        hours_rows.extend(opening_interval_rows(restaurant_id, r.get('opening_hours')))
+        existing[key] = (restaurant_id, digest)
+        if changed_ids is not None:
+            changed_ids.add(restaurant_id)
+    c.executemany('DELETE FROM menu_items WHERE id=?', stale_items)
+    c.executemany(upsert_sql('menu_items', MENU_ITEM_COLUMNS, ['restaurant_id', 'name']), item_rows)
+    c.executemany('DELETE FROM opening_intervals WHERE restaurant_id=?', stale_hours)
+    c.executemany('INSERT INTO opening_intervals VALUES (?, ?, ?)', hours_rows)
+    stats["items_written"] += len(item_rows)
+    stats["items_deleted"] += len(stale_items)
+
+def load_restaurants(c, restaurants, prune=False, batch_size=BATCH_SIZE):
+    """Upsert restaurant records, only touching the ones whose JSON changed
+
+    restaurants can be any iterable, e.g. a restaurant_stream.iter_records
+    stream; it is consumed batch_size records at a time, so memory stays
+    flat however large the input is.
+    Returns a dict of counts: restaurants inserted/updated/unchanged/deleted
+    and menu item rows written/deleted, plus the catalog version logged for
+    the changes (None when nothing changed).
+    """
+    existing = {key: (rid, digest) for rid, key, digest in
+                c.execute('SELECT id, source_key, content_hash FROM restaurants')}
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0,
+             "items_written": 0, "items_deleted": 0}
+    seen = set()
+    changed_ids = set()
+    for batch in batched(restaurants, batch_size):
+        load_batch(c, batch, existing, stats, changed_ids)
+        if prune:
+            seen.update(source_key(r) for r in batch)
+
+    if prune:
+        removed = [(rid,) for key, (rid, _) in existing.items() if key not in seen]
+        c.executemany('DELETE FROM menu_items WHERE restaurant_id=?', removed)
+        c.executemany('DELETE FROM opening_intervals WHERE restaurant_id=?', removed)
+        c.executemany('DELETE FROM restaurants WHERE id=?', removed)
+        stats["deleted"] = len(removed)
+        changed_ids.update(rid for (rid,) in removed)
+    stats["version"] = record_version(c, changed_ids) if changed_ids else None
+    return stats
+
+def reclassify(c):
+    """Recompute the feature bitmask of every menu item, e.g. after the keyword tables change"""
+    rows = c.execute('SELECT id, name, description, tags FROM menu_items').fetchall()
+    updates = [(classify_item(name, description, json.loads(tags) if tags else []), item_id)
+               for item_id, name, description, tags in rows]
+    c.executemany('UPDATE menu_items SET features=? WHERE id=?', updates)
+    record_version(c, full=True)
+    return len(updates)
+
+def connect(db_path):
+    """Open the database with the bulk-load PRAGMAs applied"""
+    conn = sqlite3.connect(db_path)
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build restaurants.db from the scraped restaurant JSON")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database to write")
+    parser.add_argument('--json', default=JSON_PATH, help="restaurant JSON array or NDJSON to load")
+    parser.add_argument('--reclassify', action='store_true',
+                        help="only recompute menu item feature bits in an existing database")
+    parser.add_argument('--prune', action='store_true',
+                        help="delete restaurants that are no longer in the JSON")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="restaurants upserted per batch")
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help="load menus as they are instead of dropping repeated item names")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    start = time.perf_counter()
+    # One transaction for the whole load
+    with conn:
+        c = conn.cursor()
+        create_tables(c)
+        if args.reclassify:
+            count = reclassify(c)
+        else:
+            # Records are parsed, deduplicated and upserted as they stream in
+            dedupe_stats = {}
+            restaurants = iter_records(args.json)
+            if not args.no_dedupe:
+                restaurants = deduped(restaurants, dedupe_stats)
+            stats = load_restaurants(c, restaurants, prune=args.prune, batch_size=args.batch_size)
+            stats["duplicate_items"] = dedupe_stats.get("duplicate_items", 0)
+    elapsed = time.perf_counter() - start
+    conn.close()
+
+    if args.reclassify:
+        print(f"Reclassified {count} menu items in {elapsed:.2f}s.")
+        return
+    rows = (stats["inserted"] + stats["updated"] + stats["deleted"]
+            + stats["items_written"] + stats["items_deleted"])
+    print(f"Restaurants: {stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['unchanged']} unchanged, {stats['deleted']} deleted")
+    print(f"Menu items: {stats['items_written']} written, {stats['items_deleted']} deleted, "
+          f"{stats['duplicate_items']} duplicates skipped")
+    print(f"Database setup complete: {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec).")
+    if stats["version"] is not None:
+        print(f"Catalog version {stats['version']}: running apps reload the changed restaurants.")
+    return stats
+
+if __name__ == '__main__':
+    main()
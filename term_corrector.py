@@ -0,0 +1,144 @@
+import re
+
+WORD_RE = re.compile(r'\b\w{3,}\b')
+
+# Two edits turn too many correctly spelled words into other dishes ("lobster" into "oyster")
+MAX_EDIT_DISTANCE = 1
+# Deletes are only generated for this many leading characters; longer words still match on their prefix
+PREFIX_LENGTH = 7
+# Shorter words are left alone, there are too many real words one edit apart
+MIN_WORD_LENGTH = 4
+# Words up to this long are never corrected for a replaced or extra letter ("bear" is not "beer")
+SHORT_WORD_LENGTH = 5
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word, max_distance, prefix_length):
+    """Every string obtained by deleting up to max_distance characters of word's prefix"""
+    prefix = word[:prefix_length]
+    result = {prefix}
+    frontier = {prefix}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+class TermCorrector:
+    """Spelling corrector over a fixed vocabulary using a SymSpell deletion index
+
+    Every term is indexed under each string reachable by deleting up to
+    max_distance characters of its prefix. A misspelled word then only
+    needs its own deletes looked up: two strings within edit distance d
+    always share a delete of at most d characters. The work per lookup
+    depends on the word's length, not on the size of the vocabulary.
+
+    terms maps each term to a count used to break ties between equally
+    close candidates. known(word) may mark words that are to be kept
+    even though they are not terms, e.g. fragments of catalog words that
+    a substring search would still find.
+    """
+
+    def __init__(self, terms, max_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH,
+                 min_word_length=MIN_WORD_LENGTH, known=None):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_word_length = min_word_length
+        self.known = known
+        self.terms = dict(terms)
+        self.deletes = {}
+        for term in self.terms:
+            for delete in _deletes(term, max_distance, prefix_length):
+                self.deletes.setdefault(delete, []).append(term)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def plausible(self, word, term):
+        """Check whether word, within max_distance of term, can be taken for a misspelling of it
+
+        A different first letter mostly gives another real word ("brunch"
+        and "crunch"), and so does replacing or dropping a letter of a
+        short word ("nice" and "rice", "kind" and "kid"). Short words are
+        only corrected for a missing or swapped letter.
+        """
+        if word[0] != term[0]:
+            return False
+        if len(word) > SHORT_WORD_LENGTH or len(word) < len(term):
+            return True
+        return len(word) == len(term) and sorted(word) == sorted(term)
+
+    def lookup(self, word):
+        """Get (term, distance) of the closest term to word, or None if none is close enough
+
+        Ties go to the more frequent term, then to the alphabetically first.
+        """
+        if word in self.terms:
+            return word, 0
+        limit = self.max_distance
+        best = None
+        seen = set()
+        for delete in _deletes(word, limit, self.prefix_length):
+            for term in self.deletes.get(delete, ()):
+                if term in seen:
+                    continue
+                seen.add(term)
+                distance = edit_distance(word, term, limit)
+                if distance > limit or not self.plausible(word, term):
+                    continue
+                key = (distance, -self.terms[term], term)
+                if best is None or key < best:
+                    best = key
+        return None if best is None else (best[2], best[0])
+
+    def correct(self, word):
+        """Get the term word was meant to be, or word itself when it is fine or has no close term"""
+        corrected = self._cache.get(word)
+        if corrected is None:
+            corrected = word
+            if len(word) >= self.min_word_length and word not in self.terms and not (self.known and self.known(word)):
+                match = self.lookup(word)
+                if match is not None:
+                    corrected = match[0]
+            if len(self._cache) >= 10000:
+                self._cache.clear()
+            self._cache[word] = corrected
+        return corrected
+
+    def correct_text(self, text):
+        """Correct every word of 3+ characters of a lowercase text; returns (text, {word: correction})"""
+        corrections = {}
+
+        def replace(match):
+            word = match.group()
+            corrected = self.correct(word)
+            if corrected != word:
+                corrections[word] = corrected
+            return corrected
+
+        return WORD_RE.sub(replace, text), corrections